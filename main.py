@@ -1,121 +1,373 @@
-"""Implements the game loop and handles the user's events."""
+"""Implements the game loop and handles the user's events.
+
+A computer opponent can play either color (or both):
+
+    python main.py --computer yellow --time 2 --engine mcts
+
+The computer thinks in the background, press space to make it move now.
+It also ponders (searches its reply to your expected move) while you are
+thinking, unless --no-ponder is given.
+
+The frame rate is capped (--fps) and the loop sleeps while nothing moves,
+--show-fps displays the measured frame rate and frame time.
+
+F3 starts/stops recording the window in a new folder of SNAP_FOLDER
+(see recorder.py for the --record-mode options).
+
+The moves can be saved (--save game.txt, or game.bin for the binary
+format) and replayed with the arrow keys (--replay game.txt).
+"""
 
 import sys
 import os
+import argparse
 # Manually places the window
 os.environ['SDL_VIDEO_WINDOW_POS'] = "%d,%d" % (100, 100)
-sys.path.insert(0, "C:/Users/Adrian/Desktop/Python/Abalone_Pygame/src")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 import math
+import random
 import pygame
+import board as rules
 from abalone import Abalone
+from bitboard import BitBoard
+from engine import Engine
+from mcts import MCTS
+from computer import ComputerPlayer
+from renderer import Renderer
+from frame_clock import FrameClock, DEFAULT_FPS
+from recorder import Recorder, MODES
+from game_record import GameRecord, Replay, MAX_SEED
+from profiler import FrameProfiler
+from client import RemoteGame
+from protocol import DELTA, KEYFRAME, ERROR, END
 from popup_win_game import PopUpWindow
 from constants import *
+from assets import ASSETS
 from PyQt5.QtWidgets import (QMainWindow, QApplication, QGridLayout, 
                              QWidget, QLayout)
 SNAP_FOLDER = os.path.join(os.path.dirname(__file__), "results")
-n_snap = 0
+
+# Ply reached by each key when replaying a game
+REPLAY_KEYS = {
+    K_LEFT: lambda replay: replay.ply - 1,
+    K_RIGHT: lambda replay: replay.ply + 1,
+    K_HOME: lambda replay: 0,
+    K_END: lambda replay: len(replay.deltas),
+}
+
+# Undo/redo key of each Abalone method when playing a game
+HISTORY_KEYS = {
+    K_LEFT: Abalone.undo,
+    K_RIGHT: Abalone.redo,
+}
+
+COMPUTER_COLORS = {
+    "blue": (rules.BLUE,),
+    "yellow": (rules.YELLOW,),
+    "both": (rules.BLUE, rules.YELLOW),
+}
+
 
 # Game loop
 def main():
+    parser = argparse.ArgumentParser(description="Abalone game.")
+    parser.add_argument("--computer", choices=sorted(COMPUTER_COLORS),
+                        help="color(s) played by the computer")
+    parser.add_argument("--time", type=float, default=2.0,
+                        help="computer's time limit per move (seconds)")
+    parser.add_argument("--engine", choices=("alphabeta", "mcts"),
+                        default="alphabeta", help="computer's algorithm")
+    parser.add_argument("--no-ponder", dest="ponder", action="store_false",
+                        help="do not think during the opponent's turn")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS,
+                        help="maximum frame rate (0: no limit)")
+    parser.add_argument("--show-fps", action="store_true",
+                        help="display the frame rate and frame time")
+    parser.add_argument("--profile", help="time the phases of the frames and "
+                        "write their percentiles to this file when quitting "
+                        "(JSON if its extension is .json, CSV otherwise)")
+    parser.add_argument("--record-mode", choices=MODES, default="png",
+                        help="output of the F3 recording")
+    parser.add_argument("--configuration", choices=sorted(CONFIGURATIONS),
+                        default="STANDARD", help="initial configuration")
+    parser.add_argument("--seed", type=int,
+                        help="seed of the first color (random if none)")
+    parser.add_argument("--save", help="file where the game is saved when "
+                        "quitting (binary if its extension is .bin)")
+    parser.add_argument("--replay", help="game to replay (arrow keys, "
+                        "home and end go through its moves)")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play on a game server (see server.py)")
+    parser.add_argument("--watch", type=int, metavar="MATCH",
+                        help="watch a match of the game server instead of "
+                        "playing (with --connect)")
+    args = parser.parse_args()
+    if args.seed is not None and not 0 <= args.seed <= MAX_SEED:
+        parser.error(f"--seed must be between 0 and {MAX_SEED}")
+    if args.watch is not None and not args.connect:
+        parser.error("--watch requires --connect")
+    computer = COMPUTER_COLORS.get(args.computer, ())
+    if args.engine == "mcts":
+        engine = MCTS(args.time)
+    else:
+        engine = Engine(args.time)
+    player = ComputerPlayer(engine, post_computer_move)
     try:
-        os.mkdir(SNAP_FOLDER)
-    except FileExistsError:
-        print(f"Folder \"{SNAP_FOLDER}\" already exists. Ignoring.")
-    if os.path.isdir(SNAP_FOLDER):
-        for file_name in os.listdir(SNAP_FOLDER):
-            file = os.path.join(SNAP_FOLDER, file_name)
-            os.remove(file)
+        recorder = Recorder(SNAP_FOLDER, args.record_mode, args.fps or DEFAULT_FPS)
+    except ValueError as error:
+        parser.error(str(error))
+
+    # pygame is initialized first: the remote game's thread posts events
     pygame.init()
     screen = pygame.display.set_mode([SIZE_X, SIZE_Y])
     pygame.display.set_caption("Abalone")
-    game = Abalone()
+    remote = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        if args.watch is None:
+            print(f"Waiting for an opponent on {args.connect}...")
+        try:
+            remote = RemoteGame(host or "127.0.0.1", int(port),
+                                args.configuration, post_remote_message,
+                                args.watch)
+        except (OSError, ValueError) as error:
+            pygame.quit()
+            parser.error(f"Cannot play on {args.connect}: {error}")
+        if remote.color is None:
+            print(f"Watching match {remote.match}")
+        else:
+            print(f"Match {remote.match}: you play "
+                  f"{'blue' if remote.color == rules.BLUE else 'yellow'}")
+
+    replay = None
+    if remote is not None:
+        # The server plays the moves: no computer, no undo
+        # the moves already received are replayed by the game loop
+        initial = remote.initial_state
+        game = Abalone(CONFIGURATIONS[args.configuration], initial.turn)
+        game.set_board(initial.to_board())
+        if remote.color is None:
+            # a spectator may skip moves (see broadcaster.py)
+            game.record = None
+        else:
+            game.new_record()
+        computer = ()
+    elif args.replay:
+        replay = Replay(GameRecord.load(args.replay))
+        game = Abalone(CONFIGURATIONS[replay.record.configuration],
+                       replay.record.first)
+        game.set_board(replay.board_at(replay.ply).to_board())
+        computer = ()
+    else:
+        first = random.Random(args.seed).choice((rules.BLUE, rules.YELLOW))
+        game = Abalone(CONFIGURATIONS[args.configuration], first)
+        game.new_record(args.seed)
+    profiler = FrameProfiler(enabled=args.profile is not None)
+    renderer = Renderer(screen, game.build_background(screen.get_size()),
+                        profiler)
+    clock = FrameClock(args.fps)
     app = QApplication(sys.argv)
     end_game_popup = PopUpWindow(game)
     running = True
     moving = False
     record = False
+    show_profile = False
 
     while running:
-        # Events handling
-        for event in pygame.event.get():
+        # Events handling (sleeps until the next event or second if idle)
+        computer_to_start = (game.board.turn in computer and not player.thinking()
+                             and game.board.winner() is None)
+        idle = not moving and not record and not computer_to_start
+        events = clock.events(idle, game.time_to_next_second())
+        profiler.frame()
+        for event in events:
             p_keys = pygame.key.get_pressed()
             p_mouse = pygame.mouse.get_pressed()
             # Quiting game
             if event.type == QUIT:
                 running = False
+            # The window must be drawn again (e.g. after being uncovered)
+            elif event.type == VIDEOEXPOSE:
+                renderer.invalidate()
             # Quiting (w/ escape)/Resetting game
             elif event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     running = False
-                elif event.key == K_p:
+                elif event.key == K_p and remote is None:
+                    player.cancel()
                     game.reset_game()
+                elif event.key == K_SPACE:
+                    player.move_now()
                 elif event.key == K_F3:
-                    record = True if not record else False
+                    # each recording gets its own session folder
+                    record = not record
+                    if not record:
+                        recorder.close()
+                elif event.key == K_F2:
+                    show_profile = not show_profile
+                    if show_profile and not profiler.enabled:
+                        # the frame is timed from now, not from a stale mark
+                        profiler.enabled = True
+                        profiler.frame()
+                elif replay is not None and event.key in REPLAY_KEYS:
+                    ply = REPLAY_KEYS[event.key](replay)
+                    game.set_board(replay.board_at(ply).to_board())
+                elif (replay is None and remote is None
+                      and event.key in HISTORY_KEYS):
+                    # Steps back to (or forward until) a human's turn
+                    player.cancel()
+                    moving = False
+                    step = HISTORY_KEYS[event.key]
+                    while (step(game) and game.board.turn in computer
+                           and len(computer) == 1):
+                        pass
+            # The computer's move is ready (if still relevant)
+            elif event.type == MOVE_READY:
+                player.acknowledge()
+                current_key = BitBoard.from_board(game.board).hash
+                if (event.move and event.key == current_key
+                        and game.board.turn in computer):
+                    info = engine.info()
+                    if player.ponders:
+                        info += f", {player.ponder_info()}"
+                    print(f"Computer: {info}")
+                    game.play_move(event.move)
+                    if (args.ponder and game.board.turn not in computer
+                            and game.board.winner() is None):
+                        player.ponder(BitBoard.from_board(game.board))
+            # A message of the game server (see client.py)
+            elif event.type == REMOTE_MESSAGE:
+                if event.kind == DELTA:
+                    game.play_move(event.value[1])
+                elif event.kind == KEYFRAME:
+                    game.set_board(event.value[1].to_board())
+                elif event.kind == ERROR:
+                    print(f"Server: {event.value}")
+                elif event.kind == END and event.value is None:
+                    print("Server: the match is over (a player left)")
+            # The computer or the remote opponent is playing (or a game is
+            # replayed or watched)
+            elif (game.board.turn in computer or replay is not None
+                  or (remote is not None and game.board.turn != remote.color)):
+                continue
             # Selecting a single marble
             elif event.type == MOUSEBUTTONDOWN and not p_keys[K_LSHIFT]:
-                for rect in game.marbles_rect:
-                    if (game.is_inside_marble(event.pos, rect.center)
-                        and game.marbles_pos[rect.topleft] == game.current_color):
-                            moving = True
-                            game.set_buffers(rect.topleft)
-                            game.marbles_pos[rect.topleft] = MARBLE_FREE
-                            break
+                cell = game.cell_at(event.pos)
+                if (cell is not None and game.marbles_pos[
+                        game.cells_topleft[cell]] == game.current_color):
+                    moving = True
+                    # the board's rectangles never move
+                    rect = game.marbles_rect[cell].copy()
+                    game.set_buffers(rect.topleft)
+                    game.recolor_marble(rect.topleft, ASSETS.MARBLE_FREE)
             # Updating board
             elif event.type == MOUSEBUTTONUP:
                 moving = False
                 game.apply_buffers()
-                game.update_board()
+                if remote is None:
+                    game.update_board()
+                elif game.move is not None:
+                    # played when the server sends it back
+                    remote.send_move(game.move)
+                    game.move = None
+                    game.marbles_2_change.clear()
                 game.clear_buffers()
             # Moving single marble
             elif event.type == MOUSEMOTION and moving:
                 rect.move_ip(event.rel)
-                game.select_single_marble(event.pos, rect)
+                with profiler.measure("select"):
+                    game.select_single_marble(event.pos, rect)
             # Selecting multiple marbles
             elif p_keys[K_LSHIFT]:
-                if not game.buffer_marbles_pos:
+                if not game.buffering:
                     game.set_buffers()
                 if p_mouse[0]:
-                    mouse_pos = pygame.mouse.get_pos()
-                    for rect in game.marbles_rect:
-                        if game.is_inside_marble(mouse_pos, rect.center):
-                            game.select_marbles_range(rect)
-                            game.compute_new_marbles_range(rect)
-
-        game.display_marbles(screen)
-        game.display_current_color(screen)
-        game.display_time_elapsed(screen)
-        game.display_error_message(screen)
-        game.draw_circled_line(screen, GREEN_3, 4)
-        if moving: 
-            screen.blit(game.buffer_color, rect)
-        game_over = game.check_win_and_display_message(screen)
+                    cell = game.cell_at(pygame.mouse.get_pos())
+                    if cell is not None:
+                        with profiler.measure("select"):
+                            game.select_marbles_range(game.marbles_rect[cell])
+                            game.compute_new_marbles_range(game.marbles_rect[cell])
+
+        if (game.board.turn in computer and not player.thinking()
+                and game.board.winner() is None):
+            player.start(BitBoard.from_board(game.board))
+        profiler.lap("events")
+
+        # Only the areas which changed are drawn again (see renderer.py)
+        game.display_marbles(renderer)
+        profiler.lap("display_marbles")
+        game.draw_circled_line(renderer, GREEN_3, 4)
+        if moving:
+            game.display_dragged_marble(renderer, rect)
+        profiler.lap("drag")
+        game.display_current_color(renderer)
+        game.display_time_elapsed(renderer)
+        game.display_error_message(renderer)
+        game_over = game.check_win_and_display_message(renderer)
+        if args.show_fps:
+            renderer.text("fps", ASSETS.FONT, clock.readout(), WHITE, (5, SIZE_Y - 50))
+        if show_profile:
+            lines = profiler.lines(max_age=0.5)
+            for i, line in enumerate(lines):
+                renderer.text(("profile", i), ASSETS.SMALL_FONT, line, WHITE,
+                              (SIZE_X - 260, SIZE_Y - 18 * (len(lines) - i) - 5))
+        profiler.lap("text")
+        renderer.present()
+        profiler.lap("present")
         if record:
-            record_game(screen)
-        pygame.display.update()
+            recorder.capture(screen)
+            profiler.lap("capture")
+        profiler.end_frame()
         if game_over:
             end_game_popup.show()
             running = end_game_popup.get_run_game()
             if not running:
                 end_game_popup.close()
             app.setStyle("Fusion")
+        clock.tick()
+    player.close()
+    recorder.close()
+    if remote is not None:
+        remote.close()
+    if args.profile:
+        profiler.export(args.profile)
+    if args.save and replay is None and game.record is not None:
+        game.record.save(args.save)
     pygame.quit()
 
 
-def record_game(screen) -> None:
-    """Save a snapshot of the current grid to the SNAP_FOLDER.
+def post_computer_move(move, key) -> None:
+    """Notify the game loop that the computer's move is ready.
+
+    Called from the computer's worker thread.
+
+    Parameters
+    ----------
+    move: tuple of ints (required)
+        Move found by the computer (see board.py).
+    key: int (required)
+        Hash of the position the move was searched for.
+    """
+
+    pygame.event.post(pygame.event.Event(MOVE_READY, move=move, key=key))
+
+
+def post_remote_message(kind, value) -> None:
+    """Notify the game loop of a message of the game server.
+
+    Called from the remote game's thread (see client.py).
 
-    Parameter
-    ---------
-    screen: pygame.Surface (required)
-        Game window
+    Parameters
+    ----------
+    kind: int (required)
+        Type of the message (DELTA, KEYFRAME, ERROR or END, see
+        protocol.py).
+    value: tuple, string or int (required)
+        Content of the message (see RemoteGame.on_message).
     """
 
-    global n_snap
-    n_snap += 1
-    extension = "png"
-    file_name = f"snapshot_{n_snap}.{extension}"
-    pygame.image.save(screen, os.path.join(SNAP_FOLDER, file_name))
+    pygame.event.post(pygame.event.Event(REMOTE_MESSAGE, kind=kind, value=value))
 
 
 if __name__ == "__main__":
@@ -1,13 +1,13 @@
 import sys
 import math
-import random
 import pygame
 from pygame import gfxdraw
 from pygame.locals import *
 from constants import *
-from copy import deepcopy
-
-pygame.init()
+from assets import ASSETS
+import board as rules
+from game_record import GameRecord
+from history import History
 
 
 class Abalone(pygame.sprite.Sprite):
@@ -15,25 +15,48 @@ class Abalone(pygame.sprite.Sprite):
     A class used to represent a standard Abalone board.
     Both players have 14 marbles.
     A player loses whenever 6 of his marbles are out.
-    
+
+    The rules are implemented by a Board object (see board.py),
+    this class only handles the display and the user's inputs.
+
     Attributes
     ----------
     configuration: string (optional, default="STANDARD")
         Initial board configuration.
+    board: Board
+        State of the game (cells, dead marbles and color being played).
+    record: GameRecord
+        Moves played since the game started (None if the configuration
+        is not one of CONFIGURATIONS).
+    history: History
+        Moves which can be undone and redone.
     marbles_rect: list
         Rectangles representing all marbles positions.
     marbles_pos: dict
-        Marbles positions and its associated current value.
+        Marbles positions and their associated value, i.e. the board's
+        state (never recolored, see highlights).
+    cells_pos: dict
+        Marbles positions and their associated cell on the board.
     buffer_marble: pygame.Surface
         Initial position of a marble being moved.
-    buffer_marbles_pos: dict
-        Buffer of marbles_pos used to freeze the board's state.
+    cells_topleft: list
+        Position of each cell on the board.
+    highlights: dict
+        Marbles positions temporarily recolored (selection, valid or invalid
+        spots) and their color, drawn over marbles_pos.
+    buffering: bool
+        True if the buffers are set, i.e. while selecting marbles.
+    destinations: dict
+        Preview of the legal moves of the marble picked up, by target
+        position (see compute_destinations).
     marbles_2_change: dict
         Marbles to change when updating the board (if possible).
+    move: tuple of ints
+        Move to play when updating the board (if possible).
     buffer_line: string
         A visual green line used to emphazise push move.
     current_color: pygame.Surface
-        Current marble's color that is being played (MARBLE_BLUE or MARBLE_YELLOW).
+        Current marble's color that is being played (ASSETS.MARBLE_BLUE or ASSETS.MARBLE_YELLOW).
     buffer_message: string
         Message used to inform the player of an incorrect move.
 
@@ -41,20 +64,28 @@ class Abalone(pygame.sprite.Sprite):
     -------
     build_marbles(self) -> None
         Place the marbles to their initial position.
+    refresh_marbles(self, cells=None) -> None
+        Update the marbles and dead-zones to match the board's state.
+    recolor_marble(self, marble_pos, color) -> None:
+        Temporarily highlight a single marble.
+    build_background(self, size) -> pygame.Surface:
+        Pre-composite the parts of the window which never change.
     display_marbles(self, screen) -> None:
         Display the marbles, i.e. the board and both (blue and yellow) dead-zones.
-    is_valid_neighbor(self, target_pos, h_range=False) -> bool:
-        Check if a given marble is a valid neighbor.
-    recolor_marbles(self, target, reset_list, reset_color, new_color=None) -> None:
-        Recolor multiples marbles to have one colored marble (green or red)
+    display_dragged_marble(self, screen, rect) -> None:
+        Display the marble being moved by the user.
+    recolor_marbles(self, target, reset_list, new_color=None) -> None:
+        Remove the highlights of some colors, then highlight a marble.
     set_buffers(self, marble=None) -> None:
         Set buffers to keep track of the board's state at a given time.
     apply_buffers(self) -> None:
         Apply the buffers to get back to the previous game's state.
     clear_buffers(self) -> None:
         Clear the all the buffers at once.
-    push_marbles(self, target) -> None:
-        Performs a push move.
+    preview_move(self, move) -> bool:
+        Prepare a move to be played when updating the board.
+    compute_destinations(self, marble) -> dict:
+        Preview every legal move of a single marble.
     select_single_marble(self, mouse_pos, current_marble) -> None:
         Select a single marble to be moved towards a valid spot.
     check_range_type(self) -> bool:
@@ -63,8 +94,18 @@ class Abalone(pygame.sprite.Sprite):
         Select a range of connected marbles along a common axis.
     compute_new_marbles_range(self, target) -> None:
         Computes the new positions of a range of connected marbles.
+    new_record(self, seed=None) -> None:
+        Start recording the moves from the current position.
     update_board(self) -> None:
         Update the state of the game.
+    play_move(self, move) -> None:
+        Play a move which does not come from the user's inputs.
+    set_board(self, board) -> None:
+        Display another state of the game (e.g. a replayed position).
+    undo(self) -> bool:
+        Take back the last move played.
+    redo(self) -> bool:
+        Play again the last undone move.
     display_current_color(self, screen) -> None:
         Display the current color being played.
     display_error_message(self, screen) -> None:
@@ -76,21 +117,23 @@ class Abalone(pygame.sprite.Sprite):
 
     Static Methods
     --------------
-    predict_direction(origin, target) -> tuple:
-        Predict the direction when computing new spot coordinates.
-    compute_next_spot(origin, move_coefficients, lateral_move) -> tuple:
-        Compute the next spot of given marble coordinates.
+    cell_topleft(coords) -> tuple:
+        Compute the position of a cell given its board coordinates.
+    cell_at(pos) -> int:
+        Returns the cell under a given position of the window.
     enemy(current_color) -> pygame.Surface:
         Returns the enemy of the current color being played.
     is_inside_marble(marble_center, mouse_pos) -> bool:
         Check if the mouse cursor position is inside a marble.
     display_time_elapsed(screen) -> None:
         Display the time elapsed since the game was launched.
+    time_to_next_second(self) -> int:
+        Returns the time left before the displayed time changes.
     """
-    
+
     # Constructor
     # -----------
-    def __init__(self, configuration=STANDARD):
+    def __init__(self, configuration=STANDARD, turn=None):
         """Constructor.
 
         Calls the parent constructor and initializes all the attributes.
@@ -103,142 +146,208 @@ class Abalone(pygame.sprite.Sprite):
             Initial positions of the marbles on the board.
             the STANDARD configuration is the one commonly used in
             mainstream abalone games.
+        turn: int (optional, default=None)
+            First color to play (see board.py), randomly chosen if None.
         """
-        
+
         super().__init__()
         self.configuration = configuration
+        self.board = rules.Board(configuration, turn)
+        self.record = None
+        self.history = History()
+        self.new_record()
         self.marbles_rect = []
         self.marbles_pos = dict()
+        self.cells_pos = dict()
+        self.cells_topleft = []
         self.dead_zone_blue = dict()
         self.dead_zone_yellow = dict()
-        self.dead_marbles = {DEAD_BLUE: 0, DEAD_YELLOW: 0}
         self.marbles_2_change = dict()
+        self.move = None
         self.buffer_dead_zone = dict()
         self.buffer_line = None
         self.buffer_message = None
         self.buffer_marble = None
         self.buffer_color = None
-        self.buffer_marbles_pos = dict()
-        self.buffer_marbles_rect = []
-        self.current_color = random.choice((MARBLE_BLUE, MARBLE_YELLOW))
+        self.highlights = dict()
+        self.buffering = False
+        self.destinations = dict()
         self.time_end = 0
+        self.seconds_elapsed = None
+        self.time_text = None
         self.build_marbles()
 
+    # Properties
+    # ----------
+    @property
+    def current_color(self) -> pygame.Surface:
+        """Current marble's color that is being played."""
+        return ASSETS.MARBLE_IMGS[self.board.turn]
+
+    @property
+    def dead_marbles(self) -> dict:
+        """Number of dead marbles of each color."""
+        return {ASSETS.DEAD_BLUE: self.board.dead[rules.BLUE],
+                ASSETS.DEAD_YELLOW: self.board.dead[rules.YELLOW]}
+
     # Methods
     # -------
     def build_marbles(self) -> None:
         """Places the marbles to their initial position."""
-        y_init = 30
-        gap_y = MARBLE_SIZE
-        for row in self.configuration:
-            x_init = SIZE_X - 400 - len(row) * MARBLE_SIZE
-            gap_x = MARBLE_SIZE
-            for element in row:
-                x = x_init + gap_x
-                y = y_init + gap_y
-                self.marbles_pos[(x, y)] = MARBLE_IMGS[element]
-                self.marbles_rect.append(
-                    MARBLE_IMGS[element].get_rect(topleft = (x, y)))
-                gap_x += 2 * MARBLE_SIZE
-            gap_y += 2 * MARBLE_SIZE
+        self.marbles_rect.clear()
+        self.cells_pos.clear()
+        self.cells_topleft.clear()
+        for cell, coords in enumerate(rules.COORDS):
+            marble_pos = self.cell_topleft(coords)
+            self.cells_pos[marble_pos] = cell
+            self.cells_topleft.append(marble_pos)
+            self.marbles_rect.append(
+                ASSETS.MARBLE_FREE.get_rect(topleft = marble_pos))
 
         self.dead_zone_blue = {
-            (30, 120): MARBLE_FREE,
-            (90, 120): MARBLE_FREE,
-            (150, 120): MARBLE_FREE,
-            (60, 180): MARBLE_FREE,
-            (120, 180): MARBLE_FREE,
-            (90, 240): MARBLE_FREE,
+            (30, 120): ASSETS.MARBLE_FREE,
+            (90, 120): ASSETS.MARBLE_FREE,
+            (150, 120): ASSETS.MARBLE_FREE,
+            (60, 180): ASSETS.MARBLE_FREE,
+            (120, 180): ASSETS.MARBLE_FREE,
+            (90, 240): ASSETS.MARBLE_FREE,
         }
         self.dead_zone_yellow = {
-            (90, 360): MARBLE_FREE,
-            (60, 420): MARBLE_FREE,
-            (120, 420): MARBLE_FREE,
-            (30, 480): MARBLE_FREE,
-            (90, 480): MARBLE_FREE,
-            (150, 480): MARBLE_FREE,
+            (90, 360): ASSETS.MARBLE_FREE,
+            (60, 420): ASSETS.MARBLE_FREE,
+            (120, 420): ASSETS.MARBLE_FREE,
+            (30, 480): ASSETS.MARBLE_FREE,
+            (90, 480): ASSETS.MARBLE_FREE,
+            (150, 480): ASSETS.MARBLE_FREE,
         }
+        self.refresh_marbles()
+
+    def refresh_marbles(self, cells=None) -> None:
+        """Update the marbles and dead-zones to match the board's state.
+
+        Parameter
+        ---------
+        cells: iterable of ints (optional, default=None)
+            Cells to update (e.g. the ones changed by a move), all if None.
+        """
+
+        if cells is None:
+            cells = range(rules.N_CELLS)
+        for cell in cells:
+            self.marbles_pos[self.cells_topleft[cell]] = (
+                ASSETS.MARBLE_IMGS[self.board.cells[cell]])
+        for dead_zone, color, dead_color in (
+                (self.dead_zone_blue, rules.BLUE, ASSETS.DEAD_BLUE),
+                (self.dead_zone_yellow, rules.YELLOW, ASSETS.DEAD_YELLOW)):
+            for i, key in enumerate(dead_zone):
+                if i < self.board.dead[color]:
+                    dead_zone[key] = dead_color
+                else:
+                    dead_zone[key] = ASSETS.MARBLE_FREE
+
+    def build_background(self, size) -> pygame.Surface:
+        """Pre-composite the parts of the window which never change.
+
+        That is the background and the empty holes of the board and of
+        both dead-zones: free marbles are not displayed by display_marbles.
+
+        Parameter
+        ---------
+        size: tuple of integers (required)
+            Size of the window
+
+        Returns
+        -------
+        pygame.Surface
+            The background, used by the Renderer (see renderer.py)
+        """
+
+        background = pygame.Surface(size).convert()
+        background.fill(BACKGROUND)
+        holes = self.cells_topleft + list(self.dead_zone_blue) + list(self.dead_zone_yellow)
+        background.blits([(ASSETS.MARBLE_FREE, pos) for pos in holes], False)
+        return background
 
     def display_marbles(self, screen) -> None:
         """Display the marbles, i.e. the board and both (blue and yellow) dead-zones.
 
+        The free marbles are part of the background (see build_background).
+        The highlighted marbles are drawn with their highlight's color.
+
         Parameter
         ---------
-        screen: pygame.Surface (required)
+        screen: Renderer (required)
+            Scene of the current frame (see renderer.py)
         """
 
-        screen.fill(BACKGROUND)
-        skull_rect = SKULL.get_rect()
+        skull_rect = ASSETS.SKULL.get_rect()
 
+        highlights = self.highlights
         for m_pos, m_color in self.marbles_pos.items():
-            screen.blit(m_color, m_pos)
+            m_color = highlights.get(m_pos, m_color)
+            if m_color != ASSETS.MARBLE_FREE:
+                screen.blit(("marble", m_pos), m_color, m_pos)
         for k_dz, v_dz in self.buffer_dead_zone.items():
-            screen.blit(v_dz, k_dz)
+            screen.blit(("preview", k_dz), v_dz, k_dz)
             skull_rect.center = (k_dz[0] + SHIFT_X, k_dz[1] + SHIFT_Y)
-            screen.blit(SKULL, skull_rect)
-        for k_blue, v_blue in self.dead_zone_blue.items():
-            screen.blit(v_blue, k_blue)
-            if v_blue != MARBLE_FREE:
-                skull_rect.center = (k_blue[0] + SHIFT_X, k_blue[1] + SHIFT_Y)
-                screen.blit(SKULL, skull_rect)
-        for k_yellow, v_yellow in self.dead_zone_yellow.items():
-            screen.blit(v_yellow, k_yellow)
-            if v_yellow != MARBLE_FREE:
-                skull_rect.center = (k_yellow[0] + SHIFT_X, k_yellow[1] + SHIFT_Y)
-                screen.blit(SKULL, skull_rect)
-
-    def is_valid_neighbor(self, target_pos, h_range=False) -> bool:
-        """Check if a given marble is a valid neighbor.
+            screen.blit(("preview_skull", k_dz), ASSETS.SKULL, skull_rect.topleft)
+        for dead_zone in (self.dead_zone_blue, self.dead_zone_yellow):
+            for k_dz, v_dz in dead_zone.items():
+                if v_dz != ASSETS.MARBLE_FREE:
+                    screen.blit(("dead", k_dz), v_dz, k_dz)
+                    skull_rect.center = (k_dz[0] + SHIFT_X, k_dz[1] + SHIFT_Y)
+                    screen.blit(("skull", k_dz), ASSETS.SKULL, skull_rect.topleft)
+
+    def display_dragged_marble(self, screen, rect) -> None:
+        """Display the marble being moved by the user.
 
         Parameters
         ----------
-        target_pos: tuple of ints (required)
-            Coordinates (x, y) of the target
-        h_range: bool (optional, default=False)
-            Used whenever a range is being moved laterally.
-            In this case, the neighborhood is restricted to 4 neighbors
-            instead of 6.
-
-        Returns
-        -------
-        bool
-            True if the target is a valid neighbor.
+        screen: Renderer (required)
+            Scene of the current frame (see renderer.py)
+        rect: pygame.Rect (required)
+            Current position of the marble
         """
-        x, y = self.buffer_marble
-        neighbors = [
-            (x - MARBLE_SIZE, y - 2 * MARBLE_SIZE),
-            (x + MARBLE_SIZE, y - 2 * MARBLE_SIZE),
-            (x - MARBLE_SIZE, y + 2 * MARBLE_SIZE),
-            (x + MARBLE_SIZE, y + 2 * MARBLE_SIZE),
-        ]
-        if not h_range:
-            neighbors.extend([(x - 2 * MARBLE_SIZE, y),
-                              (x + 2 * MARBLE_SIZE, y)])
-        return target_pos in neighbors
-
-    def recolor_marbles(self, target, reset_list, reset_color, new_color=None) -> None:
-        """Recolor multiples marbles to have one colored marble (green or red)
+
+        screen.blit("dragged", self.buffer_color, rect.topleft)
+
+    def recolor_marbles(self, target, reset_list, new_color=None) -> None:
+        """Remove the highlights of some colors, then highlight a marble.
 
         This method is used when a marble becomes a valid neighbor (green) or not (red).
-        If a previous marble's color was changed, it changes it to its previous value (free or solid)
+        Only the highlighted marbles are scanned, not the whole board.
 
         Parameters
         ----------
         target: pygame.Surface
             The current target (i.e. the marble being mouseover'd at)
         reset_list: list of pygame.Surface (required)
-            A list of pygame.Surface we want to recolor
-        reset_color: pygame.Surface (required)
-            The previous color (free or solid)
+            Colors of the highlights to remove
         new_color: pygame.Surface (optional, default=None)
             The new color of the current target
         """
 
-        for key, value in self.marbles_pos.items():
-            if value in reset_list:
-                self.marbles_pos[key] = reset_color
+        for key in [key for key, value in self.highlights.items()
+                    if value in reset_list]:
+            del self.highlights[key]
         if new_color:
-            self.marbles_pos[target] = new_color
+            self.recolor_marble(target, new_color)
+
+    def recolor_marble(self, marble_pos, color) -> None:
+        """Temporarily highlight a single marble.
+
+        The board's state (marbles_pos) is left untouched: the highlight
+        is drawn over it until apply_buffers is called.
+
+        Parameters
+        ----------
+        marble_pos: tuple of integers (required)
+            Position of the marble to recolor
+        color: pygame.Surface (required)
+            The new color of the marble
+        """
+
+        self.highlights[marble_pos] = color
 
     def set_buffers(self, marble=None) -> None:
         """Set buffers to keep track of the board's state at a given time.
@@ -247,23 +356,24 @@ class Abalone(pygame.sprite.Sprite):
         ----------
         marble: pygame.Surface (optional, default=None)
             Used when moving freely a single marble.
-            We want to keep track of its initial location
+            We want to keep track of its initial location, and its legal
+            moves are previewed once for the whole drag.
         """
 
         if marble:
             self.buffer_marble = marble
             self.buffer_color = self.marbles_pos[self.buffer_marble]
-        self.buffer_marbles_pos = {key: value for key, value
-                                   in self.marbles_pos.items()}
-        self.buffer_marbles_rect = deepcopy(self.marbles_rect)
+            self.destinations = self.compute_destinations(marble)
+        self.highlights.clear()
+        self.buffering = True
 
     def apply_buffers(self) -> None:
-        """Apply the buffers to get back to the previous game's state."""
-        if self.buffer_marbles_pos:
-            self.marbles_pos = {key: value for key, value
-                                in self.buffer_marbles_pos.items()}
-        if self.buffer_marbles_rect:
-            self.marbles_rect = deepcopy(self.buffer_marbles_rect)
+        """Apply the buffers to get back to the previous game's state.
+
+        The highlights are removed, the board's state was never modified.
+        """
+
+        self.highlights.clear()
 
     def clear_buffers(self) -> None:
         """Clear the all the buffers at once.
@@ -271,91 +381,105 @@ class Abalone(pygame.sprite.Sprite):
         Method used when updating the board.
         """
 
-        self.buffer_marbles_pos.clear()
-        self.buffer_marbles_rect.clear()
+        self.highlights.clear()
+        self.buffering = False
+        self.destinations.clear()
         self.buffer_dead_zone.clear()
         self.buffer_message = None
         self.buffer_line = None
 
-    def push_marbles(self, target) -> None:
-        """Performs a push move.
+    def preview_move(self, move) -> bool:
+        """Prepare a move to be played when updating the board.
 
-        It includes pushing friendly marbles both with no sumito and sumito.
-        It also checks if the move is possible. More than 3 friendly marbles cannot
-        be moved at the same time. Also, a sumito can be invalid:
-        If the number of enemy marbles is higher or equal to the number of
-        friendly marbles. Or if an enemy marble is followed by a friendly marble.
+        The board's state is not modified: the marbles to change,
+        the dead-zone and the green line are only buffered.
 
-        Parameters
-        ----------
-        target: pygame.Surface (required)
-        """
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            Move to prepare (see board.py).
 
-        move_coefficients = self.predict_direction(self.buffer_marble, target)
-        enemy = self.enemy(self.current_color)
-        colors = [self.current_color]
-        self.marbles_2_change[self.buffer_marble] = MARBLE_FREE
-        x, y = target
-        lateral_move = self.buffer_marble[1] == y
+        Returns
+        -------
+        bool
+            True if the move is legal, False otherwise.
+        """
 
-        end_move = False
+        self.marbles_2_change.clear()
         self.buffer_dead_zone.clear()
-        while not end_move:
-            try:
-                self.buffer_marbles_pos[(x, y)]
-            except KeyError:
-                if current_spot in (self.current_color, enemy):
-                    if current_spot == MARBLE_BLUE:
-                        dead_spot = DEAD_BLUE
-                    else:
-                        dead_spot = DEAD_YELLOW
-                    self.buffer_dead_zone[(x, y)] = dead_spot
-                break
-
-            # the buffer is used instead of the actual marble_pos
-            current_spot = self.buffer_marbles_pos[(x, y)]
-            sumito = enemy in colors
-            own_marble = current_spot == self.current_color
-            other_marble = current_spot in (enemy, MARBLE_FREE)
-
-            if current_spot in (enemy, self.current_color):
-                colors.append(current_spot)
-
-            too_much_marbles = colors.count(self.current_color) > 3
-            wrong_sumito = (colors.count(enemy) >= colors.count(self.current_color)
-                            or enemy in colors and current_spot == self.current_color)
-            # if the move is incorrect
-            if too_much_marbles or wrong_sumito:
-                self.buffer_message = "Invalid move!"
-                self.marbles_pos[target] = MARBLE_RED
-                self.marbles_2_change.clear()
-                break
-            # if we keep finding our own marbles
-            if own_marble and (x, y) not in self.marbles_2_change.keys():
-                self.marbles_2_change[(x, y)] = self.current_color
-            # we either find an enemy or an empty spot
-            elif other_marble:
-                if sumito:
-                    self.marbles_2_change[(x, y)] = enemy
+        self.buffer_line = None
+        self.move = None
+        preview = self._preview(move)
+        if preview is None:
+            return False
+        self._show_preview(preview)
+        return True
+
+    def compute_destinations(self, marble) -> dict:
+        """Preview every legal move of a single marble.
+
+        It includes pushing friendly marbles both with no sumito and sumito.
+        The moves' validity is checked by the board (see Board.resolve_inline).
+
+        Parameter
+        ---------
+        marble: tuple of ints (required)
+            Position of the marble.
+
+        Returns
+        -------
+        dict
+            Preview (move, marbles to change, dead-zone, line) of each legal
+            move by target position, i.e. the neighbor the marble is moved to.
+        """
+
+        origin = self.cells_pos[marble]
+        destinations = dict()
+        for direction, cell in enumerate(rules.NEIGHBORS[origin]):
+            if cell != rules.OFF:
+                preview = self._preview((origin, direction, 1, direction))
+                if preview is not None:
+                    destinations[self.cells_topleft[cell]] = preview
+        return destinations
+
+    def _preview(self, move):
+        # Marbles to change, dead-zone and green line of a move (None if the
+        # move is illegal), the game's state is not modified.
+        result = self.board.resolve(move)
+        if result is None:
+            return None
+
+        changes, ejected = result
+        positions = self.cells_topleft
+        marbles_2_change = {positions[cell]: ASSETS.MARBLE_IMGS[state]
+                            for cell, state in changes}
+        dead_zone = dict()
+        line = None
+        origin, direction, count, _ = move
+        if count == 1:
+            x1, y1 = positions[origin]
+            x2, y2 = positions[changes[-1][0]]
+            if ejected:
+                cell = origin
+                while rules.NEIGHBORS[cell][direction] != rules.OFF:
+                    cell = rules.NEIGHBORS[cell][direction]
+                row, col = rules.COORDS[cell]
+                d_row, d_col = rules.DIRECTIONS[direction]
+                x2, y2 = self.cell_topleft((row + d_row, col + d_col))
+                if ejected == rules.BLUE:
+                    dead_zone[(x2, y2)] = ASSETS.DEAD_BLUE
                 else:
-                    self.marbles_2_change[(x, y)] = self.current_color
-                # loop ends if its a free spot
-                if current_spot == MARBLE_FREE:
-                    end_move = True
-            # getting the next spot
-            x, y = self.compute_next_spot((x, y), move_coefficients, lateral_move)
-
-        if self.marbles_2_change:
-            self.buffer_message = None
-            list_keys = list(self.marbles_2_change)
-            x1, y1 = list_keys[0][0], list_keys[0][1]
-            if self.buffer_dead_zone:
-                x2, y2 = x, y
-            else:
-                x2, y2 = list_keys[-1][0], list_keys[-1][1]
-            self.buffer_line = (
-                (x1 + SHIFT_X, y1 + SHIFT_Y),
-                (x2 + SHIFT_X, y2 + SHIFT_Y))
+                    dead_zone[(x2, y2)] = ASSETS.DEAD_YELLOW
+            if ejected or changes[-1][0] != rules.NEIGHBORS[origin][direction]:
+                line = ((x1 + SHIFT_X, y1 + SHIFT_Y),
+                        (x2 + SHIFT_X, y2 + SHIFT_Y))
+        return move, marbles_2_change, dead_zone, line
+
+    def _show_preview(self, preview) -> None:
+        # Buffers a preview (see _preview) to be displayed and played
+        self.move, marbles_2_change, dead_zone, self.buffer_line = preview
+        self.marbles_2_change.update(marbles_2_change)
+        self.buffer_dead_zone.update(dead_zone)
 
     def select_single_marble(self, mouse_pos, current_marble) -> None:
         """Select a single marble to be moved towards a valid spot.
@@ -363,6 +487,8 @@ class Abalone(pygame.sprite.Sprite):
         A valid spot is a free/friendly spot in the current_marble neighborhood.
         If the spot is actually valid, its color changes from free to green (not permanent).
         Otherwise, it changes from free to red (not permanent).
+        The legal spots were previewed when the marble was picked up (see
+        set_buffers): hovering a spot is a lookup.
 
         Parameters
         ----------
@@ -372,33 +498,32 @@ class Abalone(pygame.sprite.Sprite):
             The current marble being selected.
         """
 
-        target = None
         self.buffer_line = None
         self.buffer_dead_zone.clear()
         init_marble = self.buffer_marble
 
-        for t in self.marbles_rect:
-            target = t.topleft
-            if t.collidepoint(mouse_pos) and current_marble != t:
-                self.apply_buffers()
-                self.marbles_pos[init_marble] = MARBLE_FREE
-                if init_marble != t.topleft:
-                    self.marbles_2_change.clear()
-                    if self.is_valid_neighbor(target, False):
-                        if self.marbles_pos[target] == MARBLE_FREE:
-                            self.buffer_message = None
-                            self.marbles_pos[target] = MARBLE_GREEN
-                            self.marbles_2_change[self.buffer_marble] = MARBLE_FREE
-                            self.marbles_2_change[target] = self.current_color
-                        else:
-                            self.push_marbles(target)
-                    else:
-                        self.marbles_pos[target] = MARBLE_RED
-                        self.buffer_message = "Invalid move!"
+        cell = self.cell_at(mouse_pos)
+        if cell is None or self.marbles_rect[cell] == current_marble:
+            return
+        target = self.cells_topleft[cell]
+        self.apply_buffers()
+        self.recolor_marble(init_marble, ASSETS.MARBLE_FREE)
+        self.marbles_2_change.clear()
+        self.move = None
+        if init_marble != target:
+            preview = self.destinations.get(target)
+            if preview is not None:
+                if self.marbles_pos[target] == ASSETS.MARBLE_FREE:
+                    self.recolor_marble(target, ASSETS.MARBLE_GREEN)
+                self.buffer_message = None
+                self._show_preview(preview)
+            else:
+                self.recolor_marble(target, ASSETS.MARBLE_RED)
+                self.buffer_message = "Invalid move!"
 
     def check_range_type(self) -> bool:
         """Check if a range selection is valid.
-        
+
         Method used when moving connected marbles along a common axis.
 
         Returns
@@ -407,25 +532,10 @@ class Abalone(pygame.sprite.Sprite):
             True if the selected range is valid, False otherwise.
         """
 
-        len_range = len(self.marbles_2_change)
-        if len_range == 1:
+        if len(self.marbles_2_change) == 1:
             return True
-        min_x = min(self.marbles_2_change.keys(), key=lambda t: t[0])[0]
-        max_x = max(self.marbles_2_change.keys(), key=lambda t: t[0])[0]
-        if (len(set(elem[1] for elem in self.marbles_2_change.keys()))) == 1:
-            valid_len_x = (2 * MARBLE_SIZE) * (len_range - 1)
-            if max_x - min_x == valid_len_x:
-                return True
-        else:
-            min_y = min(self.marbles_2_change.keys(), key=lambda t: t[1])[1]
-            max_y = max(self.marbles_2_change.keys(), key=lambda t: t[1])[1]
-            valid_len_x = MARBLE_SIZE * (len_range - 1)
-            valid_len_y = (2 * MARBLE_SIZE) * (len_range - 1)
-            current_x_len = max_x - min_x
-            current_y_len = max_y - min_y
-            if current_x_len == valid_len_x and current_y_len == valid_len_y:
-                return True
-        return False
+        cells = [self.cells_pos[m_pos] for m_pos in self.marbles_2_change]
+        return rules.line_of(cells) is not None
 
     def select_marbles_range(self, target) -> None:
         """Select a range of connected marbles along a common axis.
@@ -438,13 +548,13 @@ class Abalone(pygame.sprite.Sprite):
             Current target, i.e. the marble being mouseover'd at
         """
 
-        if (self.marbles_pos[target.topleft] in (self.current_color, MARBLE_PURPLE)
-            and MARBLE_RED not in self.marbles_pos.values()):
+        if (self.marbles_pos[target.topleft] == self.current_color
+            and ASSETS.MARBLE_RED not in self.highlights.values()):
             max_range = len(self.marbles_2_change) >= 3
             if not max_range:
-                self.marbles_2_change[target.topleft] = MARBLE_FREE
+                self.marbles_2_change[target.topleft] = ASSETS.MARBLE_FREE
                 if self.check_range_type():
-                    self.marbles_pos[target.topleft] = MARBLE_PURPLE
+                    self.recolor_marble(target.topleft, ASSETS.MARBLE_PURPLE)
 
     def compute_new_marbles_range(self, target) -> None:
         """Computes the new positions of a range of connected marbles.
@@ -457,67 +567,129 @@ class Abalone(pygame.sprite.Sprite):
         target: pygame.Surface (required)
             Current marble being mouseover'd at
         """
-        
-        if (self.marbles_pos[target.topleft] == MARBLE_FREE
+
+        if (self.marbles_pos[target.topleft] == ASSETS.MARBLE_FREE
             and len(self.marbles_2_change) > 1
             and self.current_color not in self.marbles_2_change.values()):
             list_keys = list(self.marbles_2_change.keys())
-            last_entry = list_keys[-1]
-            lateral_move = last_entry[1] == target.topleft[1]
-            move_coefficients = (
-                self.predict_direction(last_entry, target.topleft))
-            valid_new_range = True
-            for marble in list_keys:
-                next_spot = (
-                    self.compute_next_spot(marble, move_coefficients, lateral_move))
-                self.marbles_2_change[next_spot] = self.current_color
-                try:
-                    self.buffer_marbles_pos[next_spot]
-                except KeyError:
-                    print("Out of bounds selection!")
-                    valid_new_range = False
-                    break
-                else:
-                    valid_new_range = (
-                        self.buffer_marbles_pos[next_spot]
-                        in (MARBLE_FREE, MARBLE_GREEN))
-                    if not valid_new_range:
-                        break
+            line = rules.line_of(self.cells_pos[m_pos] for m_pos in list_keys)
+            valid_new_range = False
+            if line:
+                first, axis = line
+                direction = rules.direction_towards(
+                    self.cells_pos[list_keys[-1]], self.cells_pos[target.topleft])
+                valid_new_range = self.preview_move(
+                    (first, direction, len(list_keys), axis))
             if valid_new_range:
                 for m_pos, m_color in self.marbles_2_change.items():
                     if m_color == self.current_color:
                         self.recolor_marbles(
                             m_pos,
-                            [MARBLE_RED],
-                            MARBLE_FREE,
-                            MARBLE_GREEN)
+                            [ASSETS.MARBLE_RED],
+                            ASSETS.MARBLE_GREEN)
             else:
                 self.recolor_marbles(
                     target.topleft,
-                    [MARBLE_GREEN, MARBLE_RED],
-                    MARBLE_FREE,
-                    MARBLE_RED)
+                    [ASSETS.MARBLE_GREEN, ASSETS.MARBLE_RED],
+                    ASSETS.MARBLE_RED)
                 self.marbles_2_change.clear()
 
+    def new_record(self, seed=None) -> None:
+        """Start recording the moves from the current position.
+
+        Parameter
+        ---------
+        seed: int (optional, default=None)
+            Seed used to draw the first color, if any.
+        """
+
+        for name, configuration in CONFIGURATIONS.items():
+            if configuration is self.configuration:
+                self.record = GameRecord(name, self.board.turn, seed)
+
     def update_board(self) -> None:
         """Update the state of the game."""
-        if self.current_color in self.marbles_2_change.values():
-            for m_pos, m_color in self.marbles_2_change.items():
-                self.marbles_pos[m_pos] = m_color
-            self.current_color = self.enemy(self.current_color)
-        for dz_value in self.buffer_dead_zone.values():
-            if dz_value == DEAD_BLUE:
-                for key, value in self.dead_zone_blue.items():
-                    if value == MARBLE_FREE:
-                        self.dead_zone_blue[key] = dz_value
-                        break
-            else:
-                for key, value in self.dead_zone_yellow.items():
-                    if value == MARBLE_FREE:
-                        self.dead_zone_yellow[key] = dz_value
-                        break
-            self.dead_marbles[dz_value] += 1
+        if self.move is not None:
+            record = self.board.play(self.move)
+            self.history.push(self.move, record)
+            self.refresh_marbles(cell for cell, _ in record[0])
+            if self.record is not None:
+                self.record.moves.append(self.move)
+        self.move = None
+        self.marbles_2_change.clear()
+
+    def play_move(self, move) -> None:
+        """Play a move which does not come from the user's inputs.
+
+        Used by the computer players, the move must be legal.
+
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            Move to play (see board.py).
+        """
+
+        self.move = move
+        self.update_board()
+
+    def set_board(self, board) -> None:
+        """Display another state of the game (e.g. a replayed position).
+
+        Parameter
+        ---------
+        board: Board (required)
+            New state of the game (see board.py).
+        """
+
+        board.configuration = self.configuration
+        self.board = board
+        self.history.clear()
+        self.clear_buffers()
         self.marbles_2_change.clear()
+        self.move = None
+        self.refresh_marbles()
+
+    def undo(self) -> bool:
+        """Take back the last move played.
+
+        Only the cells changed by the move are refreshed.
+
+        Returns
+        -------
+        bool
+            False if there is no move to undo.
+        """
+
+        return self._step(undo=True)
+
+    def redo(self) -> bool:
+        """Play again the last undone move.
+
+        Returns
+        -------
+        bool
+            False if there is no move to redo.
+        """
+
+        return self._step(undo=False)
+
+    def _step(self, undo) -> bool:
+        # Undo or redo a move of the history and display it
+        self.clear_buffers()
+        self.marbles_2_change.clear()
+        self.move = None
+        step = self.history.undo if undo else self.history.redo
+        result = step(self.board)
+        if result is None:
+            return False
+        move, cells = result
+        self.refresh_marbles(cells)
+        if self.record is not None:
+            if undo:
+                self.record.moves.pop()
+            else:
+                self.record.moves.append(move)
+        return True
 
     def check_win_and_display_message(self, screen) -> bool:
         """Checks for any winning condition and displays a message.
@@ -528,23 +700,21 @@ class Abalone(pygame.sprite.Sprite):
 
         Parameter
         ---------
-        screen: pygame.display
-            Game window
-        
+        screen: Renderer
+            Scene of the current frame (see renderer.py)
+
         Returns
         -------
         bool
             True if a player has won, False otherwise
         """
-        
-        my_font = pygame.font.SysFont("Sans", 45)
-        if self.dead_marbles[DEAD_YELLOW] == 6:
-            msg = my_font.render("Blue wins!", True, BLUE_MARBLE)
-            screen.blit(msg, (372, 5))
+
+        winner = self.board.winner()
+        if winner == rules.BLUE:
+            screen.text("winner", ASSETS.WIN_FONT, "Blue wins!", BLUE_MARBLE, (372, 5))
             return True
-        elif self.dead_marbles[DEAD_BLUE] == 6:
-            msg = my_font.render("Yellow wins!", True, YELLOW_MARBLE)
-            screen.blit(msg, (355, 5))
+        elif winner == rules.YELLOW:
+            screen.text("winner", ASSETS.WIN_FONT, "Yellow wins!", YELLOW_MARBLE, (355, 5))
             return True
         return False
 
@@ -553,29 +723,27 @@ class Abalone(pygame.sprite.Sprite):
 
         Parameter
         ---------
-        screen: pygame.display (required)
-            Game window
+        screen: Renderer (required)
+            Scene of the current frame (see renderer.py)
         """
 
-        if self.current_color == MARBLE_YELLOW:
-            text = FONT.render("Yellow", True, YELLOW_MARBLE)
+        if self.current_color == ASSETS.MARBLE_YELLOW:
+            screen.text("color", ASSETS.FONT, "Yellow", YELLOW_MARBLE, (5, 45))
         else:
-            text = FONT.render("Blue", True, BLUE_MARBLE)
-        screen.blit(text, (5, 45))
+            screen.text("color", ASSETS.FONT, "Blue", BLUE_MARBLE, (5, 45))
 
     def display_error_message(self, screen) -> None:
         """Display a red message whenever an invalid move is being played."""
         if self.buffer_message:
-            text = FONT.render(self.buffer_message, True, RED_2)
-            screen.blit(text, (5, 85))
+            screen.text("error", ASSETS.FONT, self.buffer_message, RED_2, (5, 85))
 
     def draw_circled_line(self, screen, colour, width) -> None:
         """Draw a line with two circles to enhance the visual effect.
 
         Parameters
         ----------
-        screen: pygame.display (required)
-            Game window
+        screen: Renderer (required)
+            Scene of the current frame (see renderer.py)
         colour: tuple of integers (required)
             Colour's RGB code
         width: float (required)
@@ -583,98 +751,111 @@ class Abalone(pygame.sprite.Sprite):
         """
 
         if self.buffer_line:
-            x1, y1 = self.buffer_line[0]
-            x2, y2 = self.buffer_line[1]
-            pygame.draw.line(screen, colour, (x1, y1), (x2, y2), width)
-            gfxdraw.aacircle(screen, x1, y1, width + 1, colour)
-            gfxdraw.filled_circle(screen, x1, y1, width + 1, colour)
-            gfxdraw.aacircle(screen, x2, y2, width + 1, colour)
-            gfxdraw.filled_circle(screen, x2, y2, width + 1, colour)
+            (x1, y1), (x2, y2) = self.buffer_line
+            radius = width + 1
+
+            def draw(surface):
+                pygame.draw.line(surface, colour, (x1, y1), (x2, y2), width)
+                gfxdraw.aacircle(surface, x1, y1, radius, colour)
+                gfxdraw.filled_circle(surface, x1, y1, radius, colour)
+                gfxdraw.aacircle(surface, x2, y2, radius, colour)
+                gfxdraw.filled_circle(surface, x2, y2, radius, colour)
+
+            rect = pygame.Rect(min(x1, x2) - radius, min(y1, y2) - radius,
+                               abs(x2 - x1) + 2 * radius + 1,
+                               abs(y2 - y1) + 2 * radius + 1)
+            screen.shape("line", rect, (self.buffer_line, colour, width), draw)
 
     def display_time_elapsed(self, screen) -> None:
         """Display the time elapsed since the game was launched.
 
         Parameter
         ---------
-        screen: pygame.display
-            Game window
+        screen: Renderer
+            Scene of the current frame (see renderer.py)
         """
 
-        time_elapsed = pygame.time.get_ticks() - self.time_end
-        time_elapsed = f"Time: {int(time_elapsed / 1e3)}s"
-        screen.blit(FONT.render(time_elapsed, True, WHITE), (5, 5))
+        seconds = (pygame.time.get_ticks() - self.time_end) // 1000
+        if seconds != self.seconds_elapsed:
+            self.seconds_elapsed = seconds
+            self.time_text = f"Time: {seconds}s"
+        screen.text("time", ASSETS.FONT, self.time_text, WHITE, (5, 5))
+
+    def time_to_next_second(self) -> int:
+        """Returns the time left (in milliseconds) before the displayed time changes."""
+        return 1000 - (pygame.time.get_ticks() - self.time_end) % 1000
 
     def reset_game(self) -> None:
         """Reset the game by pressing p (pygame constant K_p)."""
         self.time_end = pygame.time.get_ticks()
-        self.build_marbles()
+        self.board.reset(self.board.turn)
+        self.history.clear()
+        self.new_record()
         self.clear_buffers()
         self.marbles_2_change.clear()
-        for key in self.dead_marbles.keys():
-            self.dead_marbles[key] = 0
-        for key in self.dead_zone_blue.keys():
-            self.dead_zone_blue[key] = MARBLE_FREE
-        for key in self.dead_zone_yellow.keys():
-            self.dead_zone_yellow[key] = MARBLE_FREE
+        self.move = None
+        self.build_marbles()
 
     # Static Methods
     # --------------
 
     @staticmethod
-    def predict_direction(origin, target) -> tuple:
-        """Predict the direction when computing new spot coordinates.
+    def cell_topleft(coords) -> tuple:
+        """Compute the position of a cell given its board coordinates.
 
-        Parameters
-        --------- 
-        origin: tuple of integers (required)
-            First marble's coordinates
-        target: tuple of integers (required)
-            Second marble's coordinates
+        Parameter
+        ---------
+        coords: tuple of integers (required)
+            (row, column) coordinates of the cell (see board.py).
+            Coordinates outside of the board are allowed.
 
         Returns
         -------
-        k, j: tuple of integers
-            k: lateral coefficient
-            j: vertical coefficient
+        x, y: tuple of integers
+            Top-left corner of the cell on the screen.
         """
 
-        k = 1 if target[0] > origin[0] else -1
-        j = 1 if target[1] > origin[1] else -1
-        return k, j
+        row, col = coords
+        x = SIZE_X - 400 - 9 * MARBLE_SIZE + (col + 1) * MARBLE_SIZE
+        y = 30 + MARBLE_SIZE + row * 2 * MARBLE_SIZE
+        return x, y
 
     @staticmethod
-    def compute_next_spot(origin, move_coefficients, lateral_move) -> tuple:
-        """Compute the next spot of given marble coordinates.
+    def cell_at(pos):
+        """Returns the cell under a given position of the window.
 
-        Parameters
-        ----------
-        origin: tuple of integers (required)
-            Initial marble.
-        move_coefficients: tuple of integers (required)
-            Lateral (k) and vertical (j) coefficients used to
-            compute the next spot's direction.
-        lateral_move: bool (required) 
-            True if a lateral move (horizontal axis) is being performed.
+        The layout of cell_topleft is inverted: only the closest cell is
+        checked, whatever the number of cells.
+
+        Parameter
+        ---------
+        pos: tuple of integers (required)
+            Position (x, y) in the window, e.g. the mouse cursor's.
 
         Returns
         -------
-        x, y: tuple of integers
-            Coordinates of the next spot.
+        int or None
+            The cell (see board.py), None if the position is not inside
+            a marble.
         """
-        
-        k, j = move_coefficients
-        if lateral_move:
-            x = origin[0] + k * 2 * MARBLE_SIZE
-            y = origin[1]
-        else:
-            x = origin[0] + k * MARBLE_SIZE
-            y = origin[1] + j * 2 * MARBLE_SIZE
-        return x, y
+
+        x_0, y_0 = Abalone.cell_topleft((0, 0))
+        row = math.floor((pos[1] - y_0 - SHIFT_Y) / (2 * MARBLE_SIZE))
+        col = math.floor((pos[0] - x_0 - SHIFT_X) / MARBLE_SIZE)
+        # only the 4 closest cells can hold the position (2 on each row),
+        # the first one is returned if it is inside several marbles
+        for coords in ((r, c) for r in (row, row + 1) for c in range(col - 1, col + 3)):
+            cell = rules.CELL_AT.get(coords)
+            if cell is not None:
+                x_cell, y_cell = Abalone.cell_topleft(coords)
+                if Abalone.is_inside_marble((x_cell + SHIFT_X, y_cell + SHIFT_Y), pos):
+                    return cell
+        return None
 
     @staticmethod
     def enemy(current_color) -> pygame.Surface:
         """Returns the enemy of the current color being played."""
-        return MARBLE_BLUE if current_color == MARBLE_YELLOW else MARBLE_YELLOW
+        return ASSETS.MARBLE_BLUE if current_color == ASSETS.MARBLE_YELLOW else ASSETS.MARBLE_YELLOW
 
     @staticmethod
     def is_inside_marble(marble_center, mouse_pos) -> bool:
@@ -707,7 +888,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
-
-
@@ -0,0 +1,139 @@
+"""Loads the images and fonts of the game on demand.
+
+Importing the game's modules neither opens a window nor loads a file:
+each asset is loaded the first time it is used (which requires the game
+window for the images, see pygame.Surface.convert_alpha), then kept.
+The assets are attributes of the ASSETS registry, named as the former
+constants, e.g. ASSETS.MARBLE_BLUE.
+
+Running this module measures the cold start of the game, i.e. the time
+spent importing its modules and loading every asset (SDL's dummy video
+driver is used if no display is available):
+
+    python assets.py
+"""
+
+import os
+import sys
+import time
+import pygame
+from constants import IMAGES_DIR
+
+# Images: file name, alpha (None: per-pixel only), zoom
+IMAGES = {
+    # https://www.iconshock.com/flat-icons/3d-graphics-icons/sphere-icon/
+    "MARBLE_RED": ("sphere_red.png", None, 1),
+    "MARBLE_GREEN": ("sphere_green.png", None, 1),
+    "MARBLE_BLUE": ("sphere_blue.png", None, 1),
+    "DEAD_BLUE": ("sphere_blue.png", 128, 1),
+    "MARBLE_YELLOW": ("sphere_yellow.png", None, 1),
+    "DEAD_YELLOW": ("sphere_yellow.png", 128, 1),
+    "MARBLE_PURPLE": ("sphere_purple.png", None, 1),
+    "MARBLE_CYAN": ("sphere_cyan.png", None, 1),
+    "MARBLE_BROWN": ("sphere_brown.png", None, 1),
+    "MARBLE_FREE": ("sphere_empty.png", None, 1),
+    # https://icons8.com/icon/54885/skull
+    "SKULL": ("skull.png", None, 0.7),
+}
+# Fonts: system font name, size
+FONTS = {
+    "FONT": ("Calibri", 42),
+    "WIN_FONT": ("Sans", 45),
+    "SMALL_FONT": ("Consolas", 16),
+}
+
+
+class AssetRegistry:
+    """
+    A class used to load the assets of the game on demand.
+
+    Each asset (see IMAGES and FONTS) is loaded by the first access to the
+    attribute of the same name, then stored as a plain attribute: the next
+    accesses cost nothing.
+
+    Attributes
+    ----------
+    directory: string
+        Folder of the images.
+    loaded: int
+        Number of assets loaded so far.
+    load_time: float
+        Time spent loading them (in seconds).
+
+    Methods
+    -------
+    load_all(self) -> None:
+        Load every asset at once.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, directory):
+        """Constructor.
+
+        Parameter
+        ---------
+        directory: string (required)
+            Folder of the images.
+        """
+
+        self.directory = directory
+        self.loaded = 0
+        self.load_time = 0.0
+
+    def __getattr__(self, name):
+        # Only called for the assets which are not loaded yet
+        start = time.perf_counter()
+        if name in IMAGES:
+            value = self._load_image(*IMAGES[name])
+        elif name in FONTS:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            value = pygame.font.SysFont(*FONTS[name])
+        elif name == "MARBLE_IMGS":
+            value = {1: self.MARBLE_FREE, 2: self.MARBLE_BLUE, 3: self.MARBLE_YELLOW}
+        elif name == "MARBLE_DEBUG":
+            value = {self.MARBLE_FREE: "Free", self.MARBLE_BLUE: "Blue",
+                     self.MARBLE_YELLOW: "Yellow", self.MARBLE_BROWN: "Brown"}
+        else:
+            raise AttributeError(f"Unknown asset: {name}")
+        setattr(self, name, value)
+        self.loaded += 1
+        self.load_time += time.perf_counter() - start
+        return value
+
+    # Methods
+    # -------
+    def load_all(self) -> None:
+        """Load every asset at once."""
+        for name in (*IMAGES, *FONTS, "MARBLE_IMGS", "MARBLE_DEBUG"):
+            getattr(self, name)
+
+    def _load_image(self, file_name, alpha, zoom) -> pygame.Surface:
+        image = pygame.image.load(os.path.join(self.directory, file_name))
+        image = image.convert_alpha()
+        if alpha is not None:
+            image.set_alpha(alpha)
+        if zoom != 1:
+            image = pygame.transform.rotozoom(image, 0, zoom)
+        return image
+
+
+ASSETS = AssetRegistry(IMAGES_DIR)
+
+
+def main():
+    if "DISPLAY" not in os.environ and sys.platform.startswith("linux"):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    start = time.perf_counter()
+    import abalone  # noqa: F401 (measures the import time)
+    imported = time.perf_counter() - start
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    ASSETS.load_all()
+    print(f"Importing the game: {imported * 1e3:.1f} ms")
+    print(f"Loading {ASSETS.loaded} assets: {ASSETS.load_time * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
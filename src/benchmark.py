@@ -0,0 +1,365 @@
+"""Measures the cost of the game's hot paths and compares it to a baseline.
+
+Each benchmark repeats a scripted step (e.g. a mouse drag over the board,
+a frame of the marbles) and reports its best time per operation, in
+microseconds. The results are compared to a baseline measured on the same
+machine (see BASELINE, created by --save-baseline: timings of another
+machine would not be comparable, none is shipped). A benchmark slower
+than the baseline by more than the tolerance is reported as a
+regression, and the exit status is 1.
+
+Benchmarks:
+- drag_single: picking a marble up (compute_destinations) and moving it
+  over its neighbours (select_single_marble), per mouse motion.
+- drag_range: selecting 3 marbles and moving them to a legal spot, then
+  again to an illegal one (select_marbles_range, compute_new_marbles_range),
+  per mouse motion.
+- buffers: set_buffers (without picking a marble up), 3 marbles
+  recolored, then apply_buffers.
+- recolor_marbles: a scan of the highlights to reset.
+- display_marbles_*: a frame of the marbles drawn by the Renderer, when
+  nothing changed (idle), a single marble changed (one) or the whole
+  window must be redrawn (full).
+- construct_*: a game built from each configuration.
+
+The game window is not shown (SDL's dummy video driver is used if no
+display is available):
+
+    python benchmark.py --save-baseline  # first run on a machine
+    python benchmark.py [--quick] [--filter drag] [--output results.json]
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import pygame
+import board as rules
+from abalone import Abalone
+from assets import ASSETS
+from bitboard import BitBoard
+from movegen import generate_moves
+from renderer import Renderer
+from constants import SIZE_X, SIZE_Y
+from configurations import CONFIGURATIONS, STANDARD
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "benchmark_baseline.json")
+TOLERANCE = 0.5
+# Minimum duration of a timed run and number of runs (best one is kept)
+MIN_TIME = 0.2
+REPEAT = 5
+
+
+def measure(step, ops=1, min_time=MIN_TIME, repeat=REPEAT) -> dict:
+    """Times a step, repeated enough to last at least min_time.
+
+    As timeit does, the garbage collector is disabled while timing.
+
+    Parameters
+    ----------
+    step: function (required)
+        Step to time, without argument.
+    ops: int (optional, default=1)
+        Number of operations performed by a step.
+    min_time: float (optional, default=MIN_TIME)
+        Minimum duration of a run (in seconds).
+    repeat: int (optional, default=REPEAT)
+        Number of runs.
+
+    Returns
+    -------
+    dict
+        Best and median time per operation (in microseconds), and number
+        of operations per run.
+    """
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(step, ops, min_time, repeat)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _measure(step, ops, min_time, repeat) -> dict:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            step()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        number *= 2
+    number = max(1, round(number * min_time / elapsed))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            step()
+        times.append((time.perf_counter() - start) / (number * ops) * 1e6)
+    return {"us": min(times), "median_us": statistics.median(times),
+            "ops": number * ops}
+
+
+def _center(game, cell) -> tuple:
+    # Mouse position over a cell, slightly off its center
+    x, y = game.marbles_rect[cell].center
+    return x + 3, y + 2
+
+
+def drag_single():
+    """A marble moved over each of its neighbours, then dropped back."""
+    game = Abalone(STANDARD, rules.BLUE)
+    moves = generate_moves(BitBoard.from_board(game.board))
+    origin = max(range(rules.N_CELLS), key=lambda cell: sum(
+        1 for move in moves if move[0] == cell and move[2] == 1))
+    path = [_center(game, cell) for cell in rules.NEIGHBORS[origin]
+            if cell != rules.OFF]
+    path.append(_center(game, origin))
+
+    def step():
+        rect = game.marbles_rect[origin].copy()
+        game.set_buffers(rect.topleft)
+        game.recolor_marble(rect.topleft, ASSETS.MARBLE_FREE)
+        for pos in path:
+            rect.center = pos
+            game.select_single_marble(pos, rect)
+        game.apply_buffers()
+        game.clear_buffers()
+    return step, len(path)
+
+
+def drag_range():
+    """3 marbles selected and moved to a legal spot, then to an illegal one."""
+    game = Abalone(STANDARD, rules.BLUE)
+    moves = generate_moves(BitBoard.from_board(game.board))
+    origin, direction, count, axis = next(
+        move for move in moves
+        if move[2] == 3 and move[1] not in (move[3], rules.opposite(move[3])))
+    cells = [origin]
+    while len(cells) < count:
+        cells.append(rules.NEIGHBORS[cells[-1]][axis])
+    selection = [game.marbles_rect[cell] for cell in cells]
+    legal = game.marbles_rect[rules.NEIGHBORS[cells[-1]][direction]]
+    illegal = game.marbles_rect[next(
+        cell for cell in range(rules.N_CELLS)
+        if game.board.cells[cell] == rules.FREE
+        and rules.direction_towards(cells[-1], cell) is not None
+        and not game.board.is_legal(
+            (origin, rules.direction_towards(cells[-1], cell), count, axis)))]
+
+    def step():
+        for target in (legal, illegal):
+            game.set_buffers()
+            for rect in selection:
+                game.select_marbles_range(rect)
+            game.compute_new_marbles_range(target)
+            game.apply_buffers()
+            game.clear_buffers()
+            game.marbles_2_change.clear()
+    return step, 2 * (len(selection) + 1)
+
+
+def buffers():
+    """Buffers set, 3 marbles recolored, then restored."""
+    game = Abalone(STANDARD, rules.BLUE)
+    marbles = game.cells_topleft[:3]
+
+    def step():
+        game.set_buffers()
+        for marble in marbles:
+            game.recolor_marble(marble, ASSETS.MARBLE_GREEN)
+        game.apply_buffers()
+    return step, 1
+
+
+def recolor_marbles():
+    """The highlights scanned for the green and red marbles to reset."""
+    game = Abalone(STANDARD, rules.BLUE)
+    target = game.cells_topleft[rules.N_CELLS // 2]
+
+    def step():
+        game.recolor_marbles(target, [ASSETS.MARBLE_GREEN, ASSETS.MARBLE_RED],
+                             ASSETS.MARBLE_RED)
+        game.apply_buffers()
+    return step, 1
+
+
+def display_marbles(change):
+    """A frame of the marbles, given what changes between two frames."""
+    def setup():
+        game = Abalone(STANDARD, rules.BLUE)
+        renderer = Renderer(pygame.display.get_surface(),
+                            game.build_background((SIZE_X, SIZE_Y)))
+        marble = game.cells_topleft[0]
+        frames = [0]
+
+        def step():
+            if change == "one":
+                if frames[0] % 2:
+                    game.apply_buffers()
+                else:
+                    game.recolor_marble(marble, ASSETS.MARBLE_GREEN)
+            elif change == "full":
+                renderer.invalidate()
+            frames[0] += 1
+            game.display_marbles(renderer)
+            renderer.present()
+        return step, 1
+    return setup
+
+
+def construct(configuration):
+    """A game built from a configuration."""
+    def setup():
+        def step():
+            Abalone(configuration, rules.BLUE)
+        return step, 1
+    return setup
+
+
+BENCHMARKS = {
+    "drag_single": drag_single,
+    "drag_range": drag_range,
+    "buffers": buffers,
+    "recolor_marbles": recolor_marbles,
+    "display_marbles_idle": display_marbles("idle"),
+    "display_marbles_one": display_marbles("one"),
+    "display_marbles_full": display_marbles("full"),
+    **{f"construct_{name}": construct(configuration)
+       for name, configuration in CONFIGURATIONS.items()},
+}
+
+
+def run(names, min_time=MIN_TIME, repeat=REPEAT) -> dict:
+    """Runs benchmarks.
+
+    Parameters
+    ----------
+    names: list of strings (required)
+        Benchmarks to run (see BENCHMARKS).
+    min_time: float (optional, default=MIN_TIME)
+        Minimum duration of a timed run (in seconds).
+    repeat: int (optional, default=REPEAT)
+        Number of runs of each benchmark.
+
+    Returns
+    -------
+    dict
+        Results by benchmark (see measure).
+    """
+
+    results = {}
+    for name in names:
+        step, ops = BENCHMARKS[name]()
+        results[name] = measure(step, ops, min_time, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE) -> list:
+    """Compares results to a baseline.
+
+    Parameters
+    ----------
+    results: dict (required)
+        Results by benchmark (see run).
+    baseline: dict (required)
+        Baseline results by benchmark.
+    tolerance: float (optional, default=TOLERANCE)
+        Slowdown allowed before reporting a regression (0.5: 50%).
+
+    Returns
+    -------
+    list of tuples
+        (name, time, baseline time or None, ratio or None, regression).
+    """
+
+    rows = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append((name, result["us"], None, None, False))
+            continue
+        ratio = result["us"] / reference["us"]
+        rows.append((name, result["us"], reference["us"], ratio,
+                     ratio > 1 + tolerance))
+    return rows
+
+
+def environment() -> dict:
+    """Describes the machine the benchmarks ran on."""
+    return {"python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "video_driver": pygame.display.get_driver()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the game's hot paths.")
+    parser.add_argument("--filter", default="",
+                        help="only run the benchmarks containing this text")
+    parser.add_argument("--quick", action="store_true",
+                        help="shorter runs (less accurate)")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="JSON file of the results to compare to")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="slowdown allowed (0.5: 50%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    args = parser.parse_args()
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if not names:
+        parser.error(f"No benchmark matches \"{args.filter}\"")
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"No baseline \"{args.baseline}\": measure one on this "
+                     "machine first, with --save-baseline")
+
+    if "DISPLAY" not in os.environ and sys.platform.startswith("linux"):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((SIZE_X, SIZE_Y))
+    if args.quick:
+        results = run(names, MIN_TIME / 4, 3)
+    else:
+        results = run(names)
+    report = {"environment": environment(), "results": results}
+
+    baseline = {}
+    if not args.save_baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    print(f"{'benchmark':<26}{'us/op':>10}{'baseline':>10}{'ratio':>8}")
+    regressions = 0
+    for name, us, reference, ratio, regression in compare(
+            results, baseline, args.tolerance):
+        if reference is None:
+            print(f"{name:<26}{us:>10.2f}{'-':>10}{'-':>8}")
+        else:
+            print(f"{name:<26}{us:>10.2f}{reference:>10.2f}{ratio:>8.2f}"
+                  + ("  REGRESSION" if regression else ""))
+        regressions += regression
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"Baseline saved in \"{args.baseline}\"")
+    pygame.quit()
+    sys.exit(1 if regressions and not args.save_baseline else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""Implements a bitboard representation of the Abalone board.
+
+The positions of the blue and yellow marbles are stored as two integer
+masks, so that the rules can be checked with a few bitwise operations.
+It is meant to be used by search-heavy code (move generation, computer
+players...), the board.py module remaining the reference implementation.
+
+Layout
+------
+Each cell is mapped to a bit using axial coordinates (q, r) on a 10x9 grid:
+bit = 10 * r + q. The 10th column is never set and acts as a guard, hence
+moving every marble of a mask one step towards a direction is a single
+shift (see SHIFTS) followed by a mask with BOARD.
+Cells keep the same integer IDs as in board.py: CELL_BITS and BIT_CELLS
+convert them to and from bit indices.
+
+Hashing
+-------
+Each position has a 64-bit Zobrist hash (cells contents, color being played
+and number of dead marbles of each color), updated incrementally on every
+move. The keys are drawn from a seeded generator, hence the hashes are the
+same in every process.
+"""
+
+import random
+from board import (BLUE, YELLOW, FREE, N_CELLS, COORDS, DIRECTIONS,
+                   MAX_PUSHING, LOSING_DEAD, Board, enemy, opposite)
+from configurations import STANDARD
+
+GRID_WIDTH = 10
+# Shift of a bit index for each one of board.DIRECTIONS
+SHIFTS = tuple(GRID_WIDTH * d_row + (d_col - d_row) // 2
+               for d_row, d_col in DIRECTIONS)
+
+CELL_BITS = tuple(GRID_WIDTH * row + (col - row) // 2 + 2
+                  for row, col in COORDS)
+BIT_CELLS = {bit: cell for cell, bit in enumerate(CELL_BITS)}
+BOARD = sum(1 << bit for bit in CELL_BITS)
+
+
+def shift(mask, direction) -> int:
+    """Move every cell of a mask one step towards a direction.
+
+    Cells moved outside of the board are dropped.
+
+    Parameters
+    ----------
+    mask: int (required)
+        Cells to move.
+    direction: int (required)
+        One of board.DIRECTIONS' indices.
+
+    Returns
+    -------
+    int
+        The moved cells.
+    """
+
+    step = SHIFTS[direction]
+    if step > 0:
+        return (mask << step) & BOARD
+    return (mask >> -step) & BOARD
+
+
+def popcount(mask) -> int:
+    """Returns the number of cells in a mask."""
+    return bin(mask).count("1")
+
+
+def cells_of(mask) -> list:
+    """Returns the IDs of the cells in a mask (increasing bit order)."""
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(BIT_CELLS[low.bit_length() - 1])
+        mask ^= low
+    return cells
+
+
+def mask_of(cells) -> int:
+    """Returns the mask of some cells given their IDs."""
+    mask = 0
+    for cell in cells:
+        mask |= 1 << CELL_BITS[cell]
+    return mask
+
+
+# Masks of each cell (by ID)
+CELL_MASKS = tuple(1 << bit for bit in CELL_BITS)
+# NEIGHBOR_MASKS[direction][cell]: neighbor of a cell (0 if off the board)
+NEIGHBOR_MASKS = tuple(
+    tuple(shift(cell_mask, direction) for cell_mask in CELL_MASKS)
+    for direction in range(6))
+
+
+def _ray(cell_mask, direction) -> int:
+    ray = 0
+    cell_mask = shift(cell_mask, direction)
+    while cell_mask:
+        ray |= cell_mask
+        cell_mask = shift(cell_mask, direction)
+    return ray
+
+
+# RAYS[direction][cell]: cells met from a cell (excluded) towards the edge
+RAYS = tuple(
+    tuple(_ray(cell_mask, direction) for cell_mask in CELL_MASKS)
+    for direction in range(6))
+# EDGES[direction]: cells whose neighbor towards direction is off the board
+EDGES = tuple(BOARD & ~shift(BOARD, opposite(direction))
+              for direction in range(6))
+
+# Zobrist keys
+_keys = random.Random(0xABA10E)
+# CELL_KEYS[color][bit]: key of a marble of a given color (by bit index)
+CELL_KEYS = {color: [_keys.getrandbits(64) for _ in range(GRID_WIDTH * 9)]
+             for color in (BLUE, YELLOW)}
+# DEAD_KEYS[color][n]: key of n dead marbles of a given color
+DEAD_KEYS = {color: [_keys.getrandbits(64) for _ in range(N_CELLS)]
+             for color in (BLUE, YELLOW)}
+# Key xored in whenever YELLOW is being played
+TURN_KEY = _keys.getrandbits(64)
+
+
+def mask_key(mask, color) -> int:
+    """Returns the Zobrist key of the marbles of a mask for a given color."""
+    keys = CELL_KEYS[color]
+    key = 0
+    while mask:
+        low = mask & -mask
+        key ^= keys[low.bit_length() - 1]
+        mask ^= low
+    return key
+
+
+class BitBoard:
+    """
+    A class used to represent the state of an Abalone game with bitboards.
+
+    Moves are the same tuples as in board.py. Instead of a list of changes,
+    resolve returns xor masks, playing a move being a matter of applying
+    them to the masks of each color.
+
+    Attributes
+    ----------
+    blue: int
+        Mask of the blue marbles.
+    yellow: int
+        Mask of the yellow marbles.
+    dead: dict
+        Number of marbles pushed off the board, by color.
+    turn: int
+        Color being played (BLUE or YELLOW).
+    hash: int
+        Zobrist hash of the position.
+
+    Methods
+    -------
+    compute_hash(self) -> int:
+        Computes the Zobrist hash of the position from scratch.
+    copy(self) -> BitBoard:
+        Returns an independent copy of the board.
+    masks(self) -> tuple:
+        Returns the masks of the color being played and its enemy.
+    empty(self) -> int:
+        Returns the mask of the free cells.
+    resolve(self, move) -> tuple:
+        Computes the xor masks of a move, without playing it.
+    is_legal(self, move) -> bool:
+        Check if a move can be played.
+    play(self, move) -> tuple:
+        Play a move and hand over to the enemy.
+    undo(self, record) -> None:
+        Take back a move given the record returned by play.
+    winner(self) -> int:
+        Returns the winning color, if any.
+    to_board(self) -> Board:
+        Returns the equivalent board.py Board.
+
+    Class Methods
+    -------------
+    from_board(board) -> BitBoard:
+        Build a bitboard from a board.py Board.
+    from_configuration(configuration, turn) -> BitBoard:
+        Build a bitboard from one of the configurations.
+    """
+
+    __slots__ = ("blue", "yellow", "dead", "turn", "hash")
+
+    # Constructor
+    # -----------
+    def __init__(self, blue=0, yellow=0, turn=BLUE, dead=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        blue: int (optional, default=0)
+            Mask of the blue marbles.
+        yellow: int (optional, default=0)
+            Mask of the yellow marbles.
+        turn: int (optional, default=BLUE)
+            Color being played.
+        dead: dict (optional, default=None)
+            Number of dead marbles by color, none if None.
+        """
+
+        self.blue = blue
+        self.yellow = yellow
+        self.turn = turn
+        self.dead = dict(dead) if dead else {BLUE: 0, YELLOW: 0}
+        self.hash = self.compute_hash()
+
+    # Class Methods
+    # -------------
+    @classmethod
+    def from_board(cls, board):
+        """Build a bitboard from a board.py Board."""
+        blue = yellow = 0
+        for cell, state in enumerate(board.cells):
+            if state == BLUE:
+                blue |= CELL_MASKS[cell]
+            elif state == YELLOW:
+                yellow |= CELL_MASKS[cell]
+        return cls(blue, yellow, board.turn, board.dead)
+
+    @classmethod
+    def from_configuration(cls, configuration=STANDARD, turn=BLUE):
+        """Build a bitboard from one of the configurations."""
+        return cls.from_board(Board(configuration, turn))
+
+    # Methods
+    # -------
+    def compute_hash(self) -> int:
+        """Computes the Zobrist hash of the position from scratch."""
+        key = (mask_key(self.blue, BLUE) ^ mask_key(self.yellow, YELLOW)
+               ^ DEAD_KEYS[BLUE][self.dead[BLUE]]
+               ^ DEAD_KEYS[YELLOW][self.dead[YELLOW]])
+        if self.turn == YELLOW:
+            key ^= TURN_KEY
+        return key
+
+    def copy(self):
+        """Returns an independent copy of the board."""
+        bitboard = BitBoard.__new__(BitBoard)
+        bitboard.blue = self.blue
+        bitboard.yellow = self.yellow
+        bitboard.turn = self.turn
+        bitboard.dead = dict(self.dead)
+        bitboard.hash = self.hash
+        return bitboard
+
+    def masks(self) -> tuple:
+        """Returns the masks of the color being played and its enemy."""
+        if self.turn == BLUE:
+            return self.blue, self.yellow
+        return self.yellow, self.blue
+
+    def empty(self) -> int:
+        """Returns the mask of the free cells."""
+        return BOARD & ~(self.blue | self.yellow)
+
+    def resolve(self, move):
+        """Computes the xor masks of a move, without playing it.
+
+        The rules are the same as in Board.resolve_inline and
+        Board.resolve_broadside.
+
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            (origin, direction, count, axis), see board.py.
+
+        Returns
+        -------
+        tuple or None
+            None if the move is illegal. Otherwise (own_xor, foe_xor, ejected)
+            where own_xor and foe_xor are the masks to xor with the masks of
+            the color being played and its enemy, ejected the color of the
+            marble pushed off the board (None if no marble is).
+        """
+
+        origin, direction, count, axis = move
+        own, foe = self.masks()
+        origin_mask = CELL_MASKS[origin]
+        if not own & origin_mask:
+            return None
+
+        if count > 1:
+            # broadside
+            if direction in (axis, opposite(axis)) or count > MAX_PUSHING:
+                return None
+            line = origin_mask
+            for _ in range(count - 1):
+                line |= shift(line, axis)
+            targets = shift(line, direction)
+            if (popcount(line & own) != count or popcount(targets) != count
+                    or targets & (own | foe)):
+                return None
+            return line | targets, 0, None
+
+        # inline move
+        n_friends = 1
+        front = shift(origin_mask, direction)
+        while front & own:
+            n_friends += 1
+            front = shift(front, direction)
+        if n_friends > MAX_PUSHING or not front:
+            return None
+        if not front & foe:
+            return origin_mask | front, 0, None
+        # sumito
+        n_foes = 0
+        end = front
+        while end & foe:
+            n_foes += 1
+            end = shift(end, direction)
+        if n_foes >= n_friends or end & own:
+            return None
+        if not end:
+            return origin_mask | front, front, enemy(self.turn)
+        return origin_mask | front, front | end, None
+
+    def is_legal(self, move) -> bool:
+        """Check if a move can be played."""
+        return self.resolve(move) is not None
+
+    def play(self, move):
+        """Play a move and hand over to the enemy.
+
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            (origin, direction, count, axis), see board.py.
+
+        Returns
+        -------
+        tuple
+            (own_xor, foe_xor, ejected), see resolve. It is also the undo
+            record of the move: applying the same masks takes it back.
+
+        Raises
+        ------
+        ValueError
+            If the move is illegal.
+        """
+
+        result = self.resolve(move)
+        if result is None:
+            raise ValueError(f"Illegal move: {move}")
+        self._toggle(result, self.turn)
+        if result[2]:
+            self.dead[result[2]] += 1
+        self.turn = enemy(self.turn)
+        return result
+
+    def undo(self, record) -> None:
+        """Take back a move given the record returned by play.
+
+        Parameter
+        ---------
+        record: tuple (required)
+            Undo record of the last move played.
+        """
+
+        self.turn = enemy(self.turn)
+        if record[2]:
+            self.dead[record[2]] -= 1
+        self._toggle(record, self.turn)
+
+    def _toggle(self, record, color) -> None:
+        # Applies the xor masks of a move played by color, and updates the
+        # hash (the dead counters must be the ones before the move)
+        own_xor, foe_xor, ejected = record
+        foe = enemy(color)
+        if color == BLUE:
+            self.blue ^= own_xor
+            self.yellow ^= foe_xor
+        else:
+            self.yellow ^= own_xor
+            self.blue ^= foe_xor
+        key = mask_key(own_xor, color) ^ mask_key(foe_xor, foe) ^ TURN_KEY
+        if ejected:
+            dead = self.dead[ejected]
+            key ^= DEAD_KEYS[ejected][dead] ^ DEAD_KEYS[ejected][dead + 1]
+        self.hash ^= key
+
+    def winner(self):
+        """Returns the winning color, None if the game is not over."""
+        if self.dead[BLUE] >= LOSING_DEAD:
+            return YELLOW
+        if self.dead[YELLOW] >= LOSING_DEAD:
+            return BLUE
+        return None
+
+    def to_board(self):
+        """Returns the equivalent board.py Board."""
+        board = Board.__new__(Board)
+        board.configuration = None
+        board.cells = [FREE] * N_CELLS
+        for cell in cells_of(self.blue):
+            board.cells[cell] = BLUE
+        for cell in cells_of(self.yellow):
+            board.cells[cell] = YELLOW
+        board.dead = dict(self.dead)
+        board.turn = self.turn
+        return board
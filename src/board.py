@@ -0,0 +1,403 @@
+"""Implements the Abalone rules without any display.
+
+This module does not import pygame: it can be used on headless servers
+to validate moves, run simulations or computer players.
+
+The 61 cells of the hexagonal board are identified by integers (0 to 60),
+numbered row by row from the top-left corner, i.e. in the same order as
+the configurations defined in configurations.py.
+Each cell holds a small integer: FREE, BLUE or YELLOW.
+
+Each cell also has (row, column) coordinates where the column is counted
+in half-steps: horizontal neighbors are 2 columns apart whereas diagonal
+neighbors are 1 row and 1 column apart.
+
+A move is a tuple (origin, direction, count, axis):
+- count == 1: inline move. The marble on origin is moved towards direction,
+  pushing the friendly marbles in front of it (and a sumito if possible).
+  axis is ignored (by convention, it is equal to direction).
+- count in (2, 3): broadside move. The count marbles starting from origin
+  along axis (one of AXES) are all moved one step towards direction.
+"""
+
+import random
+from configurations import STANDARD
+
+# Cells states (same values as the configurations)
+FREE, BLUE, YELLOW = 1, 2, 3
+# Neighbor of a border cell, i.e. outside of the board
+OFF = -1
+
+N_CELLS = 61
+ROW_LENGTHS = (5, 6, 7, 8, 9, 8, 7, 6, 5)
+MAX_PUSHING = 3
+LOSING_DEAD = 6
+
+# Directions as (row, column) steps, ordered clockwise.
+# The opposite of a direction d is (d + 3) % 6.
+DIRECTIONS = ((0, 2), (1, 1), (1, -1), (0, -2), (-1, -1), (-1, 1))
+EAST, SOUTH_EAST, SOUTH_WEST, WEST, NORTH_WEST, NORTH_EAST = range(6)
+AXES = (EAST, SOUTH_EAST, SOUTH_WEST)
+
+COORDS = tuple(
+    (row, 2 * col + 9 - length)
+    for row, length in enumerate(ROW_LENGTHS)
+    for col in range(length))
+CELL_AT = {coords: cell for cell, coords in enumerate(COORDS)}
+NEIGHBORS = tuple(
+    tuple(CELL_AT.get((row + d_row, col + d_col), OFF)
+          for d_row, d_col in DIRECTIONS)
+    for row, col in COORDS)
+
+
+def enemy(color) -> int:
+    """Returns the enemy of a given color (BLUE or YELLOW)."""
+    return BLUE if color == YELLOW else YELLOW
+
+
+def opposite(direction) -> int:
+    """Returns the opposite of a given direction."""
+    return (direction + 3) % 6
+
+
+def direction_between(origin, target):
+    """Returns the direction from a cell to one of its neighbors.
+
+    Parameters
+    ----------
+    origin: int (required)
+        Initial cell
+    target: int (required)
+        Neighbor cell
+
+    Returns
+    -------
+    int or None
+        The direction, None if target is not a neighbor of origin.
+    """
+
+    try:
+        return NEIGHBORS[origin].index(target)
+    except ValueError:
+        return None
+
+
+def direction_towards(origin, target) -> int:
+    """Returns the direction pointing from a cell towards any other cell.
+
+    Both cells do not need to be neighbors: a horizontal direction is
+    returned if they share the same row, a diagonal one otherwise.
+
+    Parameters
+    ----------
+    origin: int (required)
+        Initial cell
+    target: int (required)
+        Targeted cell
+
+    Returns
+    -------
+    int
+        The direction.
+    """
+
+    o_row, o_col = COORDS[origin]
+    t_row, t_col = COORDS[target]
+    k = 2 if t_col > o_col else -2
+    if t_row == o_row:
+        return DIRECTIONS.index((0, k))
+    j = 1 if t_row > o_row else -1
+    return DIRECTIONS.index((j, k // 2))
+
+
+def line_of(cells):
+    """Checks if some cells form a line along a common axis.
+
+    Parameter
+    ---------
+    cells: iterable of ints (required)
+        Cells to check, in any order.
+
+    Returns
+    -------
+    tuple of ints or None
+        (first cell, axis) if the cells are connected along one of AXES,
+        None otherwise.
+    """
+
+    cells = set(cells)
+    for first in cells:
+        for axis in AXES:
+            line = [first]
+            while len(line) < len(cells):
+                line.append(NEIGHBORS[line[-1]][axis])
+            if set(line) == cells:
+                return first, axis
+    return None
+
+
+class Board:
+    """
+    A class used to represent the state of an Abalone game.
+
+    Attributes
+    ----------
+    configuration: tuple of lists (optional, default=STANDARD)
+        Initial board configuration.
+    cells: list of ints
+        State (FREE, BLUE or YELLOW) of each cell.
+    dead: dict
+        Number of marbles pushed off the board, by color.
+    turn: int
+        Color being played (BLUE or YELLOW).
+
+    Methods
+    -------
+    reset(self, turn=None) -> None:
+        Place the marbles to their initial position.
+    copy(self) -> Board:
+        Returns an independent copy of the board.
+    marbles(self, color) -> list:
+        Returns the cells holding a given color.
+    resolve(self, move) -> tuple:
+        Computes the consequences of a move, without playing it.
+    resolve_inline(self, origin, direction) -> tuple:
+        Computes the consequences of an inline move (push or sumito).
+    resolve_broadside(self, origin, direction, count, axis) -> tuple:
+        Computes the consequences of a broadside move.
+    is_legal(self, move) -> bool:
+        Check if a move can be played.
+    play(self, move) -> tuple:
+        Play a move and hand over to the enemy.
+    undo(self, record) -> None:
+        Take back a move given the record returned by play.
+    winner(self) -> int:
+        Returns the winning color, if any.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, configuration=STANDARD, turn=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        configuration: tuple of lists (optional, default=STANDARD)
+            Initial positions of the marbles on the board.
+        turn: int (optional, default=None)
+            First color to play, randomly chosen if None.
+        """
+
+        self.configuration = configuration
+        self.cells = []
+        self.dead = {BLUE: 0, YELLOW: 0}
+        self.turn = None
+        self.reset(turn)
+
+    # Methods
+    # -------
+    def reset(self, turn=None) -> None:
+        """Place the marbles to their initial position.
+
+        Parameter
+        ---------
+        turn: int (optional, default=None)
+            First color to play, randomly chosen if None.
+        """
+
+        self.cells = [state for row in self.configuration for state in row]
+        self.dead = {BLUE: 0, YELLOW: 0}
+        self.turn = turn if turn else random.choice((BLUE, YELLOW))
+
+    def copy(self):
+        """Returns an independent copy of the board."""
+        board = Board.__new__(Board)
+        board.configuration = self.configuration
+        board.cells = self.cells[:]
+        board.dead = dict(self.dead)
+        board.turn = self.turn
+        return board
+
+    def marbles(self, color) -> list:
+        """Returns the cells holding a given color."""
+        return [cell for cell, state in enumerate(self.cells) if state == color]
+
+    def resolve(self, move):
+        """Computes the consequences of a move, without playing it.
+
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            (origin, direction, count, axis), see the module's docstring.
+
+        Returns
+        -------
+        tuple or None
+            None if the move is illegal. Otherwise (changes, ejected) where
+            changes is a list of (cell, new state) and ejected the color
+            of the marble pushed off the board (None if no marble is).
+        """
+
+        origin, direction, count, axis = move
+        if count == 1:
+            return self.resolve_inline(origin, direction)
+        return self.resolve_broadside(origin, direction, count, axis)
+
+    def resolve_inline(self, origin, direction):
+        """Computes the consequences of an inline move (push or sumito).
+
+        More than 3 friendly marbles cannot be moved at the same time.
+        A sumito is invalid if the number of enemy marbles is higher
+        or equal to the number of friendly marbles, or if the enemy marbles
+        are followed by a friendly marble.
+        Friendly marbles cannot be pushed off the board.
+
+        Parameters
+        ----------
+        origin: int (required)
+            Last marble of the moved line.
+        direction: int (required)
+            Direction of the move.
+
+        Returns
+        -------
+        tuple or None
+            See resolve.
+        """
+
+        cells = self.cells
+        color = self.turn
+        if cells[origin] != color:
+            return None
+        n_friends = 1
+        cell = NEIGHBORS[origin][direction]
+        while cell != OFF and cells[cell] == color:
+            n_friends += 1
+            cell = NEIGHBORS[cell][direction]
+        if n_friends > MAX_PUSHING or cell == OFF:
+            return None
+        if cells[cell] == FREE:
+            return [(origin, FREE), (cell, color)], None
+
+        # sumito
+        front = cell
+        foe = cells[cell]
+        n_foes = 0
+        while cell != OFF and cells[cell] == foe:
+            n_foes += 1
+            cell = NEIGHBORS[cell][direction]
+        if n_foes >= n_friends:
+            return None
+        if cell == OFF:
+            return [(origin, FREE), (front, color)], foe
+        if cells[cell] != FREE:
+            return None
+        return [(origin, FREE), (front, color), (cell, foe)], None
+
+    def resolve_broadside(self, origin, direction, count, axis):
+        """Computes the consequences of a broadside move.
+
+        All the marbles of the line are moved towards a direction which is
+        not the line's axis. All their new spots must be free.
+
+        Parameters
+        ----------
+        origin: int (required)
+            First marble of the line.
+        direction: int (required)
+            Direction of the move.
+        count: int (required)
+            Number of marbles in the line (2 or 3).
+        axis: int (required)
+            Axis of the line (one of AXES).
+
+        Returns
+        -------
+        tuple or None
+            See resolve.
+        """
+
+        if count > MAX_PUSHING or direction in (axis, opposite(axis)):
+            return None
+        cells = self.cells
+        color = self.turn
+        freed, taken = [], []
+        cell = origin
+        for _ in range(count):
+            if cell == OFF or cells[cell] != color:
+                return None
+            target = NEIGHBORS[cell][direction]
+            if target == OFF or cells[target] != FREE:
+                return None
+            freed.append((cell, FREE))
+            taken.append((target, color))
+            cell = NEIGHBORS[cell][axis]
+        return freed + taken, None
+
+    def is_legal(self, move) -> bool:
+        """Check if a move can be played."""
+        return self.resolve(move) is not None
+
+    def play(self, move):
+        """Play a move and hand over to the enemy.
+
+        Only the cells changed by the move are updated.
+
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            (origin, direction, count, axis), see the module's docstring.
+
+        Returns
+        -------
+        tuple
+            Undo record (previous, ejected) where previous is the list of
+            (cell, previous state) of the changed cells and ejected the color
+            of the marble pushed off the board (None if no marble is).
+
+        Raises
+        ------
+        ValueError
+            If the move is illegal.
+        """
+
+        result = self.resolve(move)
+        if result is None:
+            raise ValueError(f"Illegal move: {move}")
+        changes, ejected = result
+        cells = self.cells
+        previous = [(cell, cells[cell]) for cell, _ in changes]
+        for cell, state in changes:
+            cells[cell] = state
+        if ejected:
+            self.dead[ejected] += 1
+        self.turn = enemy(self.turn)
+        return previous, ejected
+
+    def undo(self, record) -> None:
+        """Take back a move given the record returned by play.
+
+        Parameter
+        ---------
+        record: tuple (required)
+            Undo record of the last move played.
+        """
+
+        previous, ejected = record
+        for cell, state in previous:
+            self.cells[cell] = state
+        if ejected:
+            self.dead[ejected] -= 1
+        self.turn = enemy(self.turn)
+
+    def winner(self):
+        """Returns the winning color, None if the game is not over.
+
+        A player loses whenever 6 of their marbles are out.
+        """
+
+        if self.dead[BLUE] >= LOSING_DEAD:
+            return YELLOW
+        if self.dead[YELLOW] >= LOSING_DEAD:
+            return BLUE
+        return None
@@ -0,0 +1,333 @@
+"""Sends the moves of a match to its spectators.
+
+Each move played is encoded once as a DELTA message (the changed cells
+and the marble pushed off the board, see protocol.py), the same bytes
+being written to every spectator. A spectator joining late receives a
+KEYFRAME (the whole state, 71 bytes) then the following deltas.
+
+A spectator reading slower than the moves are played is not allowed to
+hold an ever growing buffer on the server: once more than `limit` bytes
+are waiting to be sent to them, they skip the deltas, and receive a
+single keyframe (coalescing all the moves they missed) when their buffer
+drained.
+
+Running this module measures the cost of a move's broadcast when the
+number of spectators grows, with in-memory spectators (a real socket per
+spectator would measure the operating system, not the fan-out):
+
+    python broadcaster.py --viewers 10 1000 10000 50000 [--slow 0.01]
+
+This module does not depend on pygame.
+"""
+
+import gc
+import time
+import random
+import argparse
+from board import BLUE
+from bitboard import BitBoard
+from game_state import GameState
+from game_record import encode_move
+from movegen import generate_moves
+from configurations import STANDARD
+from protocol import (HEADER, DELTA, KEYFRAME, pack, encode_delta,
+                      decode_delta, apply_delta, encode_keyframe,
+                      decode_keyframe)
+
+DEFAULT_LIMIT = 4096  # bytes waiting to be sent before a spectator lags
+SLOW_PERIOD = 50  # moves between two reads of a slow spectator (benchmark)
+
+
+class Broadcaster:
+    """
+    A class used to send the moves of a match to its spectators.
+
+    The spectators are asyncio transports (or any object with the write and
+    get_write_buffer_size methods).
+
+    Attributes
+    ----------
+    state: GameState
+        State of the match, played by the owner of the broadcaster.
+    ply: int
+        Number of moves played.
+    limit: int
+        Spectators with more bytes than this waiting to be sent lag.
+    viewers: set
+        Transports of the spectators.
+    lagging: set
+        Transports of the spectators skipping the deltas.
+    deltas: int
+        Number of deltas written (all spectators included).
+    keyframes: int
+        Number of keyframes written.
+    skipped: int
+        Number of deltas skipped by lagging spectators.
+
+    Methods
+    -------
+    subscribe(self, transport) -> None:
+        Add a spectator, sent a keyframe.
+    unsubscribe(self, transport) -> None:
+        Remove a spectator.
+    keyframe(self) -> bytes:
+        Returns the KEYFRAME message of the current state.
+    publish(self, message) -> None:
+        Send the delta of the move just played.
+    close(self, message) -> None:
+        Send a last message to the spectators and remove them.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, state, ply=0, limit=DEFAULT_LIMIT):
+        """Constructor.
+
+        Parameters
+        ----------
+        state: GameState (required)
+            State of the match, updated before each publish.
+        ply: int (optional, default=0)
+            Number of moves already played.
+        limit: int (optional, default=DEFAULT_LIMIT)
+            Spectators with more bytes than this waiting to be sent lag.
+        """
+
+        self.state = state
+        self.ply = ply
+        self.limit = limit
+        self.viewers = set()
+        self.lagging = set()
+        self.deltas = 0
+        self.keyframes = 0
+        self.skipped = 0
+        self._keyframe = None
+
+    # Methods
+    # -------
+    def subscribe(self, transport) -> None:
+        """Add a spectator, sent a keyframe.
+
+        Parameter
+        ---------
+        transport: asyncio.WriteTransport (required)
+            Connection to the spectator.
+        """
+
+        transport.write(self.keyframe())
+        self.keyframes += 1
+        self.viewers.add(transport)
+
+    def unsubscribe(self, transport) -> None:
+        """Remove a spectator."""
+        self.viewers.discard(transport)
+        self.lagging.discard(transport)
+
+    def keyframe(self) -> bytes:
+        """Returns the KEYFRAME message of the current state (cached)."""
+        if self._keyframe is None:
+            self._keyframe = pack(KEYFRAME,
+                                  encode_keyframe(self.ply, self.state))
+        return self._keyframe
+
+    def publish(self, message) -> None:
+        """Send the delta of the move just played.
+
+        Parameter
+        ---------
+        message: bytes (required)
+            DELTA message of the move, already played on the state.
+        """
+
+        self.ply += 1
+        self._keyframe = None
+        limit = self.limit
+        lagging = self.lagging
+        sent = skipped = 0
+        for transport in self.viewers:
+            if transport.get_write_buffer_size() > limit:
+                lagging.add(transport)
+                skipped += 1
+            elif transport in lagging:
+                # caught up: one keyframe instead of the deltas missed
+                transport.write(self.keyframe())
+                lagging.discard(transport)
+                self.keyframes += 1
+            else:
+                transport.write(message)
+                sent += 1
+        self.deltas += sent
+        self.skipped += skipped
+
+    def close(self, message) -> None:
+        """Send a last message to the spectators and remove them.
+
+        The lagging spectators are sent the final state first.
+
+        Parameter
+        ---------
+        message: bytes (required)
+            Last message (e.g. END).
+        """
+
+        for transport in self.viewers:
+            if transport in self.lagging:
+                transport.write(self.keyframe())
+                self.keyframes += 1
+            transport.write(message)
+        self.viewers.clear()
+        self.lagging.clear()
+
+
+class _Viewer:
+    # In-memory transport: the bytes written wait until read, every
+    # `period` moves
+    __slots__ = ("waiting", "period", "stream")
+
+    def __init__(self, period, keep=False):
+        self.waiting = 0
+        self.period = period
+        self.stream = bytearray() if keep else None
+
+    def write(self, data):
+        self.waiting += len(data)
+        if self.stream is not None:
+            self.stream += data
+
+    def get_write_buffer_size(self):
+        return self.waiting
+
+    def read(self, ply):
+        if ply % self.period == 0:
+            self.waiting = 0
+
+
+def replay_stream(stream) -> GameState:
+    """Returns the state rebuilt from the messages sent to a spectator.
+
+    Parameter
+    ---------
+    stream: bytes (required)
+        KEYFRAME and DELTA messages, starting with a keyframe.
+    """
+
+    state = None
+    position = 0
+    while position < len(stream):
+        kind, length = HEADER.unpack_from(stream, position)
+        position += HEADER.size
+        payload = bytes(stream[position:position + length])
+        position += length
+        if kind == KEYFRAME:
+            state = decode_keyframe(payload)[1]
+        elif kind == DELTA:
+            _, _, changes, ejected = decode_delta(payload)
+            apply_delta(state, changes, ejected)
+    return state
+
+
+def measure(viewers, moves, slow, limit, seed) -> dict:
+    """Measures the broadcast of a random game to spectators.
+
+    Parameters
+    ----------
+    viewers: int (required)
+        Number of spectators.
+    moves: int (required)
+        Number of moves played (fewer if the game is won).
+    slow: float (required)
+        Fraction of the spectators reading only every SLOW_PERIOD moves.
+    limit: int (required)
+        Bytes waiting to be sent before a spectator lags.
+    seed: int (required)
+        Seed of the moves.
+
+    Returns
+    -------
+    dict
+        Time to broadcast a move (per move and per spectator), bytes
+        sent per move to a fast and to a slow spectator, fraction of the
+        deltas skipped by the slow spectators.
+    """
+
+    rng = random.Random(seed)
+    state = GameState(STANDARD, BLUE)
+    broadcaster = Broadcaster(state, limit=limit)
+    n_slow = int(viewers * slow)
+    # the first spectator of each kind keeps its stream to check it
+    audience = [_Viewer(1, keep=i == 0) for i in range(viewers - n_slow)]
+    audience += [_Viewer(SLOW_PERIOD, keep=i == 0) for i in range(n_slow)]
+    for viewer in audience:
+        broadcaster.subscribe(viewer)
+
+    elapsed = 0.0
+    played = 0
+    gc.disable()
+    try:
+        for ply in range(moves):
+            move = rng.choice(generate_moves(BitBoard.from_board(
+                state.to_board())))
+            previous, ejected = state.play(move)
+            start = time.perf_counter()
+            changes = [(cell, state.cells[cell]) for cell, _ in previous]
+            broadcaster.publish(pack(DELTA, encode_delta(
+                ply, encode_move(move), changes, ejected)))
+            elapsed += time.perf_counter() - start
+            played += 1
+            for viewer in audience:
+                viewer.read(played)
+            if state.winner() is not None:
+                break
+    finally:
+        gc.enable()
+    broadcaster.close(b"")
+
+    checked = audience[:1] + audience[viewers - n_slow:][:1]
+    for viewer in checked:
+        if replay_stream(viewer.stream).to_bytes() != state.to_bytes():
+            raise AssertionError("A spectator's stream does not rebuild "
+                                 "the final state")
+    return {"viewers": viewers, "moves": played,
+            "us_per_move": elapsed / played * 1e6,
+            "ns_per_viewer": elapsed / played / viewers * 1e9,
+            "bytes_per_viewer": len(checked[0].stream) / played,
+            "slow_bytes_per_viewer": (len(checked[-1].stream) / played
+                                      if n_slow else None),
+            "skipped": (broadcaster.skipped / (n_slow * played)
+                        if n_slow else None)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cost of broadcasting a match to its spectators.")
+    parser.add_argument("--viewers", type=int, nargs="+",
+                        default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument("--moves", type=int, default=200,
+                        help="moves of the random game broadcast")
+    parser.add_argument("--slow", type=float, default=0.01,
+                        help="fraction of spectators reading only every "
+                        f"{SLOW_PERIOD} moves")
+    parser.add_argument("--limit", type=int, default=256,
+                        help="bytes waiting before a spectator lags (small, "
+                        "so that the slow spectators lag within a game)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'viewers':>8}{'us/move':>10}{'ns/viewer':>11}"
+          f"{'B/move':>8}{'slow B/move':>13}{'skipped':>9}")
+    for viewers in args.viewers:
+        result = measure(viewers, args.moves, args.slow, args.limit,
+                         args.seed)
+        slow = ("-" if result["skipped"] is None else
+                f"{result['slow_bytes_per_viewer']:.1f}")
+        skipped = ("-" if result["skipped"] is None else
+                   f"{result['skipped']:.0%}")
+        print(f"{viewers:>8}{result['us_per_move']:>10.0f}"
+              f"{result['ns_per_viewer']:>11.0f}"
+              f"{result['bytes_per_viewer']:>8.1f}{slow:>13}{skipped:>9}")
+    print(f"(a keyframe, i.e. the whole state, is "
+          f"{len(pack(KEYFRAME, encode_keyframe(0, GameState())))} bytes)")
+
+
+if __name__ == "__main__":
+    main()
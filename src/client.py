@@ -0,0 +1,167 @@
+"""Plays (or watches) a match hosted by the game server (see server.py).
+
+The connection is blocking: joining waits for an opponent, then a
+background thread receives the server's messages and hands them to a
+callback (e.g. posting a pygame event to the game loop, as the computer
+players do).
+
+This module does not depend on pygame.
+"""
+
+import socket
+import threading
+from game_state import GameState
+from game_record import encode_move, decode_move
+from protocol import (JOIN, START, MOVE, DELTA, ERROR, END, WATCH, KEYFRAME,
+                      START_FORMAT, MOVE_FORMAT, WATCH_FORMAT,
+                      CONFIGURATION_NAMES, pack, receive_message,
+                      decode_delta, apply_delta, decode_keyframe)
+
+
+class RemoteGame:
+    """
+    A class used to play a match of the game server.
+
+    Attributes
+    ----------
+    connection: socket.socket
+        Connection to the server.
+    stream: binary file
+        Messages of the server.
+    match: int
+        Identifier of the match.
+    color: int
+        Color played (BLUE or YELLOW), None for a spectator.
+    initial_state: GameState
+        State of the match when it started.
+    state: GameState
+        State of the match, updated by the background thread.
+    on_message: function
+        Called from the background thread with each message:
+        (DELTA, (ply, move, changes, ejected)), (KEYFRAME, (ply, state))
+        when a spectator fell behind, (ERROR, reason) or (END, winner),
+        the winner being None if a player left or the connection was lost.
+    thread: threading.Thread
+        Background thread receiving the messages.
+
+    Methods
+    -------
+    send_move(self, move) -> None:
+        Send a move to the server, played when its delta is received.
+    close(self) -> None:
+        Leave the match.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, host, port, configuration, on_message, watch=None):
+        """Constructor, waits for an opponent (unless watching a match).
+
+        Parameters
+        ----------
+        host: string (required)
+            Server's address.
+        port: int (required)
+            Server's port.
+        configuration: string (required)
+            Name of the configuration to play (see CONFIGURATIONS).
+        on_message: function (required)
+            Called from the background thread with each message
+            (see the on_message attribute).
+        watch: int (optional, default=None)
+            Identifier of a match to watch instead of playing (the
+            configuration is then ignored).
+
+        Raises
+        ------
+        ConnectionError
+            If the server cannot be reached or refuses to start (or show)
+            a match.
+        """
+
+        self.thread = None
+        self.connection = socket.create_connection((host, port))
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.connection.makefile("rb")
+        if watch is None:
+            self.connection.sendall(pack(
+                JOIN, bytes((CONFIGURATION_NAMES.index(configuration),))))
+            expected = START
+        else:
+            self.connection.sendall(pack(WATCH, WATCH_FORMAT.pack(watch)))
+            expected = KEYFRAME
+        message = receive_message(self.stream)
+        if message is None or message[0] != expected:
+            self.close()
+            reason = message[1].decode() if message else "connection lost"
+            raise ConnectionError(f"The server refused: {reason}")
+        payload = message[1]
+        if watch is None:
+            self.match, self.color = START_FORMAT.unpack_from(payload)
+            self.initial_state = GameState.from_bytes(
+                payload[START_FORMAT.size:])
+        else:
+            self.match, self.color = watch, None
+            self.initial_state = decode_keyframe(payload)[1]
+        self.state = self.initial_state.copy()
+        self.on_message = on_message
+        self.thread = threading.Thread(target=self._listen, name="remote",
+                                       daemon=True)
+        self.thread.start()
+
+    # Methods
+    # -------
+    def send_move(self, move) -> None:
+        """Send a move to the server, played when its delta is received.
+
+        Parameter
+        ---------
+        move: tuple of ints (required)
+            Move to play (see board.py).
+        """
+
+        self.connection.sendall(
+            pack(MOVE, MOVE_FORMAT.pack(encode_move(move))))
+
+    def close(self) -> None:
+        """Leave the match, once its last message was handed over."""
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.connection.close()
+        if (self.thread is not None
+                and self.thread is not threading.current_thread()):
+            self.thread.join()
+
+    def _notify(self, kind, value) -> None:
+        # An error of the callback is reported, the next messages still
+        # being received
+        try:
+            self.on_message(kind, value)
+        except Exception as error:
+            print(f"Remote game: message {kind} not handled: {error!r}")
+
+    def _listen(self) -> None:
+        try:
+            while True:
+                message = receive_message(self.stream)
+                if message is None:
+                    break
+                kind, payload = message
+                if kind == DELTA:
+                    ply, code, changes, ejected = decode_delta(payload)
+                    apply_delta(self.state, changes, ejected)
+                    self._notify(DELTA, (ply, decode_move(code), changes,
+                                         ejected))
+                elif kind == KEYFRAME:
+                    ply, self.state = decode_keyframe(payload)
+                    self._notify(KEYFRAME, (ply, self.state.copy()))
+                elif kind == ERROR:
+                    self._notify(ERROR, payload.decode())
+                elif kind == END:
+                    self._notify(END, payload[0] or None)
+                    return
+        except (OSError, ValueError):
+            pass
+        self._notify(END, None)
@@ -0,0 +1,232 @@
+"""Runs a computer player in the background.
+
+The search of an engine (see engine.py and mcts.py) is run in a worker
+thread, so that the game loop keeps handling the events and rendering
+the window while the computer is thinking. The search can be cut short
+("move now") or cancelled (e.g. when the game is reset).
+
+While the opponent is thinking, the computer can ponder: it searches the
+position after their expected reply (see Engine.search). If they play it,
+the pondering search becomes the computer's search (ponder hit) and its
+move is often ready at once. Otherwise the search is cancelled and a new
+one is started, the transposition table being kept.
+
+This module does not depend on pygame: the game loop is notified through
+a callback, called from the worker thread when the move is ready.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ComputerPlayer:
+    """
+    A class used to run the searches of an engine in a worker thread.
+
+    Attributes
+    ----------
+    engine: Engine or MCTS
+        Engine used to search the moves.
+    on_move: callable
+        Called as on_move(move, key) from the worker thread when a search
+        is over, key being the hash of the searched position.
+    executor: ThreadPoolExecutor
+        Single worker thread running the searches.
+    future: concurrent.futures.Future
+        Current (or last) search.
+    generation: int
+        Incremented by each search and cancellation, so that the result of
+        a cancelled search is never notified.
+    pending: bool
+        True from the start of a search until its result is acknowledged.
+    can_ponder: bool
+        True if the engine is able to ponder (see Engine.ponderhit).
+    pondering: bool
+        True while the current search waits for the opponent's move.
+    ponder_key: int
+        Hash of the position searched while pondering.
+    ponders: int
+        Number of opponent's moves played while pondering.
+    ponder_hits: int
+        Number of those moves which were expected.
+
+    Methods
+    -------
+    start(self, bitboard) -> concurrent.futures.Future:
+        Start searching a position in the background.
+    ponder(self, bitboard) -> tuple:
+        Search the expected reply of a position in the background.
+    ponder_hit_rate(self) -> float:
+        Returns the fraction of expected opponent's moves.
+    ponder_info(self) -> str:
+        Returns a summary of the pondering.
+    thinking(self) -> bool:
+        Check if a search is running or its result not acknowledged yet.
+    acknowledge(self) -> None:
+        Mark the result of the last search as handled.
+    move_now(self) -> None:
+        Cut the current search short, its best move so far being notified.
+    cancel(self) -> None:
+        Cancel the current search, its result is not notified.
+    close(self) -> None:
+        Cancel the current search and stop the worker thread.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, engine, on_move):
+        """Constructor.
+
+        Parameters
+        ----------
+        engine: Engine or MCTS (required)
+            Engine used to search the moves.
+        on_move: callable (required)
+            Called as on_move(move, key) when a search is over.
+        """
+
+        self.engine = engine
+        self.on_move = on_move
+        self.executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix="computer")
+        self.future = None
+        self.generation = 0
+        self.pending = False
+        self.can_ponder = hasattr(engine, "ponderhit")
+        self.pondering = False
+        self.ponder_key = None
+        self.ponders = 0
+        self.ponder_hits = 0
+        self.notified = 0
+        self.lock = threading.Lock()
+
+    # Methods
+    # -------
+    def start(self, bitboard):
+        """Start searching a position in the background.
+
+        Parameter
+        ---------
+        bitboard: BitBoard (required)
+            Position to search, a copy is searched.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The search, its result being the best move.
+        """
+
+        key = bitboard.hash
+        if self.pondering:
+            self.ponders += 1
+            if key == self.ponder_key:
+                self.ponder_hits += 1
+                with self.lock:
+                    self.pondering = False
+                    self.pending = True
+                self.engine.ponderhit()
+                if self.future.done():
+                    self._notify(self.future, self.generation, key)
+                return self.future
+        self.cancel()
+        return self._submit(bitboard.copy(), False)
+
+    def ponder(self, bitboard):
+        """Search the expected reply of a position in the background.
+
+        The result of the search is only notified if the expected reply is
+        actually played (see start).
+
+        Parameter
+        ---------
+        bitboard: BitBoard (required)
+            Position where the opponent is to play.
+
+        Returns
+        -------
+        tuple of ints or None
+            Expected reply, None if the engine cannot ponder.
+        """
+
+        self.cancel()
+        if not self.can_ponder:
+            return None
+        move = self.engine.expected_reply(bitboard)
+        if move is None:
+            return None
+        position = bitboard.copy()
+        position.play(move)
+        self.ponder_key = position.hash
+        self.pondering = True
+        self._submit(position, True)
+        return move
+
+    def ponder_hit_rate(self) -> float:
+        """Returns the fraction of expected opponent's moves."""
+        return self.ponder_hits / self.ponders if self.ponders else 0.0
+
+    def ponder_info(self) -> str:
+        """Returns a summary of the pondering."""
+        return (f"ponder hits {self.ponder_hits}/{self.ponders} "
+                f"({self.ponder_hit_rate():.0%})")
+
+    def thinking(self) -> bool:
+        """Check if a search is running or its result not acknowledged yet."""
+        return self.pending
+
+    def acknowledge(self) -> None:
+        """Mark the result of the last search as handled."""
+        self.pending = False
+
+    def move_now(self) -> None:
+        """Cut the current search short, its best move so far being notified."""
+        if self._running() and not self.pondering:
+            self.engine.stop()
+
+    def cancel(self) -> None:
+        """Cancel the current search, its result is not notified."""
+        self.generation += 1
+        self.pending = False
+        self.pondering = False
+        if self._running() and not self.future.cancel():
+            # waits for the engine to be available again
+            self.engine.stop()
+            self.future.exception()
+
+    def close(self) -> None:
+        """Cancel the current search and stop the worker thread."""
+        self.cancel()
+        self.executor.shutdown(wait=True)
+        self.engine.close()
+
+    def _submit(self, bitboard, ponder):
+        self.generation += 1
+        self.pending = not ponder
+        generation = self.generation
+        key = bitboard.hash
+        # the previous search is over: a stop arriving after it returned
+        # must not stop this one
+        self.engine.stop_event.clear()
+        # only the engines able to ponder take the argument (see MCTS.search)
+        arguments = (bitboard, True) if ponder else (bitboard,)
+        self.future = self.executor.submit(self.engine.search, *arguments)
+        self.future.add_done_callback(
+            lambda future: self._notify(future, generation, key))
+        return self.future
+
+    def _running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def _notify(self, future, generation, key) -> None:
+        # Called once the search is over and again on a ponder hit, the
+        # result being notified only once (and never while pondering).
+        with self.lock:
+            if (future.cancelled() or generation != self.generation
+                    or self.pondering or self.notified == generation):
+                return
+            self.notified = generation
+        if future.exception() is not None:
+            print(f"Computer's search failed: {future.exception()!r}")
+            self.pending = False
+            return
+        self.on_move(future.result(), key)
@@ -0,0 +1,112 @@
+"""Sets the initial board configurations.
+
+This module does not depend on pygame so that the rules can be used
+without a display (validation, simulation, computer players...).
+Each configuration lists the board's 9 rows from top to bottom:
+1 stands for a free spot, 2 for a blue marble and 3 for a yellow marble.
+"""
+
+STANDARD = (
+    [2, 2, 2, 2, 2],
+    [2, 2, 2, 2, 2, 2],
+    [1, 1, 2, 2, 2, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 3, 3, 3, 1, 1],
+    [3, 3, 3, 3, 3, 3],
+    [3, 3, 3, 3, 3],
+)
+GERMAN_DAISY = (
+    [1, 1, 1, 1, 1],
+    [2, 2, 1, 1, 3, 3],
+    [2, 2, 2, 1, 3, 3, 3],
+    [1, 2, 2, 1, 1, 3, 3, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 3, 3, 1, 1, 2, 2, 1],
+    [3, 3, 3, 1, 2, 2, 2],
+    [3, 3, 1, 1, 2, 2],
+    [1, 1, 1, 1, 1],
+)
+BELGIAN_DAISY = (
+    [2, 2, 1, 3, 3],
+    [2, 2, 2, 3, 3, 3],
+    [1, 2, 2, 1, 3, 3, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 3, 3, 1, 2, 2, 1],
+    [3, 3, 3, 2, 2, 2],
+    [3, 3, 1, 2, 2],
+)
+DUTCH_DAISY = (
+    [2, 2, 1, 3, 3],
+    [2, 3, 2, 3, 2, 3],
+    [1, 2, 2, 1, 3, 3, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 3, 3, 1, 2, 2, 1],
+    [3, 2, 3, 2, 3, 2],
+    [3, 3, 1, 2, 2],
+)
+SWISS_DAISY = (
+    [1, 1, 1, 1, 1],
+    [2, 2, 1, 1, 3, 3],
+    [2, 3, 2, 1, 3, 2, 3],
+    [1, 2, 2, 1, 1, 3, 3, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 3, 3, 1, 1, 2, 2, 1],
+    [3, 2, 3, 1, 2, 3, 2],
+    [3, 3, 1, 1, 2, 2],
+    [1, 1, 1, 1, 1],
+)
+DOMINATION = (
+    [1, 1, 1, 1, 1],
+    [2, 1, 1, 1, 1, 3],
+    [2, 2, 1, 1, 1, 3, 3],
+    [2, 2, 2, 2, 1, 3, 3, 3],
+    [1, 1, 1, 3, 1, 3, 1, 1, 1],
+    [3, 3, 3, 1, 2, 2, 2, 2],
+    [3, 3, 1, 1, 1, 2, 2],
+    [3, 1, 1, 1, 1, 2],
+    [1, 1, 1, 1, 1],
+)
+PYRAMID = (
+    [2, 1, 1, 1, 1],
+    [2, 2, 1, 1, 1, 1],
+    [2, 2, 2, 1, 1, 1, 1],
+    [2, 2, 2, 2, 1, 1, 1, 1],
+    [2, 2, 2, 2, 1, 3, 3, 3, 3],
+    [1, 1, 1, 1, 3, 3, 3, 3],
+    [1, 1, 1, 1, 3, 3, 3],
+    [1, 1, 1, 1, 3, 3],
+    [1, 1, 1, 1, 3],
+)
+THE_WALL = (
+    [1, 1, 2, 1, 1],
+    [1, 1, 1, 1, 1, 1],
+    [1, 2, 2, 2, 2, 2, 1],
+    [2, 2, 2, 2, 2, 2, 2, 2],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [3, 3, 3, 3, 3, 3, 3, 3],
+    [1, 3, 3, 3, 3, 3, 1],
+    [1, 1, 1, 1, 1, 1],
+    [1, 1, 3, 1, 1],
+)
+
+
+CONFIGURATIONS = {
+    "STANDARD": STANDARD,
+    "GERMAN_DAISY": GERMAN_DAISY,
+    "BELGIAN_DAISY": BELGIAN_DAISY,
+    "DUTCH_DAISY": DUTCH_DAISY,
+    "SWISS_DAISY": SWISS_DAISY,
+    "DOMINATION": DOMINATION,
+    "PYRAMID": PYRAMID,
+    "THE_WALL": THE_WALL,
+}
+
+
+if __name__ == "__main__":
+    pass
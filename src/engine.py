@@ -0,0 +1,399 @@
+"""Implements a computer opponent.
+
+The engine runs a negamax search with alpha-beta pruning on a BitBoard
+(see bitboard.py). The search is deepened iteratively until a hard time
+limit is reached, the best move of the last completed iteration (or the
+current one if it already improved) being returned.
+
+Moves are ordered as follows: best move stored in the transposition
+table first, then the ejections and sumitos, then the other moves
+(see movegen.generate_moves).
+
+The engine can ponder, i.e. search the position after the expected reply
+of the opponent while they are thinking, with no time limit. If the
+opponent plays the expected move (ponder hit), the search goes on with
+the time already spent counted in its time limit. Otherwise it is
+stopped, the transposition table still holding its results.
+
+Running this module searches the initial position of each configuration
+and reports the depth reached and the nodes per second:
+
+    python engine.py --time 5
+"""
+
+import math
+import time
+import argparse
+import threading
+from board import COORDS, AXES, enemy
+from bitboard import BitBoard, CELL_MASKS, shift, popcount
+from configurations import CONFIGURATIONS
+from movegen import generate_moves
+from transposition import (TranspositionTable, EXACT, LOWER_BOUND,
+                           UPPER_BOUND, DEFAULT_MAX_BYTES)
+
+INFINITY = 10**7
+WIN_SCORE = 10**6
+# Scores above this one are wins (or losses) found by the search
+WIN_THRESHOLD = WIN_SCORE - 1000
+DEAD_WEIGHT = 1000
+COHESION_WEIGHT = 3
+# Weight of a marble given its distance to the center (0 to 4)
+DISTANCE_WEIGHTS = (20, 14, 8, 2, -8)
+CHECK_EVERY = 1024
+
+
+def _distance_to_center(coords) -> int:
+    row, col = coords
+    d_row, d_col = abs(row - 4), abs(col - 8)
+    return max(d_row, (d_row + d_col) // 2)
+
+
+# RINGS[k]: mask of the cells at distance k from the center
+RINGS = tuple(
+    sum(CELL_MASKS[cell] for cell, coords in enumerate(COORDS)
+        if _distance_to_center(coords) == distance)
+    for distance in range(5))
+
+
+class SearchTimeout(Exception):
+    """Raised when the time limit of a search is reached."""
+
+
+def evaluate(bitboard) -> int:
+    """Evaluates a position from the point of view of the color being played.
+
+    The evaluation considers the dead marbles, the distance of the marbles
+    to the center and their cohesion (friendly neighbors).
+
+    Parameter
+    ---------
+    bitboard: BitBoard (required)
+        Position to evaluate.
+
+    Returns
+    -------
+    int
+        Score, positive if the position is favorable.
+    """
+
+    own, foe = bitboard.masks()
+    turn = bitboard.turn
+    score = DEAD_WEIGHT * (bitboard.dead[enemy(turn)] - bitboard.dead[turn])
+    for ring, weight in zip(RINGS, DISTANCE_WEIGHTS):
+        score += weight * (popcount(own & ring) - popcount(foe & ring))
+    for axis in AXES:
+        score += COHESION_WEIGHT * (popcount(own & shift(own, axis))
+                                    - popcount(foe & shift(foe, axis)))
+    return score
+
+
+class Engine:
+    """
+    A class used to represent an alpha-beta computer player.
+
+    Attributes
+    ----------
+    time_limit: float
+        Maximum time (in seconds) spent on a move.
+    max_depth: int
+        Maximum depth of the iterative deepening.
+    table: TranspositionTable
+        Results kept from one search to the next.
+    best_move: tuple of ints
+        Best move found by the last search.
+    score: int
+        Score of the best move.
+    depth_reached: int
+        Depth of the last completed iteration.
+    nodes: int
+        Number of positions searched.
+    elapsed: float
+        Time spent by the last search (in seconds).
+    pondering: bool
+        True while the current search has no time limit.
+    stop_event: threading.Event
+        Set by stop, until the search it stops returns.
+
+    Methods
+    -------
+    search(self, bitboard, ponder=False) -> tuple:
+        Search the best move of a position.
+    ponderhit(self) -> None:
+        Apply the time limit to the current (pondering) search.
+    expected_reply(self, bitboard) -> tuple:
+        Returns the move expected to be played in a position.
+    stop(self) -> None:
+        Stop the current (or next) search as soon as possible.
+    nps(self) -> float:
+        Returns the nodes per second of the last search.
+    info(self) -> str:
+        Returns a summary of the last search.
+    close(self) -> None:
+        Release the resources of the engine.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, time_limit=2.0, max_depth=64, max_bytes=DEFAULT_MAX_BYTES):
+        """Constructor.
+
+        Parameters
+        ----------
+        time_limit: float (optional, default=2.0)
+            Maximum time (in seconds) spent on a move.
+        max_depth: int (optional, default=64)
+            Maximum depth of the iterative deepening.
+        max_bytes: int (optional, default=DEFAULT_MAX_BYTES)
+            Memory cap of the transposition table.
+        """
+
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(max_bytes)
+        self.best_move = None
+        self.score = 0
+        self.depth_reached = 0
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.pondering = False
+        self.start = 0.0
+        self.deadline = 0.0
+        self.stop_event = threading.Event()
+        self.path = set()
+
+    # Methods
+    # -------
+    def search(self, bitboard, ponder=False):
+        """Search the best move of a position.
+
+        Parameters
+        ----------
+        bitboard: BitBoard (required)
+            Position to search, it is not modified.
+        ponder: bool (optional, default=False)
+            If True, the search has no time limit until ponderhit is called
+            (or it is stopped).
+
+        Returns
+        -------
+        tuple of ints or None
+            Best move (see board.py), None if there is no legal move.
+        """
+
+        self.start = time.perf_counter()
+        self.pondering = ponder
+        self.deadline = math.inf if ponder else self.start + self.time_limit
+        if self.stop_event.is_set():
+            # stopped before the deadline was set
+            self.deadline = 0.0
+        self.nodes = 0
+        self.depth_reached = 0
+        self.best_move = None
+        self.score = 0
+        self.table.new_search()
+        root = bitboard.copy()
+        moves = generate_moves(root)
+        if moves:
+            self.best_move = moves[0]
+
+        for depth in range(1, self.max_depth + 1):
+            self.path = set()
+            try:
+                move, score = self._search_root(root, moves, depth)
+            except SearchTimeout:
+                break
+            self.best_move, self.score = move, score
+            self.depth_reached = depth
+            if abs(score) >= WIN_THRESHOLD:
+                break
+            # the next iteration would most likely not be completed
+            elapsed = time.perf_counter() - self.start
+            if not self.pondering and elapsed > self.time_limit / 2:
+                break
+            # the best move is searched first by the next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+
+        # a stop is for this search only
+        self.stop_event.clear()
+        self.elapsed = time.perf_counter() - self.start
+        return self.best_move
+
+    def ponderhit(self) -> None:
+        """Apply the time limit to the current (pondering) search.
+
+        The time spent pondering is counted, so the search stops at once
+        if it already lasted longer than the time limit.
+        """
+
+        if not self.stop_event.is_set():
+            self.deadline = self.start + self.time_limit
+        self.pondering = False
+
+    def expected_reply(self, bitboard):
+        """Returns the move expected to be played in a position.
+
+        Parameter
+        ---------
+        bitboard: BitBoard (required)
+            Position, usually the one reached by the last best move.
+
+        Returns
+        -------
+        tuple of ints or None
+            The best move stored in the transposition table (or the first
+            generated one), None if there is no legal move.
+        """
+
+        entry = self.table.probe(bitboard.hash)
+        if entry is not None and entry[4] is not None and bitboard.is_legal(entry[4]):
+            return entry[4]
+        moves = generate_moves(bitboard)
+        return moves[0] if moves else None
+
+    def stop(self) -> None:
+        """Stop the current search as soon as possible.
+
+        Called before the search started (e.g. just after it was submitted
+        to another thread), it stops the next search.
+        """
+
+        self.stop_event.set()
+        self.deadline = 0.0
+
+    def nps(self) -> float:
+        """Returns the nodes per second of the last search."""
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def info(self) -> str:
+        """Returns a summary of the last search."""
+        return (f"depth {self.depth_reached}, score {self.score}, "
+                f"{self.nodes} nodes, {self.nps():.0f} nodes/s")
+
+    def close(self) -> None:
+        """Release the resources of the engine (nothing to release)."""
+
+    def _search_root(self, root, moves, depth) -> tuple:
+        # Searches every root move, the best one being returned with its score
+        alpha, beta = -INFINITY, INFINITY
+        best_move = None
+        self.path.add(root.hash)
+        for move in moves:
+            record = root.play(move)
+            try:
+                score = -self._negamax(root, depth - 1, -beta, -alpha, 1)
+            except SearchTimeout:
+                # the moves searched so far may already be better
+                if best_move is not None and best_move != moves[0]:
+                    self.best_move, self.score = best_move, alpha
+                raise
+            root.undo(record)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self.table.store(root.hash, depth, alpha, EXACT, best_move)
+        return best_move, alpha
+
+    def _negamax(self, bitboard, depth, alpha, beta, ply) -> int:
+        # Returns the score of a position from the point of view of the color
+        # being played. The bitboard is left inconsistent on timeout.
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+        winner = bitboard.winner()
+        if winner:
+            return WIN_SCORE - ply if winner == bitboard.turn else ply - WIN_SCORE
+        key = bitboard.hash
+        if key in self.path:
+            return 0
+        if depth <= 0:
+            return evaluate(bitboard)
+
+        alpha_init = alpha
+        table_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            table_move = entry[4]
+            if entry[1] >= depth:
+                value = _from_table(entry[2], ply)
+                flag = entry[3]
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND and value >= beta:
+                    return value
+                if flag == UPPER_BOUND and value <= alpha:
+                    return value
+
+        moves = generate_moves(bitboard)
+        if not moves:
+            return 0
+        if table_move in moves:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        best_score = -INFINITY
+        best_move = None
+        self.path.add(key)
+        for move in moves:
+            record = bitboard.play(move)
+            score = -self._negamax(bitboard, depth - 1, -beta, -alpha, ply + 1)
+            bitboard.undo(record)
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        self.path.discard(key)
+
+        if best_score <= alpha_init:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.table.store(key, depth, _to_table(best_score, ply), flag, best_move)
+        return best_score
+
+
+def _to_table(score, ply) -> int:
+    # Wins are stored relatively to the position, not to the root
+    if score >= WIN_THRESHOLD:
+        return score + ply
+    if score <= -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _from_table(score, ply) -> int:
+    if score >= WIN_THRESHOLD:
+        return score - ply
+    if score <= -WIN_THRESHOLD:
+        return score + ply
+    return score
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Searches the initial position of each configuration.")
+    parser.add_argument("--time", type=float, default=2.0,
+                        help="time limit per move (seconds)")
+    parser.add_argument("--configuration", action="append",
+                        choices=sorted(CONFIGURATIONS),
+                        help="configuration to search (default: all)")
+    args = parser.parse_args()
+
+    print(f"{'configuration':<15}{'move':>16}{'score':>8}{'depth':>7}"
+          f"{'nodes':>10}{'nodes/s':>10}")
+    for name in args.configuration or CONFIGURATIONS:
+        engine = Engine(args.time)
+        move = engine.search(BitBoard.from_configuration(CONFIGURATIONS[name]))
+        print(f"{name:<15}{str(move):>16}{engine.score:>8}"
+              f"{engine.depth_reached:>7}{engine.nodes:>10}{engine.nps():>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Paces the game loop.
+
+The number of frames per second is capped, and the loop sleeps until the
+next event whenever nothing is animated (e.g. nobody touches the board),
+instead of drawing the same frame over and over.
+"""
+
+import time
+import pygame
+from pygame.locals import NOEVENT
+
+DEFAULT_FPS = 60
+# Weight of the last frame in the average frame time
+SMOOTHING = 0.1
+
+
+class FrameClock:
+    """
+    A class used to cap the frame rate and measure the frames.
+
+    Attributes
+    ----------
+    fps: int
+        Maximum number of frames per second (0: no limit).
+    clock: pygame.time.Clock
+        Clock used to cap the frame rate.
+    frame_start: float
+        Time (in seconds) when the current frame started being processed.
+    frame_time: float
+        Average time (in milliseconds) spent processing a frame, idle
+        waiting excluded.
+
+    Methods
+    -------
+    events(self, idle=False, timeout=1000) -> list:
+        Returns the pending events, waiting for one if idle.
+    tick(self) -> None:
+        End the current frame, waiting to respect the frame rate.
+    readout(self) -> str:
+        Returns the measured frame rate and frame time.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, fps=DEFAULT_FPS):
+        """Constructor.
+
+        Parameter
+        ---------
+        fps: int (optional, default=DEFAULT_FPS)
+            Maximum number of frames per second (0: no limit).
+        """
+
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.frame_start = time.perf_counter()
+        self.frame_time = 0.0
+
+    # Methods
+    # -------
+    def events(self, idle=False, timeout=1000) -> list:
+        """Returns the pending events, waiting for one if idle.
+
+        Parameters
+        ----------
+        idle: bool (optional, default=False)
+            If True, blocks until an event occurs (or the timeout expires).
+        timeout: int (optional, default=1000)
+            Maximum waiting time (in milliseconds).
+
+        Returns
+        -------
+        list of pygame.event.Event
+            Events to handle, possibly none.
+        """
+
+        events = []
+        if idle:
+            event = pygame.event.wait(max(1, timeout))
+            if event.type != NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        self.frame_start = time.perf_counter()
+        return events
+
+    def tick(self) -> None:
+        """End the current frame, waiting to respect the frame rate."""
+        elapsed = (time.perf_counter() - self.frame_start) * 1e3
+        self.frame_time += SMOOTHING * (elapsed - self.frame_time)
+        self.clock.tick(self.fps)
+
+    def readout(self) -> str:
+        """Returns the measured frame rate and frame time."""
+        return f"{self.clock.get_fps():.0f} FPS, {self.frame_time:.1f} ms"
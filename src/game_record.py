@@ -0,0 +1,444 @@
+"""Saves, loads and replays games.
+
+A game record holds the name of the initial configuration, the first
+color to play, an optional seed and the moves played. Each move is coded
+as a small integer (see encode_move) and written either as text or as a
+packed binary.
+
+Text notation: a cell is written as its row letter (A for the top row)
+followed by its position in the row (1 for the leftmost cell). An inline
+move is written as its origin and direction, e.g. "C4>SE". A broadside
+move also gives the number of marbles and the axis of the line, e.g.
+"C4+3E>SE" moves the 3 marbles starting from C4 eastwards towards the
+south-east. A text record looks like:
+
+    [Configuration "STANDARD"]
+    [First "blue"]
+    [Seed "42"]
+    C4>SE G5>NW C3+2E>SE ...
+
+Binary format (little-endian): MAGIC, version (1 byte), first color
+(1 byte), seed flag (1 byte), seed (8 bytes, unsigned), configuration name (length
+on 1 byte, then UTF-8), number of moves (4 bytes), then 2 bytes per move.
+
+A Replay checks a record through the rules (see bitboard.py) once, then
+goes from any ply to any other by applying the xor masks of the moves,
+without checking them again nor hashing: millions of moves per second.
+
+Running this module replays a record, or benchmarks random games:
+
+    python game_record.py game.txt
+    python game_record.py --random 1000 --repeat 100
+"""
+
+import re
+import time
+import random
+import struct
+import argparse
+from board import BLUE, YELLOW, AXES, ROW_LENGTHS, COORDS, enemy
+from bitboard import BitBoard
+from configurations import CONFIGURATIONS
+from movegen import generate_moves
+
+MAGIC = b"ABAL"
+VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBBQ")
+MAX_SEED = 2 ** 64 - 1  # the seed is stored on 8 bytes, unsigned
+DIRECTION_NAMES = ("E", "SE", "SW", "W", "NW", "NE")
+COLOR_NAMES = {BLUE: "blue", YELLOW: "yellow"}
+ROW_LETTERS = "ABCDEFGHI"
+MOVE_PATTERN = re.compile(
+    r"^([A-I])([1-9])(?:\+([23])(E|SE|SW))?>(E|SE|SW|W|NW|NE)$")
+HEADER_PATTERN = re.compile(r'^\[(\w+) "([^"]*)"\]$')
+MOVES_PER_LINE = 12
+
+# First cell of each row
+_ROW_STARTS = tuple(sum(ROW_LENGTHS[:row]) for row in range(len(ROW_LENGTHS)))
+
+
+def encode_move(move) -> int:
+    """Returns the code of a move (0 to 3293).
+
+    Parameter
+    ---------
+    move: tuple of ints (required)
+        (origin, direction, count, axis), see board.py.
+
+    Returns
+    -------
+    int
+        The code, the axis of an inline move being ignored.
+    """
+
+    origin, direction, count, axis = move
+    axis_index = AXES.index(axis) if count > 1 else 0
+    return ((origin * 6 + direction) * 3 + count - 1) * 3 + axis_index
+
+
+def decode_move(code) -> tuple:
+    """Returns the move of a code (see encode_move)."""
+    code, axis_index = divmod(code, 3)
+    code, count = divmod(code, 3)
+    origin, direction = divmod(code, 6)
+    count += 1
+    axis = AXES[axis_index] if count > 1 else direction
+    return origin, direction, count, axis
+
+
+def cell_name(cell) -> str:
+    """Returns the name of a cell, e.g. "C4"."""
+    row = COORDS[cell][0]
+    return f"{ROW_LETTERS[row]}{cell - _ROW_STARTS[row] + 1}"
+
+
+def move_to_text(move) -> str:
+    """Returns the text notation of a move, e.g. "C4>SE" or "C4+3E>SE"."""
+    origin, direction, count, axis = move
+    text = cell_name(origin)
+    if count > 1:
+        text += f"+{count}{DIRECTION_NAMES[axis]}"
+    return f"{text}>{DIRECTION_NAMES[direction]}"
+
+
+def move_from_text(text) -> tuple:
+    """Returns the move of a text notation (see move_to_text).
+
+    Raises
+    ------
+    ValueError
+        If the notation is invalid.
+    """
+
+    match = MOVE_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid move notation: {text}")
+    letter, index, count, axis, direction = match.groups()
+    row = ROW_LETTERS.index(letter)
+    if int(index) > ROW_LENGTHS[row]:
+        raise ValueError(f"Invalid cell: {letter}{index}")
+    origin = _ROW_STARTS[row] + int(index) - 1
+    direction = DIRECTION_NAMES.index(direction)
+    if count is None:
+        return origin, direction, 1, direction
+    return origin, direction, int(count), DIRECTION_NAMES.index(axis)
+
+
+class GameRecord:
+    """
+    A class used to represent the moves of a game.
+
+    Attributes
+    ----------
+    configuration: string
+        Name of the initial configuration (see configurations.py).
+    first: int
+        First color to play (BLUE or YELLOW).
+    seed: int
+        Seed used to draw the first color (None if unknown).
+    moves: list of tuples
+        Moves played (see board.py).
+
+    Methods
+    -------
+    initial_position(self) -> BitBoard:
+        Returns the position before the first move.
+    to_text(self) -> str:
+        Returns the text notation of the game.
+    to_bytes(self) -> bytes:
+        Returns the binary form of the game.
+    save(self, path) -> None:
+        Write the game to a file (binary if its extension is .bin).
+
+    Class Methods
+    -------------
+    from_text(text) -> GameRecord:
+        Build a record from its text notation.
+    from_bytes(data) -> GameRecord:
+        Build a record from its binary form.
+    load(path) -> GameRecord:
+        Read a game from a file (text or binary).
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, configuration="STANDARD", first=BLUE, seed=None, moves=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        configuration: string (optional, default="STANDARD")
+            Name of the initial configuration (see configurations.py).
+        first: int (optional, default=BLUE)
+            First color to play.
+        seed: int (optional, default=None)
+            Seed used to draw the first color, if any (0 to MAX_SEED).
+        moves: list of tuples (optional, default=None)
+            Moves played, none if None.
+        """
+
+        if configuration not in CONFIGURATIONS:
+            raise ValueError(f"Unknown configuration: {configuration}")
+        if seed is not None and not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"The seed must be between 0 and {MAX_SEED}")
+        self.configuration = configuration
+        self.first = first
+        self.seed = seed
+        self.moves = list(moves) if moves else []
+
+    # Class Methods
+    # -------------
+    @classmethod
+    def from_text(cls, text):
+        """Build a record from its text notation (see the module's docstring)."""
+        headers = {}
+        moves = []
+        for line in text.splitlines():
+            line = line.strip()
+            match = HEADER_PATTERN.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+            elif line:
+                moves.extend(move_from_text(token) for token in line.split())
+        colors = {name: color for color, name in COLOR_NAMES.items()}
+        seed = headers.get("Seed")
+        return cls(headers.get("Configuration", "STANDARD"),
+                   colors[headers.get("First", "blue")],
+                   int(seed) if seed else None, moves)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Build a record from its binary form (see the module's docstring)."""
+        magic, version, first, has_seed, seed = BINARY_HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a game record (or unsupported version)")
+        offset = BINARY_HEADER.size
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode()
+        offset += 1 + length
+        (n_moves,) = struct.unpack_from("<I", data, offset)
+        codes = struct.unpack_from(f"<{n_moves}H", data, offset + 4)
+        return cls(name, first, seed if has_seed else None,
+                   [decode_move(code) for code in codes])
+
+    @classmethod
+    def load(cls, path):
+        """Read a game from a file (text or binary)."""
+        with open(path, "rb") as file:
+            data = file.read()
+        if data.startswith(MAGIC):
+            return cls.from_bytes(data)
+        return cls.from_text(data.decode())
+
+    # Methods
+    # -------
+    def initial_position(self) -> BitBoard:
+        """Returns the position before the first move."""
+        return BitBoard.from_configuration(
+            CONFIGURATIONS[self.configuration], self.first)
+
+    def to_text(self) -> str:
+        """Returns the text notation of the game."""
+        lines = [f'[Configuration "{self.configuration}"]',
+                 f'[First "{COLOR_NAMES[self.first]}"]']
+        if self.seed is not None:
+            lines.append(f'[Seed "{self.seed}"]')
+        tokens = [move_to_text(move) for move in self.moves]
+        for i in range(0, len(tokens), MOVES_PER_LINE):
+            lines.append(" ".join(tokens[i:i + MOVES_PER_LINE]))
+        return "\n".join(lines) + "\n"
+
+    def to_bytes(self) -> bytes:
+        """Returns the binary form of the game."""
+        name = self.configuration.encode()
+        codes = [encode_move(move) for move in self.moves]
+        return b"".join((
+            BINARY_HEADER.pack(MAGIC, VERSION, self.first,
+                               self.seed is not None, self.seed or 0),
+            bytes((len(name),)), name,
+            struct.pack(f"<I{len(codes)}H", len(codes), *codes)))
+
+    def save(self, path) -> None:
+        """Write the game to a file (binary if its extension is .bin)."""
+        if path.endswith(".bin"):
+            with open(path, "wb") as file:
+                file.write(self.to_bytes())
+        else:
+            with open(path, "w") as file:
+                file.write(self.to_text())
+
+
+class Replay:
+    """
+    A class used to go back and forth through the moves of a game.
+
+    Attributes
+    ----------
+    record: GameRecord
+        Game replayed.
+    deltas: list of tuples
+        Xor masks of each move (see BitBoard.resolve).
+    position: BitBoard
+        Current position (its hash is not kept up to date).
+    ply: int
+        Number of moves played to reach the current position.
+
+    Methods
+    -------
+    seek(self, ply) -> None:
+        Go to the position reached after a given number of moves.
+    board_at(self, ply) -> BitBoard:
+        Returns the position reached after a given number of moves.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, record):
+        """Constructor.
+
+        The moves are checked through the rules once.
+
+        Parameter
+        ---------
+        record: GameRecord (required)
+            Game to replay.
+
+        Raises
+        ------
+        ValueError
+            If one of the moves is illegal.
+        """
+
+        self.record = record
+        self.deltas = []
+        self.position = record.initial_position()
+        for ply, move in enumerate(record.moves, 1):
+            delta = self.position.resolve(move)
+            if delta is None:
+                raise ValueError(f"Illegal move {ply}: {move_to_text(move)}")
+            self.deltas.append(delta)
+            self._forward(delta)
+        self.ply = len(self.deltas)
+
+    # Methods
+    # -------
+    def seek(self, ply) -> None:
+        """Go to the position reached after a given number of moves.
+
+        Parameter
+        ---------
+        ply: int (required)
+            Number of moves, clamped between 0 and the number of moves.
+        """
+
+        ply = max(0, min(ply, len(self.deltas)))
+        while self.ply < ply:
+            self._forward(self.deltas[self.ply])
+            self.ply += 1
+        while self.ply > ply:
+            self.ply -= 1
+            self._backward(self.deltas[self.ply])
+
+    def board_at(self, ply) -> BitBoard:
+        """Returns the position reached after a given number of moves."""
+        self.seek(ply)
+        bitboard = self.position.copy()
+        bitboard.hash = bitboard.compute_hash()
+        return bitboard
+
+    def _forward(self, delta) -> None:
+        position = self.position
+        self._toggle(delta, position.turn)
+        if delta[2]:
+            position.dead[delta[2]] += 1
+        position.turn = enemy(position.turn)
+
+    def _backward(self, delta) -> None:
+        position = self.position
+        position.turn = enemy(position.turn)
+        if delta[2]:
+            position.dead[delta[2]] -= 1
+        self._toggle(delta, position.turn)
+
+    def _toggle(self, delta, color) -> None:
+        # Applies the xor masks of a move played by color
+        position = self.position
+        if color == BLUE:
+            position.blue ^= delta[0]
+            position.yellow ^= delta[1]
+        else:
+            position.yellow ^= delta[0]
+            position.blue ^= delta[1]
+
+
+def random_game(moves, configuration="STANDARD", seed=0) -> GameRecord:
+    """Plays random legal moves (ejections first) from a configuration.
+
+    Parameters
+    ----------
+    moves: int (required)
+        Maximum number of moves, the game may end before.
+    configuration: string (optional, default="STANDARD")
+        Name of the initial configuration.
+    seed: int (optional, default=0)
+        Seed of the first color and of the moves.
+
+    Returns
+    -------
+    GameRecord
+        The game.
+    """
+
+    rng = random.Random(seed)
+    record = GameRecord(configuration, rng.choice((BLUE, YELLOW)), seed)
+    bitboard = record.initial_position()
+    while len(record.moves) < moves and not bitboard.winner():
+        legal = generate_moves(bitboard)
+        if not legal:
+            break
+        move = rng.choice(legal)
+        bitboard.play(move)
+        record.moves.append(move)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replays a game record, or benchmarks random games.")
+    parser.add_argument("path", nargs="?", help="game record (text or binary)")
+    parser.add_argument("--random", type=int, default=1000,
+                        help="moves of the random game (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=100,
+                        help="replays of the whole game (default: %(default)s)")
+    parser.add_argument("--configuration", choices=sorted(CONFIGURATIONS),
+                        default="STANDARD")
+    args = parser.parse_args()
+
+    if args.path:
+        record = GameRecord.load(args.path)
+    else:
+        record = random_game(args.random, args.configuration)
+    text, data = record.to_text(), record.to_bytes()
+    assert GameRecord.from_text(text).moves == record.moves
+    assert GameRecord.from_bytes(data).moves == record.moves
+    n_moves = len(record.moves)
+    print(f"{record.configuration}, {n_moves} moves, text {len(text)} bytes, "
+          f"binary {len(data)} bytes")
+
+    start = time.perf_counter()
+    replay = Replay(record)
+    checked = time.perf_counter() - start
+    winner = replay.board_at(n_moves).winner()
+    print(f"Checked through the rules: {n_moves / checked:.0f} moves/s, "
+          f"winner: {COLOR_NAMES.get(winner, 'none')}")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        replay.seek(0)
+        replay.seek(n_moves)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed: {2 * n_moves * args.repeat / elapsed:.0f} moves/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""A compact state of a game, for servers hosting many games at once.
+
+A GameState only holds what the rules need: the 61 cells in a bytearray,
+the dead marbles in a bytearray indexed by color and the color being
+played. Its attributes have the same names and indexing as the ones of a
+board.py Board, so that it shares the Board's rules (resolve, play, undo,
+winner, ...) instead of re-implementing them. It serializes to 64 bytes
+(see to_bytes).
+
+Running this module measures the memory footprint of a game, comparing a
+GameState to the other representations (--abalone adds the displayed
+game, which requires pygame):
+
+    python game_state.py [--games 10000] [--abalone]
+
+Measured with CPython 3.11 (64 bits), per game:
+
+    GameState      243 bytes
+    BitBoard       ~400 bytes
+    Board          ~900 bytes
+    Abalone        ~17 KB
+
+This module does not depend on pygame.
+"""
+
+import os
+import sys
+import argparse
+import tracemalloc
+from board import Board, BLUE, YELLOW, N_CELLS
+from bitboard import BitBoard
+from configurations import STANDARD, CONFIGURATIONS
+
+
+class GameState:
+    """
+    A class used to store a game's state in a few hundred bytes.
+
+    Attributes
+    ----------
+    cells: bytearray
+        State of each cell (FREE, BLUE or YELLOW).
+    dead: bytearray
+        Number of marbles pushed off the board, indexed by color.
+    turn: int
+        Color being played (BLUE or YELLOW).
+
+    Methods
+    -------
+    copy(self) -> GameState:
+        Returns an independent copy of the state.
+    to_board(self) -> Board:
+        Returns the equivalent board.py Board.
+    to_bytes(self) -> bytes:
+        Returns the state packed into 64 bytes.
+    footprint(self) -> int:
+        Returns the memory used by the state (in bytes).
+    marbles, resolve, resolve_inline, resolve_broadside, is_legal, play,
+    undo, winner:
+        The rules, shared with Board (see board.py).
+
+    Class Methods
+    -------------
+    from_board(board) -> GameState:
+        Build a state from a board.py Board.
+    from_bytes(data) -> GameState:
+        Build a state from the bytes returned by to_bytes.
+    """
+
+    __slots__ = ("cells", "dead", "turn")
+
+    # Rules shared with Board (same attributes)
+    marbles = Board.marbles
+    resolve = Board.resolve
+    resolve_inline = Board.resolve_inline
+    resolve_broadside = Board.resolve_broadside
+    is_legal = Board.is_legal
+    play = Board.play
+    undo = Board.undo
+    winner = Board.winner
+
+    # Constructor
+    # -----------
+    def __init__(self, configuration=STANDARD, turn=BLUE):
+        """Constructor.
+
+        Parameters
+        ----------
+        configuration: tuple of lists (optional, default=STANDARD)
+            Initial positions of the marbles on the board.
+        turn: int (optional, default=BLUE)
+            First color to play.
+        """
+
+        self.cells = bytearray(state for row in configuration for state in row)
+        self.dead = bytearray(YELLOW + 1)
+        self.turn = turn
+
+    # Class Methods
+    # -------------
+    @classmethod
+    def from_board(cls, board):
+        """Build a state from a board.py Board."""
+        state = cls.__new__(cls)
+        state.cells = bytearray(board.cells)
+        state.dead = bytearray(YELLOW + 1)
+        state.dead[BLUE] = board.dead[BLUE]
+        state.dead[YELLOW] = board.dead[YELLOW]
+        state.turn = board.turn
+        return state
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Build a state from the bytes returned by to_bytes."""
+        if len(data) != N_CELLS + 3:
+            raise ValueError(f"A game state is {N_CELLS + 3} bytes long")
+        state = cls.__new__(cls)
+        state.cells = bytearray(data[:N_CELLS])
+        state.dead = bytearray(YELLOW + 1)
+        state.dead[BLUE], state.dead[YELLOW], state.turn = data[N_CELLS:]
+        return state
+
+    # Methods
+    # -------
+    def copy(self):
+        """Returns an independent copy of the state."""
+        state = GameState.__new__(GameState)
+        state.cells = self.cells[:]
+        state.dead = self.dead[:]
+        state.turn = self.turn
+        return state
+
+    def to_board(self) -> Board:
+        """Returns the equivalent board.py Board."""
+        board = Board.__new__(Board)
+        board.configuration = None
+        board.cells = list(self.cells)
+        board.dead = {BLUE: self.dead[BLUE], YELLOW: self.dead[YELLOW]}
+        board.turn = self.turn
+        return board
+
+    def to_bytes(self) -> bytes:
+        """Returns the state packed into 64 bytes: cells, dead marbles, turn."""
+        return bytes(self.cells) + bytes(
+            (self.dead[BLUE], self.dead[YELLOW], self.turn))
+
+    def footprint(self) -> int:
+        """Returns the memory used by the state (in bytes).
+
+        The colors are small integers, shared by the whole interpreter.
+        """
+
+        return (sys.getsizeof(self) + sys.getsizeof(self.cells)
+                + sys.getsizeof(self.dead))
+
+
+def measure(build, games) -> float:
+    """Measures the memory allocated per game.
+
+    Parameters
+    ----------
+    build: function (required)
+        Builds a game, without argument.
+    games: int (required)
+        Number of games built (and kept alive) for the measure.
+
+    Returns
+    -------
+    float
+        Bytes allocated per game.
+    """
+
+    build()  # anything lazily loaded is not part of the measure
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(games)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    # the list holding the games is not part of them
+    return (size - sys.getsizeof(kept)) / games
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Memory footprint of a game.")
+    parser.add_argument("--games", type=int, default=10000,
+                        help="number of games built for the measure")
+    parser.add_argument("--abalone", action="store_true",
+                        help="also measure the displayed game (pygame)")
+    args = parser.parse_args()
+
+    builds = {
+        "GameState": lambda: GameState(STANDARD, BLUE),
+        "BitBoard": lambda: BitBoard.from_configuration(STANDARD, BLUE),
+        "Board": lambda: Board(STANDARD, BLUE),
+    }
+    if args.abalone:
+        import pygame
+        if "DISPLAY" not in os.environ and sys.platform.startswith("linux"):
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        from abalone import Abalone
+        builds["Abalone"] = lambda: Abalone(STANDARD, BLUE)
+
+    print(f"{'representation':<16}{'bytes/game':>12}")
+    for name, build in builds.items():
+        print(f"{name:<16}{measure(build, args.games):>12.0f}")
+    sizes = {name: GameState(configuration).footprint()
+             for name, configuration in CONFIGURATIONS.items()}
+    print(f"GameState.footprint: {min(sizes.values())} to "
+          f"{max(sizes.values())} bytes")
+
+
+if __name__ == "__main__":
+    main()
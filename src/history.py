@@ -0,0 +1,121 @@
+"""Keeps the moves of a game to go backwards and forwards through them.
+
+Only the moves and their undo records (see Board.play) are kept, never a
+copy of the board: the memory grows with the number of moves, and undoing
+or redoing a move only touches the cells it changed.
+
+This module does not depend on pygame.
+"""
+
+
+class History:
+    """
+    A class used to undo and redo the moves played on a Board.
+
+    Attributes
+    ----------
+    moves: list of tuples
+        Moves played, including the undone ones.
+    records: list of tuples
+        Undo record of each played move (see Board.play).
+    cursor: int
+        Number of moves currently played, the next ones can be redone.
+
+    Methods
+    -------
+    push(self, move, record) -> None:
+        Add a move just played, forgetting the undone ones.
+    can_undo(self) -> bool:
+        Check if a move can be undone.
+    can_redo(self) -> bool:
+        Check if a move can be redone.
+    undo(self, board) -> tuple:
+        Take back the last move played.
+    redo(self, board) -> tuple:
+        Play again the last undone move.
+    clear(self) -> None:
+        Forget every move.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self):
+        """Constructor."""
+        self.moves = []
+        self.records = []
+        self.cursor = 0
+
+    # Methods
+    # -------
+    def push(self, move, record) -> None:
+        """Add a move just played, forgetting the undone ones.
+
+        Parameters
+        ----------
+        move: tuple of ints (required)
+            Move played (see board.py).
+        record: tuple (required)
+            Undo record returned by Board.play.
+        """
+
+        del self.moves[self.cursor:]
+        del self.records[self.cursor:]
+        self.moves.append(move)
+        self.records.append(record)
+        self.cursor += 1
+
+    def can_undo(self) -> bool:
+        """Check if a move can be undone."""
+        return self.cursor > 0
+
+    def can_redo(self) -> bool:
+        """Check if a move can be redone."""
+        return self.cursor < len(self.moves)
+
+    def undo(self, board):
+        """Take back the last move played.
+
+        Parameter
+        ---------
+        board: Board (required)
+            Board the moves were played on.
+
+        Returns
+        -------
+        tuple
+            (move, changed cells), None if there is no move to undo.
+        """
+
+        if not self.can_undo():
+            return None
+        self.cursor -= 1
+        record = self.records[self.cursor]
+        board.undo(record)
+        return self.moves[self.cursor], [cell for cell, _ in record[0]]
+
+    def redo(self, board):
+        """Play again the last undone move.
+
+        Parameter
+        ---------
+        board: Board (required)
+            Board the moves were played on.
+
+        Returns
+        -------
+        tuple
+            (move, changed cells), None if there is no move to redo.
+        """
+
+        if not self.can_redo():
+            return None
+        move = self.moves[self.cursor]
+        self.records[self.cursor] = board.play(move)
+        self.cursor += 1
+        return move, [cell for cell, _ in self.records[self.cursor - 1][0]]
+
+    def clear(self) -> None:
+        """Forget every move."""
+        self.moves.clear()
+        self.records.clear()
+        self.cursor = 0
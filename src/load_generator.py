@@ -0,0 +1,266 @@
+"""Measures the game server under a synthetic load, over localhost.
+
+Bots connect to the server in pairs and play random legal moves until a
+match is won or reaches the maximum number of moves. The latency of a
+move is the time between sending it and receiving its delta. The server
+runs in its own process (started here unless --port is given), so that
+its CPU time and memory are measured apart from the bots':
+
+- matches/s per core: matches played per second of the server's CPU.
+- latency percentiles of the moves (in milliseconds).
+- memory per match: growth of the server's resident memory once every
+  match started, divided by the number of matches (the compact state
+  of a match alone is also given).
+
+    python load_generator.py --matches 200 --max-moves 100
+
+This module does not depend on pygame.
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from os import path
+from bitboard import BitBoard
+from game_state import GameState
+from game_record import encode_move
+from movegen import generate_moves
+from profiler import nearest_rank
+from protocol import (JOIN, START, MOVE, DELTA, STATS, START_FORMAT,
+                      MOVE_FORMAT, CONFIGURATION_NAMES, pack, read_message,
+                      decode_delta, apply_delta)
+
+SERVER = path.join(path.dirname(path.abspath(__file__)), "server.py")
+
+
+class Bot:
+    """
+    A class used to play random moves on the server.
+
+    Attributes
+    ----------
+    rng: random.Random
+        Generator of the moves.
+    max_moves: int
+        The bot leaves the match after this number of moves.
+    latencies: list
+        Latency of each move sent (in seconds), shared by the bots.
+    color: int
+        Color played (None until the match starts).
+    state: GameState
+        State of the match.
+
+    Methods
+    -------
+    play(self, host, port, configuration, started, go) -> None:
+        Play a match (coroutine).
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, seed, max_moves, latencies):
+        """Constructor.
+
+        Parameters
+        ----------
+        seed: int (required)
+            Seed of the moves.
+        max_moves: int (required)
+            The bot leaves the match after this number of moves.
+        latencies: list (required)
+            Latency of each move sent (in seconds), shared by the bots.
+        """
+
+        self.rng = random.Random(seed)
+        self.max_moves = max_moves
+        self.latencies = latencies
+        self.color = None
+        self.state = None
+
+    # Methods
+    # -------
+    async def play(self, host, port, configuration, started, go) -> None:
+        """Play a match (coroutine).
+
+        Parameters
+        ----------
+        host: string (required)
+            Server's address.
+        port: int (required)
+            Server's port.
+        configuration: int (required)
+            Index of the configuration (see protocol.CONFIGURATION_NAMES).
+        started: function (required)
+            Called once the match started.
+        go: asyncio.Event (required)
+            The first move is played once it is set.
+        """
+
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(pack(JOIN, bytes((configuration,))))
+            kind, payload = await read_message(reader)
+            if kind != START:
+                return
+            _, self.color = START_FORMAT.unpack_from(payload)
+            self.state = GameState.from_bytes(payload[START_FORMAT.size:])
+            started()
+            await go.wait()
+            sent = await self._move(writer, 0)
+            while True:
+                kind, payload = await read_message(reader)
+                if kind != DELTA:
+                    return
+                ply, _, changes, ejected = decode_delta(payload)
+                if sent is not None:
+                    self.latencies.append(time.perf_counter() - sent)
+                apply_delta(self.state, changes, ejected)
+                sent = await self._move(writer, ply + 1)
+                if ply + 1 >= self.max_moves and self.state.turn == self.color:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _move(self, writer, ply):
+        # Sends a random legal move if it is the bot's turn, returns when it
+        # was sent (None if no move was sent)
+        if self.state.turn != self.color or ply >= self.max_moves:
+            return None
+        moves = generate_moves(BitBoard.from_board(self.state.to_board()))
+        if not moves:
+            return None
+        move = self.rng.choice(moves)
+        writer.write(pack(MOVE, MOVE_FORMAT.pack(encode_move(move))))
+        await writer.drain()
+        return time.perf_counter()
+
+
+async def stats(host, port) -> dict:
+    """Returns the server's statistics (coroutine, see GameServer.stats)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(pack(STATS))
+    _, payload = await read_message(reader)
+    writer.close()
+    return json.loads(payload)
+
+
+async def run(host, port, matches, max_moves, configuration, seed) -> dict:
+    """Plays matches on a server and measures it (coroutine).
+
+    Parameters
+    ----------
+    host: string (required)
+        Server's address.
+    port: int (required)
+        Server's port.
+    matches: int (required)
+        Number of matches played at the same time.
+    max_moves: int (required)
+        Maximum number of moves of a match.
+    configuration: int (required)
+        Index of the configuration (see protocol.CONFIGURATION_NAMES).
+    seed: int (required)
+        Seed of the moves.
+
+    Returns
+    -------
+    dict
+        Measures, see the module's docstring.
+    """
+
+    latencies = []
+    go = asyncio.Event()
+    all_started = asyncio.Event()
+    count = [0]
+
+    def started():
+        count[0] += 1
+        if count[0] == 2 * matches:
+            all_started.set()
+
+    before = await stats(host, port)
+    bots = [Bot(seed + i, max_moves, latencies) for i in range(2 * matches)]
+    tasks = [asyncio.ensure_future(bot.play(host, port, configuration,
+                                            started, go)) for bot in bots]
+    await all_started.wait()
+    peak = await stats(host, port)
+    start = time.perf_counter()
+    go.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    after = await stats(host, port)
+
+    cpu = after["cpu"] - before["cpu"]
+    ordered = sorted(latencies)
+    result = {"matches": matches, "moves": after["moves"] - before["moves"],
+              "seconds": elapsed, "server_cpu": cpu,
+              "matches_per_core": matches / cpu if cpu else None,
+              "moves_per_core": (after["moves"] - before["moves"]) / cpu
+              if cpu else None,
+              "match_bytes": peak["match_bytes"] / max(1, peak["matches"])}
+    for percentile in (50, 95, 99):
+        result[f"latency_p{percentile}_ms"] = (
+            nearest_rank(ordered, percentile) * 1e3 if ordered else None)
+    if before["rss_kb"] is not None:
+        result["rss_per_match_kb"] = (
+            (peak["rss_kb"] - before["rss_kb"]) / matches)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Synthetic load on the game server.")
+    parser.add_argument("--matches", type=int, default=200,
+                        help="number of matches played at the same time")
+    parser.add_argument("--max-moves", type=int, default=100)
+    parser.add_argument("--configuration", choices=CONFIGURATION_NAMES,
+                        default="STANDARD")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int,
+                        help="server to measure (default: start one)")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        server = subprocess.Popen(
+            [sys.executable, SERVER, "--host", args.host, "--port", "0"],
+            stdout=subprocess.PIPE, text=True)
+        port = int(server.stdout.readline().rsplit(":", 1)[1])
+    try:
+        result = asyncio.run(run(
+            args.host, port, args.matches, args.max_moves,
+            CONFIGURATION_NAMES.index(args.configuration), args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['matches']} matches, {result['moves']} moves "
+          f"in {result['seconds']:.2f} s")
+    print(f"Server: {result['matches_per_core']:.1f} matches/s per core, "
+          f"{result['moves_per_core']:.0f} moves/s per core")
+    print(f"Latency: p50 {result['latency_p50_ms']:.2f} ms, "
+          f"p95 {result['latency_p95_ms']:.2f} ms, "
+          f"p99 {result['latency_p99_ms']:.2f} ms")
+    memory = f"Memory per match: {result['match_bytes']:.0f} bytes of state"
+    if "rss_per_match_kb" in result:
+        memory += (f", {result['rss_per_match_kb']:.1f} KB of resident memory"
+                   " (connections included)")
+    print(memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""Implements a Monte Carlo Tree Search (MCTS) computer opponent.
+
+Random games (playouts) are played from the positions of a search tree
+with the headless rules (see bitboard.py and movegen.py). A playout ends
+when a player loses 6 marbles, or after ROLLOUT_PLIES moves: the player
+with the fewer dead marbles (then the best evaluated) is declared winner.
+Ejections are always played when a playout meets one.
+
+The playouts are spread over a multiprocessing pool:
+- "root" parallelism (default): each worker grows its own tree from the
+  root position, the visits of the root moves being summed at the end.
+  Workers do not communicate during the search, hence the number of
+  playouts per second grows almost linearly with the number of cores.
+- "tree" parallelism: a single tree is grown by the main process, which
+  selects batches of leaves and sends their playouts to the workers.
+  A virtual loss is applied to the nodes of the pending playouts so that
+  a batch explores different leaves.
+With 0 processes, a single tree is grown in the calling process (e.g. a
+worker of tournament.py, which cannot start processes of its own).
+
+Running this module measures the playouts per second for several
+numbers of processes:
+
+    python mcts.py --processes 1 2 4 8 --time 5
+"""
+
+import os
+import math
+import time
+import random
+import signal
+import argparse
+import multiprocessing
+from board import BLUE, YELLOW, enemy
+from bitboard import BitBoard
+from configurations import CONFIGURATIONS
+from movegen import generate_moves
+from engine import evaluate
+
+ROLLOUT_PLIES = 60
+EXPLORATION = 1.4
+VIRTUAL_LOSS = 1
+BATCH_PER_PROCESS = 8
+
+# Set by MCTS.stop, shared with the worker processes (see _init_worker)
+_stop_event = None
+
+
+class Node:
+    """
+    A class used to represent a node of the search tree.
+
+    Attributes
+    ----------
+    move: tuple of ints
+        Move leading to this node (None for the root).
+    parent: Node
+        Parent node (None for the root).
+    turn: int
+        Color who played the move leading to this node.
+    children: list
+        Expanded child nodes.
+    untried: list
+        Legal moves not expanded yet.
+    visits: float
+        Number of playouts through this node (virtual losses included).
+    wins: float
+        Number of playouts won by turn through this node.
+    """
+
+    __slots__ = ("move", "parent", "turn", "children", "untried",
+                 "visits", "wins")
+
+    def __init__(self, bitboard, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        self.turn = enemy(bitboard.turn)
+        self.children = []
+        self.untried = [] if bitboard.winner() else generate_moves(bitboard)
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self):
+        """Returns the child maximizing the UCT value."""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: (
+            child.wins / child.visits
+            + EXPLORATION * math.sqrt(log_visits / child.visits)))
+
+
+def rollout(bitboard, rng, max_plies=ROLLOUT_PLIES):
+    """Plays a random game from a position.
+
+    Parameters
+    ----------
+    bitboard: BitBoard (required)
+        Initial position, it is modified.
+    rng: random.Random (required)
+        Random generator.
+    max_plies: int (optional, default=ROLLOUT_PLIES)
+        Maximum number of moves played.
+
+    Returns
+    -------
+    int or None
+        Winning color, None in case of a draw.
+    """
+
+    for _ in range(max_plies):
+        winner = bitboard.winner()
+        if winner:
+            return winner
+        moves = generate_moves(bitboard)
+        if not moves:
+            return None
+        # ejections are listed first
+        move = moves[0]
+        if not bitboard.resolve(move)[2]:
+            move = rng.choice(moves)
+        bitboard.play(move)
+
+    winner = bitboard.winner()
+    if winner:
+        return winner
+    if bitboard.dead[BLUE] != bitboard.dead[YELLOW]:
+        return BLUE if bitboard.dead[BLUE] < bitboard.dead[YELLOW] else YELLOW
+    score = evaluate(bitboard)
+    if score == 0:
+        return None
+    return bitboard.turn if score > 0 else enemy(bitboard.turn)
+
+
+def _select(root, bitboard, virtual_loss=0):
+    # Walks down the tree (playing the moves on bitboard) and expands a leaf.
+    # Returns the path from the root to the new leaf.
+    node = root
+    path = [node]
+    node.visits += virtual_loss
+    while not node.untried and node.children:
+        node = node.select_child()
+        bitboard.play(node.move)
+        node.visits += virtual_loss
+        path.append(node)
+    if node.untried:
+        move = node.untried.pop()
+        bitboard.play(move)
+        node = Node(bitboard, move, node)
+        path[-1].children.append(node)
+        node.visits += virtual_loss
+        path.append(node)
+    return path
+
+
+def _backpropagate(path, winner, virtual_loss=0) -> None:
+    for node in path:
+        node.visits += 1 - virtual_loss
+        if winner == node.turn:
+            node.wins += 1
+        elif winner is None:
+            node.wins += 0.5
+
+
+def _init_worker(stop_event) -> None:
+    global _stop_event
+    _stop_event = stop_event
+    # Forked after pygame.init(), the worker inherits SDL's SIGTERM handler,
+    # which would keep Pool.terminate (MCTS.close) from ending it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _grow_tree(args, stop_event=None):
+    # Worker of the root parallelism: grows a tree until the deadline.
+    # Returns the visits and wins of each root move and the playouts count.
+    bitboard, time_limit, seed, max_plies = args
+    stop_event = stop_event or _stop_event
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_limit
+    root = Node(bitboard)
+    playouts = 0
+    while time.perf_counter() < deadline and not stop_event.is_set():
+        position = bitboard.copy()
+        path = _select(root, position)
+        _backpropagate(path, rollout(position, rng, max_plies))
+        playouts += 1
+    stats = {child.move: (child.visits, child.wins) for child in root.children}
+    return stats, playouts
+
+
+def _rollout_task(args):
+    # Worker of the tree parallelism: a single playout.
+    bitboard, seed, max_plies = args
+    return rollout(bitboard, random.Random(seed), max_plies)
+
+
+class MCTS:
+    """
+    A class used to represent a parallel MCTS computer player.
+
+    Attributes
+    ----------
+    time_limit: float
+        Time (in seconds) spent on a move.
+    processes: int
+        Number of worker processes (0: none, the search is not parallel).
+    parallelism: string
+        "root" or "tree" (see the module's docstring).
+    max_plies: int
+        Maximum length of a playout.
+    best_move: tuple of ints
+        Best (most visited) move found by the last search.
+    playouts: int
+        Number of playouts of the last search.
+    elapsed: float
+        Time spent by the last search (in seconds).
+
+    Methods
+    -------
+    search(self, bitboard) -> tuple:
+        Search the best move of a position.
+    playouts_per_second(self) -> float:
+        Returns the playouts per second of the last search.
+    info(self) -> str:
+        Returns a summary of the last search.
+    stop(self) -> None:
+        Stop the current search as soon as possible.
+    close(self) -> None:
+        Terminate the worker processes.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, time_limit=2.0, processes=None, parallelism="root",
+                 max_plies=ROLLOUT_PLIES, seed=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        time_limit: float (optional, default=2.0)
+            Time (in seconds) spent on a move.
+        processes: int (optional, default=None)
+            Number of worker processes, one per core if None. With 0, the
+            search runs in the calling process (root parallelism only).
+        parallelism: string (optional, default="root")
+            "root" or "tree" (see the module's docstring).
+        max_plies: int (optional, default=ROLLOUT_PLIES)
+            Maximum length of a playout.
+        seed: int (optional, default=None)
+            Seed of the playouts, random if None.
+        """
+
+        if parallelism not in ("root", "tree"):
+            raise ValueError(f"Unknown parallelism: {parallelism}")
+        if processes == 0 and parallelism == "tree":
+            raise ValueError("Tree parallelism requires worker processes")
+        self.time_limit = time_limit
+        self.processes = os.cpu_count() if processes is None else processes
+        self.parallelism = parallelism
+        self.max_plies = max_plies
+        self.rng = random.Random(seed)
+        self.pool = None
+        self.stop_event = multiprocessing.Event()
+        self.best_move = None
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    # Methods
+    # -------
+    def search(self, bitboard):
+        """Search the best move of a position.
+
+        Parameter
+        ---------
+        bitboard: BitBoard (required)
+            Position to search, it is not modified.
+
+        Returns
+        -------
+        tuple of ints or None
+            Best move (see board.py), None if there is no legal move.
+        """
+
+        if self.pool is None and self.processes:
+            self.pool = multiprocessing.Pool(
+                self.processes, _init_worker, (self.stop_event,))
+        self.stop_event.clear()
+        start = time.perf_counter()
+        if self.parallelism == "root":
+            stats = self._search_root_parallel(bitboard)
+        else:
+            stats = self._search_tree_parallel(bitboard)
+        self.elapsed = time.perf_counter() - start
+        if not stats:
+            self.best_move = None
+        else:
+            self.best_move = max(stats, key=lambda move: stats[move][0])
+        return self.best_move
+
+    def playouts_per_second(self) -> float:
+        """Returns the playouts per second of the last search."""
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def info(self) -> str:
+        """Returns a summary of the last search."""
+        return (f"{self.playouts} playouts, {self.processes} processes, "
+                f"{self.playouts_per_second():.0f} playouts/s")
+
+    def stop(self) -> None:
+        """Stop the current search as soon as possible.
+
+        The most visited move found so far is returned by the search.
+        """
+
+        self.stop_event.set()
+
+    def close(self) -> None:
+        """Terminate the worker processes."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def _search_root_parallel(self, bitboard) -> dict:
+        tasks = [(bitboard, self.time_limit, self.rng.getrandbits(32),
+                  self.max_plies) for _ in range(max(1, self.processes))]
+        if self.pool is None:
+            results = [_grow_tree(tasks[0], self.stop_event)]
+        else:
+            results = self.pool.imap_unordered(_grow_tree, tasks)
+        stats = {}
+        self.playouts = 0
+        for tree_stats, playouts in results:
+            self.playouts += playouts
+            for move, (visits, wins) in tree_stats.items():
+                total_visits, total_wins = stats.get(move, (0, 0.0))
+                stats[move] = (total_visits + visits, total_wins + wins)
+        return stats
+
+    def _search_tree_parallel(self, bitboard) -> dict:
+        deadline = time.perf_counter() + self.time_limit
+        root = Node(bitboard)
+        batch = self.processes * BATCH_PER_PROCESS
+        self.playouts = 0
+        while time.perf_counter() < deadline and not self.stop_event.is_set():
+            paths, tasks = [], []
+            for _ in range(batch):
+                position = bitboard.copy()
+                paths.append(_select(root, position, VIRTUAL_LOSS))
+                tasks.append((position, self.rng.getrandbits(32), self.max_plies))
+            chunk = max(1, batch // self.processes)
+            winners = self.pool.map(_rollout_task, tasks, chunk)
+            for path, winner in zip(paths, winners):
+                _backpropagate(path, winner, VIRTUAL_LOSS)
+            self.playouts += batch
+        return {child.move: (child.visits, child.wins) for child in root.children}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measures the MCTS playouts per second.")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=[1, os.cpu_count()])
+    parser.add_argument("--time", type=float, default=5.0)
+    parser.add_argument("--parallelism", choices=("root", "tree"),
+                        default="root")
+    parser.add_argument("--configuration", choices=sorted(CONFIGURATIONS),
+                        default="STANDARD")
+    args = parser.parse_args()
+
+    bitboard = BitBoard.from_configuration(CONFIGURATIONS[args.configuration])
+    print(f"{'processes':>10}{'playouts':>10}{'playouts/s':>12}{'speedup':>9}")
+    reference = None
+    for processes in args.processes:
+        player = MCTS(args.time, processes, args.parallelism, seed=0)
+        player.search(bitboard)
+        player.close()
+        speed = player.playouts_per_second()
+        reference = reference or speed
+        print(f"{processes:>10}{player.playouts:>10}{speed:>12.1f}"
+              f"{speed / reference:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Generates all the legal moves of a position.
+
+The moves are computed on a BitBoard (see bitboard.py), direction by
+direction, with mask operations: for each direction, a mask of the origins
+of every legal inline move (push and sumito) and broadside move is built
+at once, then converted into move tuples (see board.py).
+The rules are the ones of Board.resolve: at most 3 friendly marbles are
+moved, a sumito requires the numerical superiority, enemy marbles followed
+by a friendly marble cannot be pushed.
+
+Running this module computes perft (number of leaf nodes of the game tree
+up to a given depth) on each configuration and reports the generator's
+throughput in nodes per second:
+
+    python movegen.py --depth 3
+"""
+
+import time
+import argparse
+from board import AXES, BLUE, opposite
+from bitboard import BitBoard, BOARD, EDGES, shift, cells_of
+from configurations import CONFIGURATIONS
+from transposition import TranspositionTable, EXACT
+
+
+def generate_moves(bitboard) -> list:
+    """Returns every legal move of the color being played.
+
+    Parameter
+    ---------
+    bitboard: BitBoard (required)
+        Position to generate the moves of.
+
+    Returns
+    -------
+    list of tuples
+        Legal moves, (origin, direction, count, axis) as in board.py.
+        Sumitos are listed first, ejections first among them.
+    """
+
+    own, foe = bitboard.masks()
+    empty = BOARD & ~(own | foe)
+    ejections, sumitos, others = [], [], []
+
+    for direction in range(6):
+        back = opposite(direction)
+        # behind_*[i]: cells whose i-th neighbor towards direction is in *
+        behind_own = [own]
+        behind_foe = [foe]
+        behind_empty = [empty]
+        behind_edge_foe = [foe & EDGES[direction]]
+        for _ in range(5):
+            behind_own.append(shift(behind_own[-1], back))
+            behind_foe.append(shift(behind_foe[-1], back))
+            behind_empty.append(shift(behind_empty[-1], back))
+            behind_edge_foe.append(shift(behind_edge_foe[-1], back))
+        line_2 = own & behind_own[1]
+        line_3 = line_2 & behind_own[2]
+
+        # pushing 1 to 3 friendly marbles towards a free spot
+        pushes = (own & behind_empty[1]
+                  | line_2 & behind_empty[2]
+                  | line_3 & behind_empty[3])
+        for origin in cells_of(pushes):
+            others.append((origin, direction, 1, direction))
+
+        # sumitos: 2 vs 1, 3 vs 1 and 3 vs 2
+        sumito_2_1 = line_2 & behind_foe[2]
+        sumito_3_1 = line_3 & behind_foe[3]
+        sumito_3_2 = sumito_3_1 & behind_foe[4]
+        ejecting = (sumito_2_1 & behind_edge_foe[2]
+                    | sumito_3_1 & behind_edge_foe[3]
+                    | sumito_3_2 & behind_edge_foe[4])
+        moving = (sumito_2_1 & behind_empty[3]
+                  | sumito_3_1 & behind_empty[4]
+                  | sumito_3_2 & behind_empty[5])
+        for origin in cells_of(ejecting):
+            ejections.append((origin, direction, 1, direction))
+        for origin in cells_of(moving):
+            sumitos.append((origin, direction, 1, direction))
+
+    # broadside moves
+    for axis in AXES:
+        after_own = shift(own, opposite(axis))
+        line_2 = own & after_own
+        line_3 = line_2 & shift(after_own, opposite(axis))
+        for direction in range(6):
+            if direction in (axis, opposite(axis)):
+                continue
+            free_ahead = shift(empty, opposite(direction))
+            free_ahead_2 = free_ahead & shift(free_ahead, opposite(axis))
+            free_ahead_3 = free_ahead_2 & shift(
+                shift(free_ahead, opposite(axis)), opposite(axis))
+            for origin in cells_of(line_2 & free_ahead_2):
+                others.append((origin, direction, 2, axis))
+            for origin in cells_of(line_3 & free_ahead_3):
+                others.append((origin, direction, 3, axis))
+
+    return ejections + sumitos + others
+
+
+def perft(bitboard, depth, table=None) -> int:
+    """Count the leaf nodes of the game tree up to a given depth.
+
+    Finished games are leaf nodes, whatever the depth.
+
+    Parameters
+    ----------
+    bitboard: BitBoard (required)
+        Root position.
+    depth: int (required)
+        Number of plies to explore.
+    table: TranspositionTable (optional, default=None)
+        Used to reuse the counts of transposed positions.
+
+    Returns
+    -------
+    int
+        Number of leaf nodes.
+    """
+
+    if depth == 0 or bitboard.winner():
+        return 1
+    moves = generate_moves(bitboard)
+    if depth == 1:
+        return len(moves)
+    if table is not None:
+        entry = table.probe(bitboard.hash)
+        if entry is not None and entry[1] == depth:
+            return entry[2]
+    nodes = 0
+    for move in moves:
+        record = bitboard.play(move)
+        nodes += perft(bitboard, depth - 1, table)
+        bitboard.undo(record)
+    if table is not None:
+        table.store(bitboard.hash, depth, nodes, EXACT, None)
+    return nodes
+
+
+def benchmark(depth, configurations=None, max_bytes=0) -> list:
+    """Run perft on several configurations and measure the throughput.
+
+    Parameters
+    ----------
+    depth: int (required)
+        Perft depth.
+    configurations: list of strings (optional, default=None)
+        Names of the configurations (see configurations.py), all if None.
+    max_bytes: int (optional, default=0)
+        Memory cap of a transposition table, none is used if 0.
+
+    Returns
+    -------
+    list of tuples
+        (name, nodes, seconds, nodes per second) for each configuration.
+    """
+
+    results = []
+    for name in configurations or CONFIGURATIONS:
+        bitboard = BitBoard.from_configuration(CONFIGURATIONS[name], BLUE)
+        table = TranspositionTable(max_bytes) if max_bytes else None
+        start = time.perf_counter()
+        nodes = perft(bitboard, depth, table)
+        elapsed = time.perf_counter() - start
+        results.append((name, nodes, elapsed, nodes / elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Perft of the legal move generator.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--configuration", action="append",
+                        choices=sorted(CONFIGURATIONS),
+                        help="configuration to run (default: all)")
+    parser.add_argument("--hash-mb", type=int, default=0,
+                        help="transposition table size (default: none)")
+    args = parser.parse_args()
+
+    print(f"{'configuration':<15}{'nodes':>12}{'time (s)':>10}{'nodes/s':>12}")
+    for name, nodes, elapsed, speed in benchmark(
+            args.depth, args.configuration, args.hash_mb * 2**20):
+        print(f"{name:<15}{nodes:>12}{elapsed:>10.3f}{speed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
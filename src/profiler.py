@@ -0,0 +1,234 @@
+"""Times the phases of the game loop's frames.
+
+The game loop marks the end of each phase of a frame with lap (e.g. after
+handling the events, after drawing the marbles), and times the nested
+steps (e.g. a drag being checked) with measure. The last WINDOW samples of
+each phase are kept to report their percentiles, on screen (see lines) or
+in a CSV/JSON file (see export).
+
+When the profiler is disabled, lap returns at once and measure returns a
+shared context doing nothing: the loop pays a method call per phase.
+
+This module does not depend on pygame.
+"""
+
+import os
+import csv
+import json
+import time
+import contextlib
+from collections import deque
+
+# Number of frames kept for each phase
+WINDOW = 1000
+PERCENTILES = (50, 95, 99)
+COLUMNS = ("phase", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+_NOTHING = contextlib.nullcontext()
+
+
+class FrameProfiler:
+    """
+    A class used to time the phases of the frames.
+
+    Attributes
+    ----------
+    enabled: bool
+        If False, nothing is timed.
+    window: int
+        Number of samples kept for each phase.
+    samples: dict
+        Last durations (in milliseconds) of each phase, in timing order.
+    mark: float
+        End of the last lap (in seconds).
+    frame_start: float
+        Start of the current frame (in seconds).
+    formatted: tuple
+        Last lines formatted for the overlay and when (see lines).
+
+    Methods
+    -------
+    frame(self) -> None:
+        Start timing a frame.
+    lap(self, name) -> None:
+        Time the phase ending now, since the last lap.
+    end_frame(self) -> None:
+        Time the whole frame.
+    measure(self, name):
+        Context timing a nested step.
+    add(self, name, duration) -> None:
+        Add a duration to a phase.
+    summary(self) -> list:
+        Statistics of each phase.
+    lines(self, max_age=0.0) -> list:
+        Statistics of each phase, formatted for the overlay.
+    export(self, path) -> None:
+        Write the statistics to a CSV or JSON file.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, enabled=False, window=WINDOW):
+        """Constructor.
+
+        Parameters
+        ----------
+        enabled: bool (optional, default=False)
+            If False, nothing is timed until enabled is set.
+        window: int (optional, default=WINDOW)
+            Number of samples kept for each phase.
+        """
+
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}
+        self.mark = self.frame_start = time.perf_counter()
+        self.formatted = ([], 0.0)
+
+    # Methods
+    # -------
+    def frame(self) -> None:
+        """Start timing a frame."""
+        if self.enabled:
+            self.mark = self.frame_start = time.perf_counter()
+
+    def lap(self, name) -> None:
+        """Time the phase ending now, since the last lap.
+
+        Parameter
+        ---------
+        name: string (required)
+            Name of the phase.
+        """
+
+        if self.enabled:
+            now = time.perf_counter()
+            self.add(name, (now - self.mark) * 1e3)
+            self.mark = now
+
+    def end_frame(self) -> None:
+        """Time the whole frame, since frame was called."""
+        if self.enabled:
+            self.add("frame", (time.perf_counter() - self.frame_start) * 1e3)
+
+    def measure(self, name):
+        """Context timing a nested step.
+
+        Parameter
+        ---------
+        name: string (required)
+            Name of the step.
+
+        Returns
+        -------
+        context manager
+            To be used in a with statement.
+        """
+
+        if not self.enabled:
+            return _NOTHING
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1e3)
+
+    def add(self, name, duration) -> None:
+        """Add a duration to a phase.
+
+        Parameters
+        ----------
+        name: string (required)
+            Name of the phase.
+        duration: float (required)
+            Duration (in milliseconds).
+        """
+
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(duration)
+
+    def summary(self) -> list:
+        """Statistics of each phase, over the last samples.
+
+        Returns
+        -------
+        list of dicts
+            One dict per phase, with the keys of COLUMNS.
+        """
+
+        rows = []
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            row = {"phase": name, "count": len(ordered),
+                   "mean_ms": sum(ordered) / len(ordered)}
+            for percentile in PERCENTILES:
+                row[f"p{percentile}_ms"] = nearest_rank(ordered, percentile)
+            row["max_ms"] = ordered[-1]
+            rows.append(row)
+        return rows
+
+    def lines(self, max_age=0.0) -> list:
+        """Statistics of each phase, formatted for the overlay.
+
+        Parameter
+        ---------
+        max_age: float (optional, default=0.0)
+            The previous lines are returned if they are more recent than
+            that (in seconds), to avoid sorting the samples every frame.
+
+        Returns
+        -------
+        list of strings
+            A header and a line per phase (milliseconds).
+        """
+
+        lines, when = self.formatted
+        now = time.perf_counter()
+        if lines and now - when < max_age:
+            return lines
+        lines = [f"{'phase':<14}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for row in self.summary():
+            lines.append(f"{row['phase']:<14}{row['p50_ms']:>7.2f}"
+                         f"{row['p95_ms']:>7.2f}{row['p99_ms']:>7.2f}")
+        self.formatted = (lines, now)
+        return lines
+
+    def export(self, path) -> None:
+        """Write the statistics to a file.
+
+        Parameter
+        ---------
+        path: string (required)
+            JSON file if its extension is .json, CSV file otherwise.
+        """
+
+        rows = self.summary()
+        if os.path.splitext(path)[1].lower() == ".json":
+            with open(path, "w") as file:
+                json.dump(rows, file, indent=2)
+        else:
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+def nearest_rank(ordered, percentile) -> float:
+    """Returns a percentile of sorted values (nearest-rank method).
+
+    Parameters
+    ----------
+    ordered: list (required)
+        Values, sorted, at least one.
+    percentile: int (required)
+        Percentile (0 to 100).
+    """
+
+    rank = max(1, -(-percentile * len(ordered) // 100))
+    return ordered[rank - 1]
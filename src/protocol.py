@@ -0,0 +1,187 @@
+"""Messages exchanged between the game server and its clients.
+
+Each message is a header (type on 1 byte, payload length on 2 bytes,
+little-endian) followed by its payload:
+
+- JOIN (client): configuration index (1 byte, see CONFIGURATION_NAMES).
+  The client waits for an opponent asking for the same configuration.
+- START (server): match id (4 bytes), color played by the client (1 byte),
+  then the initial state (64 bytes, see GameState.to_bytes).
+- MOVE (client): move code (2 bytes, see game_record.encode_move).
+- DELTA (server): a move was played, sent to both players. Ply (4 bytes),
+  move code (2 bytes), color of the marble pushed off the board (1 byte,
+  0 if none), then each changed cell and its new state (1 + 1 bytes).
+- ERROR (server): the last message was refused, UTF-8 reason.
+- END (server): the winner (1 byte), 0 if the opponent left.
+- STATS (both): the client asks for the server's statistics, the server
+  answers them as UTF-8 JSON.
+- WATCH (client): match id (4 bytes), the client watches the match (see
+  broadcaster.py): it receives a KEYFRAME, then the DELTA and END
+  messages of the match.
+- KEYFRAME (server): ply (4 bytes), then the state of the match (64 bytes,
+  see GameState.to_bytes). Sent to a spectator joining a match, or
+  instead of the deltas it could not receive in time.
+
+The moves are a few bytes long, a delta at most 19 bytes: players never
+receive a whole board after the START message, spectators only when they
+join or fall behind.
+
+This module does not depend on pygame.
+"""
+
+import struct
+from board import enemy
+from game_state import GameState
+from configurations import CONFIGURATIONS
+
+HEADER = struct.Struct("<BH")
+JOIN, START, MOVE, DELTA, ERROR, END, STATS, WATCH, KEYFRAME = range(1, 10)
+CONFIGURATION_NAMES = tuple(CONFIGURATIONS)
+START_FORMAT = struct.Struct("<IB")
+MOVE_FORMAT = struct.Struct("<H")
+DELTA_FORMAT = struct.Struct("<IHB")
+WATCH_FORMAT = struct.Struct("<I")
+KEYFRAME_FORMAT = struct.Struct("<I")
+
+
+def pack(kind, payload=b"") -> bytes:
+    """Returns a message ready to be sent.
+
+    Parameters
+    ----------
+    kind: int (required)
+        Type of the message (JOIN, START, ...).
+    payload: bytes (optional, default=b"")
+        Content of the message.
+    """
+
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_message(reader) -> tuple:
+    """Reads a message from an asyncio stream.
+
+    Parameter
+    ---------
+    reader: asyncio.StreamReader (required)
+        Stream to read.
+
+    Returns
+    -------
+    tuple
+        (type, payload).
+
+    Raises
+    ------
+    asyncio.IncompleteReadError
+        If the connection is closed.
+    """
+
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    payload = await reader.readexactly(length) if length else b""
+    return kind, payload
+
+
+def receive_message(stream) -> tuple:
+    """Reads a message from a blocking file-like stream.
+
+    Parameter
+    ---------
+    stream: binary file (required)
+        Stream to read, e.g. socket.makefile("rb").
+
+    Returns
+    -------
+    tuple
+        (type, payload), None if the connection is closed.
+    """
+
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    kind, length = HEADER.unpack(header)
+    payload = stream.read(length) if length else b""
+    if len(payload) < length:
+        return None
+    return kind, payload
+
+
+def encode_delta(ply, code, changes, ejected) -> bytes:
+    """Returns the payload of a DELTA message.
+
+    Parameters
+    ----------
+    ply: int (required)
+        Number of moves played before this one.
+    code: int (required)
+        Code of the move (see game_record.encode_move).
+    changes: list of tuples (required)
+        (cell, new state) of each changed cell.
+    ejected: int (required)
+        Color of the marble pushed off the board, None if none is.
+    """
+
+    cells = bytes(value for change in changes for value in change)
+    return DELTA_FORMAT.pack(ply, code, ejected or 0) + cells
+
+
+def decode_delta(payload) -> tuple:
+    """Returns the content of a DELTA message.
+
+    Returns
+    -------
+    tuple
+        (ply, move code, changes, ejected), see encode_delta.
+    """
+
+    ply, code, ejected = DELTA_FORMAT.unpack_from(payload)
+    cells = payload[DELTA_FORMAT.size:]
+    changes = list(zip(cells[::2], cells[1::2]))
+    return ply, code, changes, ejected or None
+
+
+def apply_delta(state, changes, ejected) -> None:
+    """Plays a delta on a state, without checking the rules.
+
+    Parameters
+    ----------
+    state: GameState or Board (required)
+        State to update, the color having moved being its turn.
+    changes: list of tuples (required)
+        (cell, new state) of each changed cell.
+    ejected: int (required)
+        Color of the marble pushed off the board, None if none is.
+    """
+
+    for cell, value in changes:
+        state.cells[cell] = value
+    if ejected:
+        state.dead[ejected] += 1
+    state.turn = enemy(state.turn)
+
+
+def encode_keyframe(ply, state) -> bytes:
+    """Returns the payload of a KEYFRAME message.
+
+    Parameters
+    ----------
+    ply: int (required)
+        Number of moves played.
+    state: GameState (required)
+        State of the match.
+    """
+
+    return KEYFRAME_FORMAT.pack(ply) + state.to_bytes()
+
+
+def decode_keyframe(payload) -> tuple:
+    """Returns the content of a KEYFRAME message.
+
+    Returns
+    -------
+    tuple
+        (ply, GameState), see encode_keyframe.
+    """
+
+    ply, = KEYFRAME_FORMAT.unpack_from(payload)
+    return ply, GameState.from_bytes(payload[KEYFRAME_FORMAT.size:])
@@ -0,0 +1,233 @@
+"""Records the game window without slowing the game loop down.
+
+The game loop only copies the window's pixels into a bounded queue (the
+frame is dropped if the queue is full), a background thread writes them.
+Each recording session gets its own folder, named after its start time,
+so that previous recordings are never deleted: a session ends with close,
+the next captured frame starts a new one.
+
+Output modes:
+- "png": one PNG file per frame.
+- "delta": a single archive (frames.bin), each frame being stored as the
+  zlib-compressed XOR of the previous one (a key frame every KEY_EVERY
+  frames). Identical frames only take a few bytes. See read_archive.
+- "video": a single video (frames.mp4) encoded by a local ffmpeg.
+"""
+
+import os
+import time
+import zlib
+import queue
+import struct
+import shutil
+import threading
+import subprocess
+import pygame
+
+MODES = ("png", "delta", "video")
+QUEUE_SIZE = 64
+KEY_EVERY = 120
+ARCHIVE_NAME = "frames.bin"
+VIDEO_NAME = "frames.mp4"
+# Header of a frame in the archive: width, height, kind, data length
+FRAME_HEADER = struct.Struct("<HHBI")
+KEY, DELTA, REPEAT = 0, 1, 2
+
+_to_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+
+
+class Recorder:
+    """
+    A class used to write the frames of the game in a background thread.
+
+    Attributes
+    ----------
+    root: string
+        Folder holding the sessions.
+    mode: string
+        Output mode (see MODES).
+    fps: int
+        Frame rate of the videos.
+    folder: string
+        Folder of the current (or last) session, None until the first
+        frame.
+    frames: queue.Queue
+        Frames waiting to be written: (index, size, pixels).
+    captured: int
+        Number of frames captured in the session.
+    dropped: int
+        Number of frames of the session dropped because the queue was
+        full.
+
+    Methods
+    -------
+    capture(self, surface) -> bool:
+        Queue a copy of a surface to be written (starting a session if
+        none is running).
+    close(self) -> None:
+        Write the pending frames and end the session.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, root, mode="png", fps=30, queue_size=QUEUE_SIZE):
+        """Constructor.
+
+        Parameters
+        ----------
+        root: string (required)
+            Folder holding the sessions (created if needed).
+        mode: string (optional, default="png")
+            Output mode (see MODES).
+        fps: int (optional, default=30)
+            Frame rate of the videos.
+        queue_size: int (optional, default=QUEUE_SIZE)
+            Maximum number of frames waiting to be written.
+        """
+
+        if mode not in MODES:
+            raise ValueError(f"Unknown recording mode: {mode}")
+        if mode == "video" and shutil.which("ffmpeg") is None:
+            raise ValueError("The video mode requires ffmpeg")
+        self.root = root
+        self.mode = mode
+        self.fps = fps
+        self.folder = None
+        self.frames = queue.Queue(queue_size)
+        self.captured = 0
+        self.dropped = 0
+        self.thread = None
+
+    # Methods
+    # -------
+    def capture(self, surface) -> bool:
+        """Queue a copy of a surface to be written (starting a session if
+        none is running).
+
+        Parameter
+        ---------
+        surface: pygame.Surface (required)
+            Surface to record, usually the game window.
+
+        Returns
+        -------
+        bool
+            False if the frame was dropped (the writer is late).
+        """
+
+        if self.thread is None:
+            self._start()
+        pixels = _to_bytes(surface, "RGB")
+        try:
+            self.frames.put_nowait((self.captured, surface.get_size(), pixels))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.captured += 1
+        return True
+
+    def close(self) -> None:
+        """Write the pending frames and end the session."""
+        if self.thread is not None:
+            self.frames.put(None)
+            self.thread.join()
+            self.thread = None
+            print(f"Recorded {self.captured} frames in \"{self.folder}\" "
+                  f"({self.dropped} dropped)")
+
+    def _start(self) -> None:
+        name = time.strftime("session_%Y%m%d_%H%M%S")
+        self.folder = os.path.join(self.root, name)
+        suffix = 1
+        while os.path.exists(self.folder):
+            suffix += 1
+            self.folder = os.path.join(self.root, f"{name}_{suffix}")
+        os.makedirs(self.folder)
+        self.captured = 0
+        self.dropped = 0
+        writer = {"png": self._write_png, "delta": self._write_delta,
+                  "video": self._write_video}[self.mode]
+        self.thread = threading.Thread(target=writer, name="recorder",
+                                       daemon=True)
+        self.thread.start()
+
+    def _pending(self):
+        # Yields the queued frames until close is called
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            yield frame
+
+    def _write_png(self) -> None:
+        for index, size, pixels in self._pending():
+            image = pygame.image.frombuffer(pixels, size, "RGB")
+            pygame.image.save(
+                image, os.path.join(self.folder, f"snapshot_{index + 1}.png"))
+
+    def _write_delta(self) -> None:
+        previous = None
+        with open(os.path.join(self.folder, ARCHIVE_NAME), "wb") as archive:
+            for index, size, pixels in self._pending():
+                if previous is not None and pixels == previous:
+                    kind, data = REPEAT, b""
+                elif (previous is None or index % KEY_EVERY == 0
+                      or len(pixels) != len(previous)):
+                    kind, data = KEY, zlib.compress(pixels, 1)
+                else:
+                    kind, data = DELTA, zlib.compress(_xor(pixels, previous), 1)
+                archive.write(FRAME_HEADER.pack(*size, kind, len(data)))
+                archive.write(data)
+                previous = pixels
+
+    def _write_video(self) -> None:
+        encoder = None
+        for _, size, pixels in self._pending():
+            if encoder is None:
+                encoder = subprocess.Popen(
+                    ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo",
+                     "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}",
+                     "-r", str(self.fps), "-i", "-", "-pix_fmt", "yuv420p",
+                     os.path.join(self.folder, VIDEO_NAME)],
+                    stdin=subprocess.PIPE)
+            encoder.stdin.write(pixels)
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+
+
+def _xor(data, other) -> bytes:
+    # XOR of two byte strings of the same length
+    length = len(data)
+    return (int.from_bytes(data, "little")
+            ^ int.from_bytes(other, "little")).to_bytes(length, "little")
+
+
+def read_archive(path):
+    """Reads the frames of an archive written in "delta" mode.
+
+    Parameter
+    ---------
+    path: string (required)
+        Path of the archive.
+
+    Yields
+    ------
+    tuple
+        (size, pixels) of each frame, pixels being RGB bytes
+        (see pygame.image.frombuffer).
+    """
+
+    pixels = None
+    with open(path, "rb") as archive:
+        while True:
+            header = archive.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            width, height, kind, length = FRAME_HEADER.unpack(header)
+            data = archive.read(length)
+            if kind == KEY:
+                pixels = zlib.decompress(data)
+            elif kind == DELTA:
+                pixels = _xor(zlib.decompress(data), pixels)
+            yield (width, height), pixels
@@ -0,0 +1,287 @@
+"""Redraws only the parts of the window which changed.
+
+Each frame, the game describes its whole scene to a Renderer, item by item
+(marbles, dead-zones, texts, ...), in drawing order. An item is identified
+by a name and compared to the item of the same name in the previous frame:
+only the areas of the items which appeared, disappeared, moved or changed
+are redrawn (background, then every item overlapping them, in order) and
+pushed to the display. An idle board costs no blit at all.
+
+The background can be a pre-composited surface holding everything which
+never changes (e.g. the empty holes of the board), such items do not need
+to be part of the scene. Rendered texts are cached by a TextCache.
+"""
+
+from collections import OrderedDict
+import pygame
+from profiler import FrameProfiler
+
+TEXT_CACHE_SIZE = 256
+
+
+class TextCache:
+    """
+    A class used to keep the most recently rendered texts.
+
+    Attributes
+    ----------
+    max_size: int
+        Maximum number of texts kept.
+    surfaces: OrderedDict
+        Rendered texts by (font, text, colour), the least recently used first.
+    hits: int
+        Number of texts found in the cache.
+    misses: int
+        Number of texts rendered.
+
+    Methods
+    -------
+    render(self, font, text, colour) -> pygame.Surface:
+        Returns a rendered text, from the cache if possible.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        """Constructor.
+
+        Parameter
+        ---------
+        max_size: int (optional, default=TEXT_CACHE_SIZE)
+            Maximum number of texts kept.
+        """
+
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Methods
+    # -------
+    def render(self, font, text, colour) -> pygame.Surface:
+        """Returns a rendered text, from the cache if possible.
+
+        Parameters
+        ----------
+        font: pygame.font.Font (required)
+            Font of the text.
+        text: string (required)
+            Text to render.
+        colour: tuple of ints (required)
+            Colour of the text.
+
+        Returns
+        -------
+        pygame.Surface
+            The rendered text (antialiased), it must not be modified.
+        """
+
+        key = (font, text, colour)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, colour)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class Renderer:
+    """
+    A class used to draw a scene on the window with dirty rectangles.
+
+    Attributes
+    ----------
+    screen: pygame.Surface
+        Game window.
+    background: tuple of ints or pygame.Surface
+        Background colour or image (of the window's size).
+    profiler: FrameProfiler
+        Times the redrawing and the display's update.
+    texts: TextCache
+        Rendered texts.
+    items: list
+        Items of the current frame: (name, rect, key, surface or function).
+    previous: dict
+        Items of the previous frame: name -> (rect, key, surface or function).
+    full_redraw: bool
+        True if the whole window must be redrawn by the next frame.
+    dirty_count: int
+        Number of rectangles updated by the last frame.
+
+    Methods
+    -------
+    blit(self, name, surface, pos) -> None:
+        Add a surface to the current frame.
+    text(self, name, font, text, colour, pos) -> None:
+        Add a text to the current frame.
+    shape(self, name, rect, key, draw) -> None:
+        Add a custom drawing to the current frame.
+    invalidate(self) -> None:
+        Redraw the whole window with the next frame.
+    present(self) -> list:
+        Redraw the changed areas and update them on the display.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, screen, background, profiler=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        screen: pygame.Surface (required)
+            Game window.
+        background: tuple of ints or pygame.Surface (required)
+            Background colour or image (of the window's size).
+        profiler: FrameProfiler (optional, default=None)
+            Times the redrawing and the display's update (see profiler.py).
+        """
+
+        self.screen = screen
+        self.background = background
+        self.profiler = profiler or FrameProfiler()
+        self.texts = TextCache()
+        self.items = []
+        self.previous = {}
+        self.full_redraw = True
+        self.dirty_count = 0
+
+    # Methods
+    # -------
+    def blit(self, name, surface, pos) -> None:
+        """Add a surface to the current frame.
+
+        Parameters
+        ----------
+        name: hashable (required)
+            Identifier of the item from one frame to the next.
+        surface: pygame.Surface (required)
+            Image to draw, compared by identity.
+        pos: tuple of ints (required)
+            Top-left corner of the image.
+        """
+
+        rect = surface.get_rect(topleft=pos)
+        self.items.append((name, rect, surface, surface))
+
+    def text(self, name, font, text, colour, pos) -> None:
+        """Add a text to the current frame.
+
+        The text is only rendered if it is not in the cache.
+
+        Parameters
+        ----------
+        name: hashable (required)
+            Identifier of the item from one frame to the next.
+        font: pygame.font.Font (required)
+            Font of the text.
+        text: string (required)
+            Text to draw.
+        colour: tuple of ints (required)
+            Colour of the text.
+        pos: tuple of ints (required)
+            Top-left corner of the text.
+        """
+
+        surface = self.texts.render(font, text, colour)
+        self.items.append((name, surface.get_rect(topleft=pos), surface, surface))
+
+    def shape(self, name, rect, key, draw) -> None:
+        """Add a custom drawing to the current frame.
+
+        Parameters
+        ----------
+        name: hashable (required)
+            Identifier of the item from one frame to the next.
+        rect: pygame.Rect (required)
+            Area covered by the drawing.
+        key: hashable (required)
+            Redraws the item when it changes.
+        draw: callable (required)
+            Called as draw(screen) to draw the item.
+        """
+
+        self.items.append((name, pygame.Rect(rect), key, draw))
+
+    def invalidate(self) -> None:
+        """Redraw the whole window with the next frame."""
+        self.full_redraw = True
+
+    def present(self) -> list:
+        """Redraw the changed areas and update them on the display.
+
+        Returns
+        -------
+        list of pygame.Rect
+            Updated areas.
+        """
+
+        current = {}
+        dirty = []
+        for name, rect, key, drawable in self.items:
+            current[name] = (rect, key, drawable)
+            previous = self.previous.pop(name, None)
+            if previous is None:
+                dirty.append(rect)
+            elif previous[1] != key or previous[0] != rect:
+                dirty.append(rect)
+                dirty.append(previous[0])
+        # the items which disappeared
+        dirty.extend(rect for rect, _, _ in self.previous.values())
+
+        if self.full_redraw:
+            dirty = [self.screen.get_rect()]
+            self.full_redraw = False
+        dirty = _merge(dirty)
+        with self.profiler.measure("redraw"):
+            for area in dirty:
+                self._redraw(area)
+            self.screen.set_clip(None)
+        with self.profiler.measure("display.update"):
+            pygame.display.update(dirty)
+
+        self.previous = current
+        self.items = []
+        self.dirty_count = len(dirty)
+        return dirty
+
+    def _redraw(self, area) -> None:
+        # Fills an area and draws every item overlapping it, batching the
+        # consecutive blits.
+        screen = self.screen
+        screen.set_clip(area)
+        if isinstance(self.background, pygame.Surface):
+            screen.blit(self.background, area, area)
+        else:
+            screen.fill(self.background, area)
+        batch = []
+        for _, rect, _, drawable in self.items:
+            if not rect.colliderect(area):
+                continue
+            if isinstance(drawable, pygame.Surface):
+                batch.append((drawable, rect))
+            else:
+                if batch:
+                    screen.blits(batch, False)
+                    batch = []
+                drawable(screen)
+        if batch:
+            screen.blits(batch, False)
+
+
+def _merge(rects) -> list:
+    # Merges the overlapping rectangles, so that no area is drawn twice.
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
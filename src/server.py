@@ -0,0 +1,346 @@
+"""Hosts many games at once for remote players.
+
+The server pairs the players asking for the same configuration (the first
+one plays blue), then checks their moves with the rules and sends each
+move played to both players as a delta (see protocol.py). A match only
+keeps a compact GameState (see game_state.py), all the matches run in one
+asyncio event loop. Any number of spectators can watch a match (see
+broadcaster.py).
+
+Running this module starts a server (port 0: any free port, printed when
+the server is ready):
+
+    python server.py --port 8765
+
+main.py plays on it with --connect, load_generator.py measures it.
+
+This module does not depend on pygame.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from board import BLUE, YELLOW
+from game_state import GameState
+from game_record import encode_move, decode_move
+from configurations import CONFIGURATIONS
+from broadcaster import Broadcaster
+from protocol import (JOIN, START, MOVE, DELTA, ERROR, END, STATS, WATCH,
+                      CONFIGURATION_NAMES, START_FORMAT, MOVE_FORMAT,
+                      WATCH_FORMAT, pack, read_message, encode_delta)
+
+DEFAULT_PORT = 8765
+MAX_MOVE_CODE = encode_move((60, 5, 3, 2))
+
+
+class Match:
+    """
+    A class used to store a match between two remote players.
+
+    Attributes
+    ----------
+    id: int
+        Identifier of the match.
+    state: GameState
+        State of the game.
+    players: tuple
+        Streams of the blue and yellow players (asyncio.StreamWriter).
+    ply: int
+        Number of moves played.
+    broadcaster: Broadcaster
+        Spectators of the match (None until the first one comes).
+
+    Methods
+    -------
+    opponent(self, writer) -> asyncio.StreamWriter:
+        Returns the stream of the other player.
+    footprint(self) -> int:
+        Returns the memory used by the match (in bytes).
+    """
+
+    __slots__ = ("id", "state", "players", "ply", "broadcaster")
+
+    # Constructor
+    # -----------
+    def __init__(self, match_id, configuration, blue, yellow):
+        """Constructor.
+
+        Parameters
+        ----------
+        match_id: int (required)
+            Identifier of the match.
+        configuration: tuple of lists (required)
+            Initial positions of the marbles on the board.
+        blue: asyncio.StreamWriter (required)
+            Stream of the blue player.
+        yellow: asyncio.StreamWriter (required)
+            Stream of the yellow player.
+        """
+
+        self.id = match_id
+        self.state = GameState(configuration, BLUE)
+        self.players = (blue, yellow)
+        self.ply = 0
+        self.broadcaster = None
+
+    # Methods
+    # -------
+    def opponent(self, writer):
+        """Returns the stream of the other player."""
+        return self.players[self.players[0] is writer]
+
+    def footprint(self) -> int:
+        """Returns the memory used by the match (in bytes), streams and
+        spectators excluded."""
+        return (sys.getsizeof(self) + sys.getsizeof(self.players)
+                + self.state.footprint())
+
+
+class GameServer:
+    """
+    A class used to pair remote players and referee their matches.
+
+    Attributes
+    ----------
+    matches: dict
+        Matches being played, by id.
+    seats: dict
+        Match and color of each connected player, by stream.
+    waiting: dict
+        Stream of the player waiting for an opponent, by configuration.
+    viewers: dict
+        Match watched by each spectator, by stream.
+    started: int
+        Number of matches started.
+    finished: int
+        Number of matches over (won or abandoned).
+    moves: int
+        Number of moves played.
+
+    Methods
+    -------
+    handle(self, reader, writer) -> None:
+        Serve a player until they leave (coroutine).
+    stats(self) -> dict:
+        Returns the server's statistics.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self):
+        """Constructor."""
+        self.matches = {}
+        self.seats = {}
+        self.waiting = {}
+        self.viewers = {}
+        self.started = 0
+        self.finished = 0
+        self.moves = 0
+
+    # Methods
+    # -------
+    async def handle(self, reader, writer) -> None:
+        """Serve a player until they leave (coroutine).
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader (required)
+            Messages of the player.
+        writer: asyncio.StreamWriter (required)
+            Messages to the player.
+        """
+
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == JOIN:
+                    self._join(writer, payload)
+                elif kind == MOVE:
+                    self._move(writer, payload)
+                elif kind == WATCH:
+                    self._watch(writer, payload)
+                elif kind == STATS:
+                    writer.write(pack(STATS, json.dumps(self.stats()).encode()))
+                else:
+                    writer.write(pack(ERROR, b"Unknown message"))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._leave(writer)
+            writer.close()
+
+    def stats(self) -> dict:
+        """Returns the server's statistics.
+
+        Returns
+        -------
+        dict
+            Counters, CPU time used (in seconds), resident memory (in KB,
+            None if unknown) and memory used by the matches (in bytes).
+        """
+
+        return {"matches": len(self.matches), "viewers": len(self.viewers),
+                "started": self.started, "finished": self.finished,
+                "moves": self.moves,
+                "cpu": time.process_time(), "rss_kb": _resident_memory(),
+                "match_bytes": sum(match.footprint()
+                                   for match in self.matches.values())}
+
+    def _join(self, writer, payload) -> None:
+        if (writer in self.seats or writer in self.viewers
+                or writer in self.waiting.values()):
+            writer.write(pack(ERROR, b"Already playing"))
+            return
+        if len(payload) != 1 or payload[0] >= len(CONFIGURATION_NAMES):
+            writer.write(pack(ERROR, b"Unknown configuration"))
+            return
+        name = CONFIGURATION_NAMES[payload[0]]
+        opponent = self.waiting.pop(name, None)
+        if opponent is None:
+            self.waiting[name] = writer
+            return
+        self.started += 1
+        match = Match(self.started, CONFIGURATIONS[name], opponent, writer)
+        self.matches[match.id] = match
+        state = match.state.to_bytes()
+        for color, player in zip((BLUE, YELLOW), match.players):
+            self.seats[player] = (match, color)
+            player.write(pack(START, START_FORMAT.pack(match.id, color) + state))
+
+    def _move(self, writer, payload) -> None:
+        seat = self.seats.get(writer)
+        if seat is None:
+            writer.write(pack(ERROR, b"Not playing"))
+            return
+        match, color = seat
+        if match.state.turn != color:
+            writer.write(pack(ERROR, b"Not your turn"))
+            return
+        if len(payload) != MOVE_FORMAT.size:
+            writer.write(pack(ERROR, b"Invalid move"))
+            return
+        code, = MOVE_FORMAT.unpack(payload)
+        if code > MAX_MOVE_CODE:
+            writer.write(pack(ERROR, b"Invalid move"))
+            return
+        state = match.state
+        try:
+            previous, ejected = state.play(decode_move(code))
+        except (ValueError, IndexError):
+            writer.write(pack(ERROR, b"Illegal move"))
+            return
+        changes = [(cell, state.cells[cell]) for cell, _ in previous]
+        message = pack(DELTA, encode_delta(match.ply, code, changes, ejected))
+        match.ply += 1
+        self.moves += 1
+        for player in match.players:
+            player.write(message)
+        if match.broadcaster is not None:
+            match.broadcaster.publish(message)
+        winner = state.winner()
+        if winner is not None:
+            end = pack(END, bytes((winner,)))
+            for player in match.players:
+                player.write(end)
+            self._close(match, end)
+
+    def _watch(self, writer, payload) -> None:
+        if (writer in self.seats or writer in self.viewers
+                or writer in self.waiting.values()):
+            writer.write(pack(ERROR, b"Already playing"))
+            return
+        if len(payload) != WATCH_FORMAT.size:
+            writer.write(pack(ERROR, b"Invalid match"))
+            return
+        match = self.matches.get(WATCH_FORMAT.unpack(payload)[0])
+        if match is None:
+            writer.write(pack(ERROR, b"Unknown match"))
+            return
+        if match.broadcaster is None:
+            match.broadcaster = Broadcaster(match.state, match.ply)
+        match.broadcaster.subscribe(writer.transport)
+        self.viewers[writer] = match
+
+    def _leave(self, writer) -> None:
+        match = self.viewers.pop(writer, None)
+        if match is not None:
+            match.broadcaster.unsubscribe(writer.transport)
+            return
+        for name, player in list(self.waiting.items()):
+            if player is writer:
+                del self.waiting[name]
+        seat = self.seats.get(writer)
+        if seat is not None:
+            match = seat[0]
+            opponent = match.opponent(writer)
+            end = pack(END, b"\x00")
+            if not opponent.is_closing():
+                opponent.write(end)
+            self._close(match, end)
+
+    def _close(self, match, end) -> None:
+        # The match is over: its players can join another one, its
+        # spectators (sent the END message) watch another one
+        del self.matches[match.id]
+        for player in match.players:
+            self.seats.pop(player, None)
+        if match.broadcaster is not None:
+            match.broadcaster.close(end)
+            for viewer in [viewer for viewer, watched in self.viewers.items()
+                           if watched is match]:
+                del self.viewers[viewer]
+        self.finished += 1
+
+
+def _resident_memory():
+    # Current resident memory of the process (in KB), None if unknown
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def serve(host, port) -> None:
+    """Runs a server until it is interrupted (coroutine).
+
+    Parameters
+    ----------
+    host: string (required)
+        Interface to listen on.
+    port: int (required)
+        Port to listen on, any free one if 0.
+    """
+
+    server = GameServer()
+    listener = await asyncio.start_server(server.handle, host, port)
+    port = listener.sockets[0].getsockname()[1]
+    print(f"Listening on {host}:{port}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Abalone game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="port to listen on (0: any free port)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Plays games between two computer players, with no display.
+
+The games are spread over a process pool, each game being played by a
+single worker (the players search in the worker itself). The colors and
+the first player of each game are drawn from a seed, so that a tournament
+can be replayed. A game is a draw if a position occurs 3 times or if it
+lasts longer than a given number of moves.
+
+A player is given as an engine name followed by its options, e.g.:
+
+    python tournament.py --games 100 --a alphabeta:time=0.2
+                         --b alphabeta:depth=2 --configuration BELGIAN_DAISY
+
+Options of "alphabeta": time (seconds per move), depth, hash (MB).
+Options of "mcts": time (seconds per move), plies (playouts length).
+
+The results are given from the point of view of player A: wins, draws,
+losses, Elo difference (with its 95% confidence interval), average game
+length and games per second.
+"""
+
+import os
+import math
+import time
+import random
+import argparse
+import multiprocessing
+from board import BLUE, YELLOW, enemy
+from bitboard import BitBoard
+from configurations import CONFIGURATIONS
+from engine import Engine
+from mcts import MCTS
+
+MAX_MOVES = 300
+REPETITIONS = 3
+# Score of player A for each outcome
+WIN, DRAW, LOSS = 1.0, 0.5, 0.0
+COLORS = ("alternate", "random", "blue", "yellow")
+
+
+def make_player(spec):
+    """Creates a computer player from its description.
+
+    Parameter
+    ---------
+    spec: string (required)
+        Engine name and options, e.g. "alphabeta:time=0.5,depth=4".
+
+    Returns
+    -------
+    Engine or MCTS
+        The player, searching in the calling process.
+
+    Raises
+    ------
+    ValueError
+        If the engine or one of its options is unknown.
+    """
+
+    name, _, options = spec.partition(":")
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if name == "alphabeta" and key == "time":
+            kwargs["time_limit"] = float(value)
+        elif name == "alphabeta" and key == "depth":
+            kwargs["max_depth"] = int(value)
+        elif name == "alphabeta" and key == "hash":
+            kwargs["max_bytes"] = int(value) * 2**20
+        elif name == "mcts" and key == "time":
+            kwargs["time_limit"] = float(value)
+        elif name == "mcts" and key == "plies":
+            kwargs["max_plies"] = int(value)
+        else:
+            raise ValueError(f"Unknown option of {name}: {option}")
+    if name == "alphabeta":
+        return Engine(**kwargs)
+    if name == "mcts":
+        return MCTS(processes=0, **kwargs)
+    raise ValueError(f"Unknown engine: {name}")
+
+
+def play_game(task) -> tuple:
+    """Plays a game between two players.
+
+    Parameter
+    ---------
+    task: tuple (required)
+        (index, spec_a, spec_b, configuration name, color of A, first color,
+        seed, max_moves).
+
+    Returns
+    -------
+    tuple
+        (index, score of A, number of moves played).
+    """
+
+    (index, spec_a, spec_b, configuration,
+     color_a, first, seed, max_moves) = task
+    player_a, player_b = make_player(spec_a), make_player(spec_b)
+    for player in (player_a, player_b):
+        if isinstance(player, MCTS):
+            player.rng.seed(seed)
+    players = {color_a: player_a, enemy(color_a): player_b}
+    bitboard = BitBoard.from_configuration(CONFIGURATIONS[configuration], first)
+    seen = {bitboard.hash: 1}
+    score = DRAW
+    moves = 0
+    while moves < max_moves:
+        move = players[bitboard.turn].search(bitboard)
+        if move is None:
+            break
+        bitboard.play(move)
+        moves += 1
+        winner = bitboard.winner()
+        if winner:
+            score = WIN if winner == color_a else LOSS
+            break
+        seen[bitboard.hash] = seen.get(bitboard.hash, 0) + 1
+        if seen[bitboard.hash] >= REPETITIONS:
+            break
+    for player in (player_a, player_b):
+        player.close()
+    return index, score, moves
+
+
+def schedule(games, spec_a, spec_b, configuration="STANDARD",
+             colors="alternate", seed=None, max_moves=MAX_MOVES) -> list:
+    """Builds the tasks of a tournament (see play_game).
+
+    Parameters
+    ----------
+    games: int (required)
+        Number of games.
+    spec_a: string (required)
+        Description of player A (see make_player).
+    spec_b: string (required)
+        Description of player B.
+    configuration: string (optional, default="STANDARD")
+        Name of the initial configuration (see configurations.py).
+    colors: string (optional, default="alternate")
+        Color of player A: "alternate" (blue in even games), "random",
+        "blue" or "yellow".
+    seed: int (optional, default=None)
+        Seed of the colors and first players, random if None.
+    max_moves: int (optional, default=MAX_MOVES)
+        Number of moves after which a game is a draw.
+
+    Returns
+    -------
+    list of tuples
+        Tasks of play_game.
+    """
+
+    rng = random.Random(seed)
+    tasks = []
+    for index in range(games):
+        if colors == "alternate":
+            color_a = BLUE if index % 2 == 0 else YELLOW
+        elif colors == "random":
+            color_a = rng.choice((BLUE, YELLOW))
+        else:
+            color_a = BLUE if colors == "blue" else YELLOW
+        first = rng.choice((BLUE, YELLOW))
+        tasks.append((index, spec_a, spec_b, configuration, color_a, first,
+                      rng.getrandbits(32), max_moves))
+    return tasks
+
+
+def elo(score) -> float:
+    """Returns the Elo difference matching an expected score (0 to 1)."""
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    return 400 * math.log10(score / (1 - score))
+
+
+def summarize(scores) -> dict:
+    """Computes the statistics of a tournament.
+
+    The Elo difference of a perfect (or null) score is unbounded: it is
+    then estimated as if a drawn game was added, i.e. from the score
+    (score * n + 0.5) / (n + 1), which keeps it finite.
+
+    Parameter
+    ---------
+    scores: list of floats (required)
+        Score of player A in each game (WIN, DRAW or LOSS), at least one.
+
+    Returns
+    -------
+    dict
+        wins, draws, losses, score (average), elo and elo_error (half
+        width of the 95% confidence interval).
+    """
+
+    if not scores:
+        raise ValueError("No game to summarize")
+    n_games = len(scores)
+    score = sum(scores) / n_games
+    if score in (0.0, 1.0):
+        corrected = scores + [DRAW]
+        estimate = sum(corrected) / len(corrected)
+        variance = sum((s - estimate) ** 2
+                       for s in corrected) / len(corrected)
+        margin = 1.96 * math.sqrt(variance / len(corrected))
+        # the interval stays within the scores the correction can give
+        bound = 0.5 / len(corrected)
+        low = elo(max(estimate - margin, bound))
+        high = elo(min(estimate + margin, 1 - bound))
+    else:
+        estimate = score
+        variance = sum((s - score) ** 2 for s in scores) / n_games
+        margin = 1.96 * math.sqrt(variance / n_games)
+        low, high = elo(score - margin), elo(score + margin)
+    return {
+        "wins": scores.count(WIN),
+        "draws": scores.count(DRAW),
+        "losses": scores.count(LOSS),
+        "score": score,
+        "elo": elo(estimate),
+        "elo_error": (high - low) / 2,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Plays games between two computer players.")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--a", default="alphabeta:time=0.2",
+                        help="player A (default: %(default)s)")
+    parser.add_argument("--b", default="mcts:time=0.2",
+                        help="player B (default: %(default)s)")
+    parser.add_argument("--configuration", choices=sorted(CONFIGURATIONS),
+                        default="STANDARD")
+    parser.add_argument("--colors", choices=COLORS, default="alternate",
+                        help="color of player A")
+    parser.add_argument("--seed", type=int, help="seed of the colors")
+    parser.add_argument("--max-moves", type=int, default=MAX_MOVES)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    # fails early on a wrong description
+    for spec in (args.a, args.b):
+        make_player(spec).close()
+    tasks = schedule(args.games, args.a, args.b, args.configuration,
+                     args.colors, args.seed, args.max_moves)
+    scores, lengths = [], []
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        for index, score, moves in pool.imap_unordered(play_game, tasks):
+            scores.append(score)
+            lengths.append(moves)
+            print(f"game {index + 1:>4}: {score:.1f} in {moves} moves")
+    elapsed = time.perf_counter() - start
+
+    stats = summarize(scores)
+    print(f"{args.a} vs {args.b} ({args.configuration}, "
+          f"{args.games} games)")
+    print(f"W/D/L: {stats['wins']}/{stats['draws']}/{stats['losses']}, "
+          f"score {stats['score']:.1%}")
+    elo_line = (f"Elo difference: {stats['elo']:+.0f} "
+                f"+/- {stats['elo_error']:.0f}")
+    if stats["score"] in (0.0, 1.0):
+        elo_line += " (estimated: one player won every game)"
+    print(elo_line)
+    print(f"Average length: {sum(lengths) / len(lengths):.1f} moves")
+    print(f"Games per second: {len(scores) / elapsed:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Implements a bounded transposition table.
+
+The table stores search results by Zobrist hash (see bitboard.py), so that
+a position reached through different move orders is only evaluated once.
+Its size is fixed when it is created, from a memory cap: once full, new
+results replace the old ones according to a depth-preferred policy
+with aging (see TranspositionTable.store).
+"""
+
+# Kind of value stored in an entry
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+# Estimated memory used by an entry (tuple of 6 small ints/tuples)
+ENTRY_SIZE = 160
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+class TranspositionTable:
+    """
+    A class used to represent a fixed-size transposition table.
+
+    Each entry is a tuple (key, depth, value, flag, move, generation) stored
+    in a slot chosen by the lowest bits of the key.
+
+    Attributes
+    ----------
+    size: int
+        Number of slots, a power of 2.
+    slots: list
+        Entries (None for an empty slot).
+    generation: int
+        Current search, used to age the entries of the previous ones.
+    probes: int
+        Number of lookups.
+    hits: int
+        Number of successful lookups.
+
+    Methods
+    -------
+    probe(self, key) -> tuple:
+        Returns the entry of a given position, if any.
+    store(self, key, depth, value, flag, move) -> None:
+        Stores a search result.
+    new_search(self) -> None:
+        Ages the current entries.
+    clear(self) -> None:
+        Removes every entry.
+    usage(self) -> float:
+        Returns the fraction of used slots.
+    """
+
+    # Constructor
+    # -----------
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """Constructor.
+
+        Parameter
+        ---------
+        max_bytes: int (optional, default=DEFAULT_MAX_BYTES)
+            Memory cap of the table (estimated with ENTRY_SIZE).
+        """
+
+        n_slots = max(1, max_bytes // ENTRY_SIZE)
+        self.size = 1 << (n_slots.bit_length() - 1)
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    # Methods
+    # -------
+    def probe(self, key):
+        """Returns the entry of a given position, None if not found.
+
+        Parameter
+        ---------
+        key: int (required)
+            Zobrist hash of the position.
+
+        Returns
+        -------
+        tuple or None
+            (key, depth, value, flag, move, generation)
+        """
+
+        self.probes += 1
+        entry = self.slots[key & (self.size - 1)]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag, move) -> None:
+        """Stores a search result.
+
+        An existing entry is replaced if it belongs to the same position,
+        to a previous search or if it was searched less deeply.
+
+        Parameters
+        ----------
+        key: int (required)
+            Zobrist hash of the position.
+        depth: int (required)
+            Depth of the search.
+        value: int (required)
+            Result of the search.
+        flag: int (required)
+            EXACT, LOWER_BOUND or UPPER_BOUND.
+        move: tuple of ints (required)
+            Best move found (None if unknown).
+        """
+
+        index = key & (self.size - 1)
+        entry = self.slots[index]
+        if (entry is None or entry[0] == key
+                or entry[5] != self.generation or depth >= entry[1]):
+            if move is None and entry is not None and entry[0] == key:
+                move = entry[4]
+            self.slots[index] = (key, depth, value, flag, move, self.generation)
+
+    def new_search(self) -> None:
+        """Ages the current entries: they will be replaced first."""
+        self.generation += 1
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def usage(self) -> float:
+        """Returns the fraction of used slots (on a sample of 1000 slots)."""
+        sample = self.slots[:1000]
+        return sum(entry is not None for entry in sample) / len(sample)
@@ -0,0 +1,7 @@
+"""The modules of src are imported by bare name, as main.py does."""
+
+import sys
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(
+    __file__))), "src"))
@@ -0,0 +1,82 @@
+"""Every spectator of a match rebuilds its state, fast, slow or late."""
+
+import random
+from board import BLUE
+from bitboard import BitBoard
+from configurations import STANDARD
+from game_state import GameState
+from game_record import encode_move
+from movegen import generate_moves
+from broadcaster import Broadcaster, replay_stream
+from protocol import (HEADER, DELTA, KEYFRAME, END, pack, encode_delta,
+                      decode_keyframe)
+
+
+class Transport:
+    # Keeps what it is sent, read every `period` moves
+    def __init__(self, period=1):
+        self.period = period
+        self.stream = bytearray()
+        self.waiting = 0
+
+    def write(self, data):
+        self.stream += data
+        self.waiting += len(data)
+
+    def get_write_buffer_size(self):
+        return self.waiting
+
+    def read(self, ply):
+        if ply % self.period == 0:
+            self.waiting = 0
+
+
+def broadcast(plies, late_ply, limit):
+    state = GameState(STANDARD, BLUE)
+    broadcaster = Broadcaster(state, limit=limit)
+    fast, slow, late = Transport(), Transport(period=25), Transport()
+    broadcaster.subscribe(fast)
+    broadcaster.subscribe(slow)
+    rng = random.Random(2)
+    for ply in range(plies):
+        if ply == late_ply:
+            broadcaster.subscribe(late)
+        moves = generate_moves(BitBoard.from_board(state.to_board()))
+        if not moves or state.winner() is not None:
+            break
+        move = rng.choice(moves)
+        previous, ejected = state.play(move)
+        changes = [(cell, state.cells[cell]) for cell, _ in previous]
+        broadcaster.publish(pack(DELTA, encode_delta(
+            ply, encode_move(move), changes, ejected)))
+        for transport in (fast, slow, late):
+            transport.read(ply + 1)
+    broadcaster.close(pack(END, b"\x00"))
+    return state, broadcaster, (fast, slow, late)
+
+
+def test_spectators_rebuild_the_state():
+    state, broadcaster, transports = broadcast(200, 57, limit=128)
+    for transport in transports:
+        assert replay_stream(transport.stream).to_bytes() == state.to_bytes()
+    assert not broadcaster.viewers
+
+
+def test_slow_spectators_are_coalesced():
+    state, broadcaster, (fast, slow, late) = broadcast(200, 57, limit=128)
+    assert broadcaster.skipped > 0
+    assert len(slow.stream) < len(fast.stream)
+    # nothing is skipped with a limit the slow spectator never reaches
+    _, broadcaster, (fast, slow, _) = broadcast(200, 57, limit=1 << 20)
+    assert broadcaster.skipped == 0
+    assert slow.stream == fast.stream
+
+
+def test_late_spectator_starts_with_a_keyframe():
+    _, _, (fast, _, late) = broadcast(120, 40, limit=128)
+    kind, length = HEADER.unpack_from(late.stream)
+    assert kind == KEYFRAME
+    ply, _ = decode_keyframe(bytes(late.stream[HEADER.size:
+                                               HEADER.size + length]))
+    assert ply == 40
+    assert len(late.stream) < len(fast.stream)
@@ -0,0 +1,55 @@
+"""A computer move is played in the background with each engine."""
+
+import threading
+from board import BLUE
+from bitboard import BitBoard
+from configurations import STANDARD
+from computer import ComputerPlayer
+from engine import Engine
+from mcts import MCTS
+from movegen import generate_moves
+
+
+def play_one_move(engine):
+    ready = threading.Event()
+    result = []
+
+    def on_move(move, key):
+        result.append((move, key))
+        ready.set()
+
+    player = ComputerPlayer(engine, on_move)
+    bitboard = BitBoard.from_configuration(STANDARD, BLUE)
+    try:
+        player.start(bitboard)
+        assert ready.wait(30), "the computer did not move"
+    finally:
+        player.close()
+    move, key = result[0]
+    assert move in generate_moves(bitboard)
+    assert key == bitboard.hash
+
+
+def test_alphabeta_moves():
+    play_one_move(Engine(0.2))
+
+
+def test_mcts_moves():
+    play_one_move(MCTS(0.2, processes=0, seed=1))
+
+
+def test_stop_before_the_search():
+    # a cancelled ponder whose search had not set its deadline yet
+    engine = Engine(0.2)
+    bitboard = BitBoard.from_configuration(STANDARD, BLUE)
+    engine.stop()
+    done = threading.Thread(target=engine.search, args=(bitboard, True),
+                            daemon=True)
+    done.start()
+    done.join(10)
+    if done.is_alive():
+        engine.stop()
+    assert not done.is_alive(), "the stop was lost"
+    # the next search is not stopped
+    engine.search(bitboard)
+    assert engine.depth_reached > 0
@@ -0,0 +1,52 @@
+"""Game records survive their text and binary forms, replays the rules."""
+
+import pytest
+from board import Board, BLUE
+from configurations import CONFIGURATIONS
+from game_record import (GameRecord, Replay, MAX_SEED, random_game,
+                         move_to_text, move_from_text)
+
+
+@pytest.mark.parametrize("name", sorted(CONFIGURATIONS))
+def test_round_trips(name):
+    record = random_game(200, name, seed=len(name))
+    for copy in (GameRecord.from_text(record.to_text()),
+                 GameRecord.from_bytes(record.to_bytes())):
+        assert copy.configuration == record.configuration
+        assert copy.first == record.first
+        assert copy.seed == record.seed
+        assert copy.moves == record.moves
+    for move in record.moves:
+        assert move_from_text(move_to_text(move)) == move
+
+
+@pytest.mark.parametrize("seed", [None, 0, 2 ** 63, MAX_SEED])
+def test_seeds(seed):
+    record = GameRecord("STANDARD", BLUE, seed)
+    assert GameRecord.from_bytes(record.to_bytes()).seed == seed
+    assert GameRecord.from_text(record.to_text()).seed == seed
+
+
+@pytest.mark.parametrize("seed", [-1, MAX_SEED + 1])
+def test_invalid_seeds(seed):
+    with pytest.raises(ValueError):
+        GameRecord("STANDARD", BLUE, seed)
+
+
+def test_replay():
+    record = random_game(150, "STANDARD", seed=3)
+    replay = Replay(record)
+    board = Board(CONFIGURATIONS[record.configuration], record.first)
+    positions = [list(board.cells)]
+    for move in record.moves:
+        board.play(move)
+        positions.append(list(board.cells))
+    # any ply, forwards and backwards
+    for ply in (len(record.moves), 0, 17, 5, len(record.moves) // 2, 1):
+        assert replay.board_at(ply).to_board().cells == positions[ply]
+
+
+def test_illegal_move():
+    record = GameRecord("STANDARD", BLUE, moves=[(0, 0, 1, 0)])
+    with pytest.raises(ValueError):
+        Replay(record)
@@ -0,0 +1,34 @@
+"""The MCTS worker processes can be terminated whatever their parent."""
+
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from board import BLUE
+from bitboard import BitBoard
+from configurations import STANDARD
+from mcts import MCTS
+from movegen import generate_moves
+
+
+def test_close_with_a_sigterm_handler():
+    # as pygame.init() does before main.py starts the pool
+    handler = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    try:
+        mcts = MCTS(0.1, processes=2, seed=1)
+        bitboard = BitBoard.from_configuration(STANDARD, BLUE)
+        assert mcts.search(bitboard) in generate_moves(bitboard)
+        # a worker busy when the game is quit
+        mcts.pool.apply_async(time.sleep, (60,))
+        time.sleep(0.5)
+    finally:
+        signal.signal(signal.SIGTERM, handler)
+    closing = threading.Thread(target=mcts.close, daemon=True)
+    closing.start()
+    closing.join(10)
+    if closing.is_alive():
+        # not to hang the tests at exit
+        for process in multiprocessing.active_children():
+            os.kill(process.pid, signal.SIGKILL)
+    assert not closing.is_alive(), "the worker processes were not terminated"
@@ -0,0 +1,53 @@
+"""The bitboard move generator against the rules of board.py."""
+
+import random
+import pytest
+from board import Board, BLUE
+from bitboard import BitBoard
+from configurations import CONFIGURATIONS, STANDARD
+from game_record import encode_move, decode_move
+from movegen import generate_moves, perft
+
+# Every move which can be written down, legal or not
+CANDIDATES = [decode_move(code)
+              for code in range(encode_move((60, 5, 3, 2)) + 1)]
+PLIES = 60
+
+
+def state(bitboard):
+    return (bitboard.blue, bitboard.yellow, bitboard.turn,
+            dict(bitboard.dead), bitboard.hash)
+
+
+@pytest.mark.parametrize("name", sorted(CONFIGURATIONS))
+def test_random_games(name):
+    rng = random.Random(name)
+    board = Board(CONFIGURATIONS[name], BLUE)
+    bitboard = BitBoard.from_board(board)
+    for _ in range(PLIES):
+        moves = generate_moves(bitboard)
+        assert len(moves) == len(set(moves))
+        assert set(moves) == {move for move in CANDIDATES
+                              if board.resolve(move) is not None}
+        for move in moves:
+            # same consequences, an undo restoring everything
+            before = state(bitboard)
+            record = bitboard.play(move)
+            assert bitboard.hash == bitboard.compute_hash()
+            previous = board.play(move)
+            assert bitboard.to_board().cells == board.cells
+            assert bitboard.dead == board.dead
+            board.undo(previous)
+            bitboard.undo(record)
+            assert state(bitboard) == before
+        if not moves or board.winner() is not None:
+            break
+        move = rng.choice(moves)
+        board.play(move)
+        bitboard.play(move)
+
+
+def test_perft():
+    bitboard = BitBoard.from_configuration(STANDARD, BLUE)
+    assert perft(bitboard, 1) == 44
+    assert perft(bitboard, 2) == 1936
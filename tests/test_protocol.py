@@ -0,0 +1,103 @@
+"""The messages of the game server rebuild the games they describe."""
+
+import io
+import random
+import asyncio
+from board import BLUE, YELLOW
+from bitboard import BitBoard
+from configurations import STANDARD
+from game_state import GameState
+from game_record import encode_move
+from movegen import generate_moves
+from server import GameServer
+from protocol import (JOIN, START, MOVE, DELTA, ERROR, CONFIGURATION_NAMES,
+                      START_FORMAT, MOVE_FORMAT, pack, read_message,
+                      receive_message, encode_delta, decode_delta,
+                      apply_delta, encode_keyframe, decode_keyframe)
+
+
+def random_moves(state, plies, seed):
+    # Yields (ply, move, previous, ejected) of a random game played on state
+    rng = random.Random(seed)
+    for ply in range(plies):
+        moves = generate_moves(BitBoard.from_board(state.to_board()))
+        if not moves or state.winner() is not None:
+            return
+        move = rng.choice(moves)
+        previous, ejected = state.play(move)
+        yield ply, move, previous, ejected
+
+
+def test_deltas_rebuild_the_game():
+    played = GameState(STANDARD, BLUE)
+    received = played.copy()
+    for ply, move, previous, ejected in random_moves(played, 300, 1):
+        changes = [(cell, played.cells[cell]) for cell, _ in previous]
+        payload = encode_delta(ply, encode_move(move), changes, ejected)
+        assert len(payload) <= 19
+        assert decode_delta(payload) == (ply, encode_move(move), changes,
+                                         ejected)
+        apply_delta(received, *decode_delta(payload)[2:])
+        assert received.to_bytes() == played.to_bytes()
+
+
+def test_large_plies():
+    ply = 2 ** 20
+    assert decode_delta(encode_delta(ply, 7, [(3, YELLOW)], None)) == (
+        ply, 7, [(3, YELLOW)], None)
+    state = GameState(STANDARD, YELLOW)
+    decoded_ply, decoded = decode_keyframe(encode_keyframe(ply, state))
+    assert decoded_ply == ply
+    assert decoded.to_bytes() == state.to_bytes()
+
+
+def test_framing():
+    messages = [(JOIN, b"\x00"), (ERROR, b"reason"), (DELTA, b"")]
+    stream = io.BytesIO(b"".join(pack(*message) for message in messages))
+    assert [receive_message(stream) for _ in messages] == messages
+    assert receive_message(stream) is None
+    # a truncated message is a closed connection
+    assert receive_message(io.BytesIO(pack(ERROR, b"reason")[:-1])) is None
+
+
+def test_server_match():
+    async def play():
+        server = GameServer()
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        players = [await asyncio.open_connection("127.0.0.1", port)
+                   for _ in range(2)]
+        join = pack(JOIN, bytes((CONFIGURATION_NAMES.index("STANDARD"),)))
+        states, seats = {}, {}
+        for reader, writer in players:
+            writer.write(join)
+            await writer.drain()
+        for reader, writer in players:
+            kind, payload = await read_message(reader)
+            assert kind == START
+            color = START_FORMAT.unpack_from(payload)[1]
+            states[color] = GameState.from_bytes(payload[START_FORMAT.size:])
+            seats[color] = reader, writer
+        blue, yellow = seats[BLUE], seats[YELLOW]
+        # out of turn, then an illegal move
+        yellow[1].write(pack(MOVE, MOVE_FORMAT.pack(0)))
+        assert (await read_message(yellow[0]))[0] == ERROR
+        blue[1].write(pack(MOVE, MOVE_FORMAT.pack(encode_move((0, 0, 1, 0)))))
+        assert (await read_message(blue[0]))[0] == ERROR
+        # a legal move reaches both players
+        reference = GameState(STANDARD, BLUE)
+        move = generate_moves(BitBoard.from_board(reference.to_board()))[0]
+        reference.play(move)
+        blue[1].write(pack(MOVE, MOVE_FORMAT.pack(encode_move(move))))
+        for color, (reader, _) in seats.items():
+            kind, payload = await read_message(reader)
+            assert kind == DELTA
+            apply_delta(states[color], *decode_delta(payload)[2:])
+            assert states[color].to_bytes() == reference.to_bytes()
+        assert server.moves == 1
+        for _, writer in players:
+            writer.close()
+        listener.close()
+        await listener.wait_closed()
+
+    asyncio.run(asyncio.wait_for(play(), 10))
@@ -0,0 +1,33 @@
+"""The statistics of a tournament stay finite."""
+
+import math
+import pytest
+from tournament import summarize, elo, WIN, DRAW, LOSS
+
+
+@pytest.mark.parametrize("scores", [[WIN] * 10, [LOSS] * 10, [WIN],
+                                    [WIN, DRAW, LOSS]])
+def test_summary_is_finite(scores):
+    stats = summarize(scores)
+    assert math.isfinite(stats["elo"])
+    assert math.isfinite(stats["elo_error"])
+
+
+def test_perfect_scores_are_symmetric():
+    assert summarize([WIN] * 10)["elo"] == pytest.approx(
+        -summarize([LOSS] * 10)["elo"])
+    assert summarize([WIN] * 10)["elo"] > 0
+
+
+def test_no_game():
+    with pytest.raises(ValueError):
+        summarize([])
+
+
+def test_other_scores_are_not_corrected():
+    scores = [WIN] * 7 + [LOSS] * 3
+    margin = 1.96 * math.sqrt(0.7 * 0.3 / 10)
+    stats = summarize(scores)
+    assert stats["elo"] == pytest.approx(400 * math.log10(0.7 / 0.3))
+    assert stats["elo_error"] == pytest.approx(
+        (elo(0.7 + margin) - elo(0.7 - margin)) / 2)